@@ -0,0 +1,291 @@
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from config.settings import settings
+from rag.resources import resources
+from rag.query_cache import query_cache
+from rag.query_parser import query_cache_key
+from rag.single_flight import flights
+from rag.telemetry import configure_logging, telemetry
+
+logger = logging.getLogger(__name__)
+
+class AskRequest(BaseModel):
+    question: str = Field(..., min_length=1, max_length=2000)
+
+class ServiceState:
+    """
+    Shared by every request in the process: one RAGController (via `resources`),
+    a bounded thread pool for retrieval, and the in-flight request count.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.slots = asyncio.Semaphore(settings.API_MAX_IN_FLIGHT)
+        self.in_flight = 0
+        self.ready = False
+        self.draining = False
+        self.load_error = None
+
+    def check_capacity(self):
+        if self.draining:
+            raise HTTPException(status_code=503, detail="Server is shutting down.")
+        if self.slots.locked():
+            raise HTTPException(status_code=503, detail="Server is busy, please retry.", headers={"Retry-After": "1"})
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self.slots:
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+state = ServiceState()
+
+def _prepare(question: str):
+    # Runs in the retrieval pool: the controller is shared, and only reloaded if the index changed
+    controller = resources.get_controller()
+    return controller, controller.prepare(question)
+
+async def _run_prepare(question: str):
+    loop = asyncio.get_running_loop()
+    try:
+        # Copy the context so spans recorded in the pool thread land in this request's trace
+        return await loop.run_in_executor(state.executor, contextvars.copy_context().run, _prepare, question)
+    except ValueError as e:
+        # e.g. GROQ_API_KEY missing, or the index has not been built
+        raise HTTPException(status_code=503, detail=f"Service not ready: {e}")
+
+async def _answer(question: str):
+    controller, prepared = await _run_prepare(question)
+    answer = prepared["answer"]
+    if answer is None:
+        answer = await controller.agenerate(prepared)
+    return prepared, answer
+
+async def _answer_stream(question: str, trace):
+    """(prepared, async token stream) for one question: the cached answer, or the LLM stream."""
+    controller, prepared = await _run_prepare(question)
+    if prepared["answer"] is not None:
+        return prepared, _single_token(prepared["answer"])
+    return prepared, controller.astream_tokens(prepared, trace)
+
+async def _single_token(text: str):
+    yield text
+
+def _flight_key(kind: str, question: str):
+    """Single-flight key; like RAGController._flight_key it includes the index version, so a request
+    arriving after a snapshot swap never joins work prepared against the old index."""
+    controller = resources.peek_controller()
+    index_version = controller.retriever.index_version if controller is not None else None
+    return (kind, index_version, query_cache_key(question))
+
+def _serialize_sections(sections) -> List[Dict]:
+    return [
+        {
+            "section_number": section["section_number"],
+            "section_title": section["section_title"],
+            "page_range": section["page_range"],
+            "score": section["score"],
+            "match_type": section["match_type"],
+            "is_mapped": section["is_mapped"],
+            "chunks": [
+                {"id": doc.metadata.get("id"), "score": doc.metadata.get("score"), "text": doc.page_content}
+                for doc in section["chunks"]
+            ],
+        }
+        for section in sections
+    ]
+
+def _event(payload: Dict) -> bytes:
+    return (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+
+async def _with_deadline(agen, deadline: float):
+    """Re-yields an async generator, raising asyncio.TimeoutError once the deadline passes."""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            try:
+                yield await asyncio.wait_for(agen.__anext__(), remaining)
+            except StopAsyncIteration:
+                return
+    finally:
+        await agen.aclose()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    state.executor = ThreadPoolExecutor(max_workers=settings.API_RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+    # Load the index and embedding model once, before taking traffic
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(state.executor, resources.get_controller)
+        state.ready = True
+    except Exception as e:
+        state.load_error = str(e)
+        logger.critical("Could not load the RAG controller: %s", e)
+    stats = resources.get_stats()
+    logger.info("API ready=%s (load %ss, %d retrieval threads, max %d in flight)", state.ready,
+                stats["last_load_seconds"], settings.API_RETRIEVAL_WORKERS, settings.API_MAX_IN_FLIGHT)
+
+    yield
+
+    # Graceful shutdown: refuse new work, let in-flight requests finish
+    state.draining = True
+    deadline = loop.time() + settings.API_SHUTDOWN_GRACE
+    while state.in_flight and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+    if state.in_flight:
+        logger.warning("Shutting down with %d request(s) still in flight.", state.in_flight)
+    state.executor.shutdown(wait=False, cancel_futures=True)
+    query_cache.save()
+
+app = FastAPI(title="Nyaya-Sahayak API", lifespan=lifespan)
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and the event loop responds."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: the index is loaded and the server is not draining."""
+    ready = state.ready and not state.draining
+    body = {
+        "ready": ready,
+        "draining": state.draining,
+        "in_flight": state.in_flight,
+        "load_error": state.load_error,
+        "resources": resources.get_stats(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: per-stage latency histograms, cache hits, token counts."""
+    flight_stats = flights.stats()
+    lines = [
+        "# HELP rag_api_in_flight Requests currently being served.",
+        "# TYPE rag_api_in_flight gauge",
+        f"rag_api_in_flight {state.in_flight}",
+        "# HELP rag_single_flight_total Requests that started work / joined identical in-flight work.",
+        "# TYPE rag_single_flight_total counter",
+        f'rag_single_flight_total{{role="started"}} {flight_stats["started"]}',
+        f'rag_single_flight_total{{role="joined"}} {flight_stats["joined"]}',
+    ]
+    controller = resources.peek_controller()
+    llm_stats = controller.llm.stats() if controller is not None and hasattr(controller.llm, "stats") else {}
+    if llm_stats:
+        lines += [
+            "# HELP rag_llm_provider_latency_seconds EWMA latency per LLM provider (kind: invoke, or stream = time to first token).",
+            "# TYPE rag_llm_provider_latency_seconds gauge",
+        ]
+        for name, health in llm_stats.items():
+            for kind, ms in health["latency_ms"].items():
+                lines.append(f'rag_llm_provider_latency_seconds{{provider="{name}",kind="{kind}"}} {ms / 1000:.4f}')
+        lines += ["# HELP rag_llm_provider_error_rate EWMA error rate per LLM provider.", "# TYPE rag_llm_provider_error_rate gauge"]
+        lines += [f'rag_llm_provider_error_rate{{provider="{name}"}} {health["error_rate"]}' for name, health in llm_stats.items()]
+        lines += ["# HELP rag_llm_provider_available 0 while a provider is cooling down after failures.", "# TYPE rag_llm_provider_available gauge"]
+        lines += [f'rag_llm_provider_available{{provider="{name}"}} {int(health["available"])}' for name, health in llm_stats.items()]
+    body = telemetry.render_prometheus() + "\n".join(lines) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@app.post("/ask")
+async def ask(request: AskRequest):
+    state.check_capacity()
+    async with state.slot():
+        with telemetry.trace("api_ask"):
+            start = time.perf_counter()
+            try:
+                # Identical questions in flight share one retrieval + generation
+                prepared, answer = await asyncio.wait_for(
+                    flights.ado(_flight_key("ask", request.question), lambda: _answer(request.question)),
+                    settings.API_REQUEST_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=504, detail=f"Request timed out after {settings.API_REQUEST_TIMEOUT:g}s.")
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.exception("Error in RAG pipeline: %s", e)
+                raise HTTPException(status_code=500, detail=f"An error occurred while processing your request: {e}")
+
+    return {
+        "answer": answer,
+        "cached": prepared["cached"],
+        "sections": _serialize_sections(prepared["sections"]),
+        "elapsed_seconds": round(time.perf_counter() - start, 3),
+    }
+
+@app.post("/ask/stream")
+async def ask_stream(request: AskRequest):
+    """
+    Newline-delimited JSON events:
+      {"event": "sections", ...}, then {"event": "token", "text": ...} as the LLM
+      produces them, then {"event": "done"} (or {"event": "error", "detail": ...}).
+    """
+    state.check_capacity()
+    return StreamingResponse(_stream_events(request.question), media_type="application/x-ndjson")
+
+async def _stream_events(question: str):
+    async with state.slot():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.API_REQUEST_TIMEOUT
+        # Finished explicitly: a context variable can't stay set across this generator's yields
+        trace = telemetry.start_trace("api_ask_stream")
+        tokens = None
+        try:
+            with telemetry.activate(trace):
+                # Identical questions in flight share one retrieval + generation; a late
+                # joiner gets the tokens produced so far, then follows the live stream
+                prepared, tokens, joined = await asyncio.wait_for(
+                    flights.astream(_flight_key("stream", question), lambda: _answer_stream(question, trace)),
+                    settings.API_REQUEST_TIMEOUT
+                )
+                telemetry.set(single_flight_joined=joined)
+            yield _event({
+                "event": "sections",
+                "cached": prepared["cached"],
+                "sections": _serialize_sections(prepared["sections"]),
+            })
+
+            # A client disconnect cancels this generator and closes its reader; the LLM stream
+            # is closed once no reader is left (see rag/single_flight.AsyncTokenBroadcast)
+            async for token in _with_deadline(tokens, deadline):
+                yield _event({"event": "token", "text": token})
+            yield _event({"event": "done"})
+        except asyncio.TimeoutError:
+            yield _event({"event": "error", "detail": f"Request timed out after {settings.API_REQUEST_TIMEOUT:g}s."})
+        except HTTPException as e:
+            yield _event({"event": "error", "detail": e.detail})
+        except Exception as e:
+            logger.exception("Error in RAG pipeline: %s", e)
+            yield _event({"event": "error", "detail": f"An error occurred while processing your request: {e}"})
+        finally:
+            if tokens is not None:
+                await tokens.aclose()
+            telemetry.finish(trace)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # One process, one event loop: every request shares the loaded index
+    uvicorn.run(
+        app,
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        timeout_graceful_shutdown=int(settings.API_SHUTDOWN_GRACE)
+    )
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from config.settings import settings
+from rag.resources import get_rss_mb
+from benchmarks.retrieval_bench import GOLD_QUERIES, RESULTS_DIR, load_gold, percentiles, run_benchmark
+
+# Embedding backends side by side (EMBEDDING_BACKEND = torch / onnx / onnx-int8): model load
+# time and memory, single-query and batch encode latency, agreement with the first backend's
+# vectors, and retrieval recall/MRR against the current index (queries encoded by the
+# backend under test). Each backend runs in its own process so load time and RSS are clean.
+
+def measure_backend(backend: str, repeat: int = 3) -> Dict:
+    # The index stays as built: this measures the backend as a query encoder for it
+    settings.EMBEDDING_BACKEND = backend
+    settings.EMBEDDING_MISMATCH = "warn"
+    queries = [item["query"] for item in load_gold(GOLD_QUERIES)]
+
+    rss_before = get_rss_mb()
+    start = time.perf_counter()
+    from indexing.vector_store_utils import get_embedding_model, embeddings_compatible
+    model = get_embedding_model()
+    model.embed_query("warm up")
+    load_seconds = time.perf_counter() - start
+    rss_after = get_rss_mb()
+
+    single = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            model.embed_query(query)
+            single.append((time.perf_counter() - start) * 1000)
+
+    texts = _chunk_texts(256) or queries * 4
+    start = time.perf_counter()
+    model.embed_documents(texts)
+    batch_seconds = time.perf_counter() - start
+
+    compatible, probe_cosine = embeddings_compatible(model)
+    retrieval = run_benchmark(GOLD_QUERIES, repeat=1)
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "rss_before_mb": round(rss_before, 1) if rss_before is not None else None,
+        "rss_after_mb": round(rss_after, 1) if rss_after is not None else None,
+        "torch_imported": "torch" in sys.modules,
+        "query_encode_ms": percentiles(single),
+        "batch_texts_per_second": round(len(texts) / batch_seconds, 1),
+        "index_compatible": compatible,
+        "probe_cosine": probe_cosine,
+        "retrieval": {key: value for key, value in retrieval["summary"].items() if key != "latency_ms"},
+        "retrieval_latency_ms": retrieval["summary"]["latency_ms"],
+        "query_vectors": np.asarray(model.embed_documents(queries), dtype="float32").round(6).tolist(),
+    }
+
+def _chunk_texts(limit: int) -> List[str]:
+    if not settings.BNS_CHUNKS_JSON.exists():
+        return []
+    with open(settings.BNS_CHUNKS_JSON, "r", encoding="utf-8") as f:
+        return [chunk["text"] for chunk in json.load(f)[:limit]]
+
+def run_in_subprocess(backend: str, repeat: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "result.json"
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.embedding_bench", "--worker", backend, "--repeat", str(repeat), "--output", str(output)],
+            check=True,
+            env={**os.environ, "EMBEDDING_BACKEND": backend},
+        )
+        with open(output, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+def agreement(reference: List[List[float]], other: List[List[float]]) -> Dict:
+    """Cosine similarity between two backends' vectors for the same queries."""
+    a = np.asarray(reference, dtype="float32")
+    b = np.asarray(other, dtype="float32")
+    cosines = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+    return {"mean": round(float(cosines.mean()), 5), "min": round(float(cosines.min()), 5)}
+
+def print_report(results: List[Dict]):
+    print(f"\n{'backend':<10} {'load s':>7} {'RSS MB':>8} {'q p50ms':>8} {'q p95ms':>8} {'batch/s':>8} "
+          f"{'cos min':>8} {'R@5':>6} {'MRR':>6}  index")
+    for row in results:
+        rss = row["rss_after_mb"] - row["rss_before_mb"] if row["rss_after_mb"] is not None and row["rss_before_mb"] is not None else float("nan")
+        cosine = row.get("agreement", {}).get("min", 1.0)
+        print(f"{row['backend']:<10} {row['load_seconds']:>7.2f} {rss:>8.0f} {row['query_encode_ms']['p50']:>8.2f} "
+              f"{row['query_encode_ms']['p95']:>8.2f} {row['batch_texts_per_second']:>8.1f} {cosine:>8.4f} "
+              f"{row['retrieval']['recall@5']:>6.3f} {row['retrieval']['mrr']:>6.3f}  "
+              f"{'compatible' if row['index_compatible'] else 'needs rebuild'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare embedding backends: encode latency, memory, recall.")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8", help="Comma-separated; the first is the reference for vector agreement.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the gold queries per backend.")
+    parser.add_argument("--output", default=None, help="JSON report path (default: benchmarks/results/embedding_<time>.json).")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)  # internal: measure one backend in this process
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(measure_backend(args.worker, args.repeat), f)
+        sys.exit(0)
+
+    results = []
+    for backend in [name.strip() for name in args.backends.split(",") if name.strip()]:
+        print(f"\n=== {backend} ===")
+        try:
+            results.append(run_in_subprocess(backend, args.repeat))
+        except subprocess.CalledProcessError:
+            print(f"Backend {backend} failed; skipped.")
+    if not results:
+        raise SystemExit("No backend could be measured.")
+
+    reference = results[0]
+    for row in results[1:]:
+        row["agreement"] = agreement(reference["query_vectors"], row["query_vectors"])
+    for row in results:
+        del row["query_vectors"]
+    print_report(results)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {"embedding_model": settings.EMBEDDING_MODEL, "index_type": settings.INDEX_TYPE, "reference": reference["backend"]},
+        "backends": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"embedding_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {output}")
@@ -0,0 +1,110 @@
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from config.settings import settings
+from benchmarks.retrieval_bench import RESULTS_DIR, percentiles
+
+# Filtered vector search (indexing/row_groups.py) against the unfiltered search and the
+# over-fetch it replaces (search k * 3 over everything, keep the matching hits), for every
+# chapter of the index and for each act (a broad filter, searched with an ID selector). Recall is measured against an exact search over all vectors with
+# the filter applied afterwards, so it shows how many allowed hits over-fetching misses.
+# Queries are random unit vectors: no embedding model is loaded.
+
+def _top_allowed(ids: np.ndarray, allowed: set, k: int) -> List[int]:
+    return [int(i) for i in ids if i != -1 and int(i) in allowed][:k]
+
+def _time_ms(fn, queries: np.ndarray) -> Dict:
+    timings = []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        fn(queries[i:i + 1])
+        timings.append((time.perf_counter() - start) * 1000)
+    return percentiles(timings)
+
+def run_benchmark(k: int = 10, n_queries: int = 200, overfetch: int = 3) -> Dict:
+    from indexing.vector_store_utils import load_vector_store, resolve_snapshot
+    from indexing.ann_index import get_exact_index
+    from indexing.row_groups import RowGroups, SearchFilter
+
+    snapshot_dir, version = resolve_snapshot()
+    store = load_vector_store(None, snapshot_dir=snapshot_dir, version=version)
+    if store is None:
+        raise SystemExit("No index on disk. Run `python -m indexing.build_index` first.")
+    index, exact_index = store.index, get_exact_index(store.index)
+    row_groups = RowGroups.load(snapshot_dir, store)
+    chapters = sorted(row_groups.groups.get("chapter", {}), key=lambda c: len(row_groups.groups["chapter"][c]))
+    if not chapters:
+        raise SystemExit("The index has no chapter metadata. Re-run chunk_bns.py and build_index.py.")
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((n_queries, exact_index.d)).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    _, full_ranking = exact_index.search(queries, exact_index.ntotal)
+
+    filters = [("chapter", chapter, SearchFilter(chapter=chapter)) for chapter in chapters]
+    filters += [("act", act, SearchFilter(act=act)) for act in sorted(row_groups.groups.get("act", {}))]
+
+    results = []
+    for name, value, search_filter in filters:
+        rows = row_groups.select(search_filter)
+        allowed = set(rows.tolist())
+        _, filtered_ids = row_groups.search(index, queries, rows, k)
+        _, overfetch_ids = index.search(queries, k * overfetch)
+
+        filtered_recall, overfetch_recall = [], []
+        for q in range(n_queries):
+            truth = _top_allowed(full_ranking[q], allowed, k)
+            if not truth:
+                continue
+            filtered_recall.append(len(set(truth) & set(_top_allowed(filtered_ids[q], allowed, k))) / len(truth))
+            overfetch_recall.append(len(set(truth) & set(_top_allowed(overfetch_ids[q], allowed, k))) / len(truth))
+
+        results.append({
+            "filter": name,
+            "value": value,
+            "rows": len(rows),
+            "share": round(len(rows) / index.ntotal, 4),
+            "filtered_recall": round(float(np.mean(filtered_recall)), 4),
+            "overfetch_recall": round(float(np.mean(overfetch_recall)), 4),
+            "filtered_ms": _time_ms(lambda q: row_groups.search(index, q, rows, k), queries),
+            "overfetch_ms": _time_ms(lambda q: index.search(q, k * overfetch), queries),
+        })
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {"index_type": settings.INDEX_TYPE, "vector_storage": settings.VECTOR_STORAGE,
+                   "index_version": version, "vectors": int(index.ntotal), "k": k,
+                   "queries": n_queries, "overfetch": overfetch,
+                   "filter_exact_max_rows": settings.FILTER_EXACT_MAX_ROWS},
+        "unfiltered_ms": _time_ms(lambda q: index.search(q, k), queries),
+        "filters": results,
+    }
+
+def print_report(report: Dict):
+    print(f"{report['config']['vectors']} vectors ({report['config']['index_type']}, {report['config']['vector_storage']}), "
+          f"unfiltered search p50 {report['unfiltered_ms']['p50']:.3f} ms")
+    print(f"\n{'filter':<14} {'rows':>6} {'share':>6} {'recall':>7} {'over-fetch recall':>18} {'p50 ms':>7} {'over-fetch p50':>15}")
+    for row in report["filters"]:
+        print(f"{row['filter'] + ' ' + row['value']:<14} {row['rows']:>6} {row['share']:>6.1%} {row['filtered_recall']:>7.3f} "
+              f"{row['overfetch_recall']:>18.3f} {row['filtered_ms']['p50']:>7.3f} {row['overfetch_ms']['p50']:>15.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Metadata-filtered vector search vs over-fetching, per chapter and act.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="Random query vectors.")
+    parser.add_argument("--overfetch", type=int, default=3, help="Over-fetch factor of the unfiltered baseline.")
+    parser.add_argument("--output", default=None, help="JSON report path (default: benchmarks/results/filters_<time>.json).")
+    args = parser.parse_args()
+
+    report = run_benchmark(k=args.k, n_queries=args.queries, overfetch=args.overfetch)
+    print_report(report)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"filters_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {output}")
@@ -0,0 +1,118 @@
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+from benchmarks.retrieval_bench import RESULTS_DIR, percentiles
+
+# Startup cost of the entry points: `python -X importtime` per entry module (each in a fresh
+# interpreter), the slowest imports, and any heavy or ingestion-only module that got loaded
+# at import time although the serving path should only load it on demand. Also times the
+# CLI answering a plain section lookup end to end (`python main.py "IPC 302"`).
+
+ENTRY_POINTS = {
+    "cli": "main",
+    "api": "api.server",
+    "controller": "rag.answer_generator",
+}
+
+# Must not be imported just by importing an entry point: ingestion code (PDF parser, text
+# splitter) never runs at serve time, the rest is loaded when first used.
+LAZY_MODULES = (
+    "data_ingestion.load_bns_pdf", "data_ingestion.chunk_bns", "pypdf", "langchain_text_splitters",
+    "indexing.build_index", "torch", "sentence_transformers", "onnxruntime", "langchain_groq",
+    "langchain_google_genai", "langchain_core.prompts",
+)
+
+LOOKUP_QUERY = "IPC 302"
+LOOKUP_BUDGET_SECONDS = 1.0
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+def profile_import(module: str) -> Dict:
+    """Import `module` in a fresh interpreter and parse its -X importtime report."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({"module": name, "self_ms": int(self_us) / 1000,
+                            "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+
+    loaded = {m["module"] for m in modules}
+    top_level = [m for m in modules if m["depth"] == 0]
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "wall_seconds": round(wall, 3),
+        "import_ms": round(sum(m["cumulative_ms"] for m in top_level), 1),
+        "modules_loaded": len(loaded),
+        "slowest": sorted(top_level, key=lambda m: -m["cumulative_ms"])[:10],
+        "heaviest_self": sorted(modules, key=lambda m: -m["self_ms"])[:10],
+        "unexpected": sorted(loaded.intersection(LAZY_MODULES)),
+    }
+
+def time_lookup(query: str, repeat: int) -> Dict:
+    """Wall time of `python main.py <query>`, interpreter start included."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "main.py", query], capture_output=True, text=True)
+        timings.append((time.perf_counter() - started) * 1000)
+        if proc.returncode:
+            return {"query": query, "ok": False, "error": proc.stderr.strip().splitlines()[-1]}
+    return {"query": query, "ok": True, "wall_ms": percentiles(timings)}
+
+def print_report(results: List[Dict], lookup: Dict):
+    for name, row in results:
+        if not row["ok"]:
+            print(f"\n{name} ({row['module']}): import failed: {row['error']}")
+            continue
+        print(f"\n{name} ({row['module']}): {row['import_ms']:.0f} ms in imports, "
+              f"{row['wall_seconds']:.2f}s with interpreter start, {row['modules_loaded']} modules")
+        for m in row["slowest"][:5]:
+            print(f"  {m['cumulative_ms']:>8.1f} ms  {m['module']}")
+        if row["unexpected"]:
+            print(f"  Loaded at import time (should be lazy): {', '.join(row['unexpected'])}")
+
+    if lookup["ok"]:
+        p50 = lookup["wall_ms"]["p50"]
+        verdict = "within" if p50 < LOOKUP_BUDGET_SECONDS * 1000 else "OVER"
+        print(f"\n`main.py \"{lookup['query']}\"`: p50 {p50:.0f} ms, max {lookup['wall_ms']['max']:.0f} ms "
+              f"({verdict} the {LOOKUP_BUDGET_SECONDS:g}s budget)")
+    else:
+        print(f"\n`main.py \"{lookup['query']}\"` failed: {lookup['error']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time profile of the entry points and CLI lookup latency.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of the CLI lookup.")
+    parser.add_argument("--output", default=None, help="JSON report path (default: benchmarks/results/imports_<time>.json).")
+    args = parser.parse_args()
+
+    results = [(name, profile_import(module)) for name, module in ENTRY_POINTS.items()]
+    lookup = time_lookup(LOOKUP_QUERY, args.repeat)
+    print_report(results, lookup)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "entry_points": dict(results),
+        "lookup": lookup,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"imports_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {output}")
@@ -0,0 +1,247 @@
+import argparse
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+from config.settings import settings
+from benchmarks.retrieval_bench import GOLD_QUERIES, RESULTS_DIR, load_gold, percentiles
+
+# Load generator for the question-answering path: drives RAGController.answer_question
+# (in-process) or the HTTP API (--url) at a target concurrency, optionally paced to a
+# target QPS, and reports throughput, latency percentiles and errors as JSON.
+# Pair it with LLM_BACKEND=fake to size deployments without spending LLM quota.
+#
+# With --qps the load is open-loop: request i is due at start + i / qps whether or not
+# earlier ones finished, and latency is measured from that due time, so queueing
+# behind a saturated service shows up in the numbers instead of slowing the test down.
+# Without --qps, `concurrency` workers send requests back to back (closed loop).
+
+# _stream_tokens reports a failed generation inside the stream itself
+STREAM_ERROR_MARKER = "An error occurred while generating the answer: "
+
+def load_test_questions(path=None) -> List[str]:
+    if path:
+        from rag.batch import load_questions
+        return [row["question"] for row in load_questions(path)]
+    return [item["query"] for item in load_gold(GOLD_QUERIES)]
+
+# --- Targets: question -> {"error": str or None, "cached": bool, "ttft": seconds or None} ---
+
+def in_process_target(stream: bool = False) -> Callable:
+    from rag.resources import resources
+
+    controller = resources.get_controller()
+
+    def ask(question: str) -> Dict:
+        if not stream:
+            result = controller.answer_question(question)
+            return {"error": result.get("error"), "cached": result.get("cached", False), "ttft": None}
+
+        started = time.perf_counter()
+        result = controller.stream_answer(question)
+        ttft = None
+        parts = []
+        for token in result["stream"]:
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            parts.append(token)
+        _, marker, error = "".join(parts).partition(STREAM_ERROR_MARKER)
+        return {"error": error if marker else None, "cached": result.get("cached", False), "ttft": ttft}
+
+    return ask
+
+def http_target(url: str, stream: bool = False, timeout: float = 120) -> Callable:
+    endpoint = url.rstrip("/") + ("/ask/stream" if stream else "/ask")
+
+    def ask(question: str) -> Dict:
+        request = urllib.request.Request(
+            endpoint,
+            data=json.dumps({"question": question}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                if not stream:
+                    body = json.loads(response.read())
+                    return {"error": None, "cached": body.get("cached", False), "ttft": None}
+
+                ttft = None
+                cached = False
+                for line in response:
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if event["event"] == "sections":
+                        cached = event.get("cached", False)
+                    elif event["event"] == "token" and ttft is None:
+                        ttft = time.perf_counter() - started
+                    elif event["event"] == "error":
+                        return {"error": event.get("detail", "error event"), "cached": cached, "ttft": ttft}
+                return {"error": None, "cached": cached, "ttft": ttft}
+        except urllib.error.HTTPError as e:
+            return {"error": f"HTTP {e.code}", "cached": False, "ttft": None}
+        except (urllib.error.URLError, OSError) as e:
+            return {"error": e.__class__.__name__, "cached": False, "ttft": None}
+
+    return ask
+
+# --- Load generation ---
+
+def run_load(ask: Callable, questions: List[str], concurrency: int = 8, qps: float = 0,
+             duration: float = 30, max_requests: int = None) -> List[Dict]:
+    """Sends requests for `duration` seconds (or until `max_requests`); one record per request."""
+    records = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    end = start + duration
+    counter = itertools.count()
+
+    def one(i: int, due: float):
+        question = questions[i % len(questions)]
+        began = time.perf_counter()
+        try:
+            outcome = ask(question)
+        except Exception as e:
+            outcome = {"error": f"{e.__class__.__name__}: {e}", "cached": False, "ttft": None}
+        finished = time.perf_counter()
+        record = {
+            "i": i,
+            "latency": finished - due,      # includes waiting for a free worker (open loop)
+            "service": finished - began,
+            "finished": finished - start,
+            **outcome,
+        }
+        with lock:
+            records.append(record)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as pool:
+        if qps > 0:
+            for i in counter:
+                due = start + i / qps
+                if due >= end or (max_requests and i >= max_requests):
+                    break
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, i, due)
+        else:
+            def worker():
+                while True:
+                    i = next(counter)
+                    if time.perf_counter() >= end or (max_requests and i >= max_requests):
+                        return
+                    one(i, time.perf_counter())
+
+            for _ in range(concurrency):
+                pool.submit(worker)
+
+    records.sort(key=lambda r: r["i"])
+    return records
+
+def summarize(records: List[Dict], wall_seconds: float) -> Dict:
+    ok = [r for r in records if not r["error"]]
+    errors = Counter(r["error"] for r in records if r["error"])
+    latencies = [r["latency"] for r in records]
+    return {
+        "requests": len(records),
+        "ok": len(ok),
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / len(records), 4) if records else 0.0,
+        "cached": sum(1 for r in ok if r["cached"]),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds else 0.0,
+        # Little's law: average requests in flight = throughput x mean latency
+        "mean_in_flight": round(sum(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency_ms": percentiles([r["latency"] * 1000 for r in ok]),
+        "service_ms": percentiles([r["service"] * 1000 for r in ok]),
+        "ttft_ms": percentiles([r["ttft"] * 1000 for r in ok if r["ttft"] is not None]),
+        "error_kinds": dict(errors.most_common(10)),
+    }
+
+def print_report(report: Dict):
+    s = report["summary"]
+    print(f"\n{s['requests']} requests in {s['wall_seconds']}s: {s['ok']} ok, {s['errors']} failed "
+          f"({s['error_rate']:.1%}), {s['cached']} answered from cache")
+    print(f"Throughput: {s['throughput_rps']} req/s, mean in flight {s['mean_in_flight']}")
+    for name in ("latency_ms", "service_ms", "ttft_ms"):
+        values = s[name]
+        if values:
+            print(f"  {name:<11} mean {values['mean']:>9.1f}  p50 {values['p50']:>9.1f}  "
+                  f"p95 {values['p95']:>9.1f}  p99 {values['p99']:>9.1f}  max {values['max']:>9.1f}")
+    for error, count in s["error_kinds"].items():
+        print(f"  {count} x {error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test answer_question (in-process) or the HTTP API.")
+    parser.add_argument("--url", default=None, help="HTTP API base URL (default: call RAGController in-process).")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming path and measure time to first token.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at most.")
+    parser.add_argument("--qps", type=float, default=0, help="Target requests per second (0 = as fast as `concurrency` allows).")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to send requests for.")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests.")
+    parser.add_argument("--questions", default=None, help="Questions file (JSONL/CSV as for --batch; default: the gold queries).")
+    parser.add_argument("--answer-cache", action="store_true", help="In-process: keep the answer cache on (repeated questions skip the LLM).")
+    parser.add_argument("--output", default=None, help="JSON report path (default: benchmarks/results/load_<target>_<time>.json).")
+    args = parser.parse_args()
+
+    questions = load_test_questions(args.questions)
+    if not questions:
+        raise SystemExit("No questions to send.")
+
+    if args.url:
+        target = http_target(args.url, stream=args.stream)
+    else:
+        # Questions repeat during a run; without this nearly every request would be a cache hit
+        settings.ANSWER_CACHE_ENABLED = args.answer_cache
+        load_start = time.perf_counter()
+        target = in_process_target(stream=args.stream)
+        print(f"Controller ready in {time.perf_counter() - load_start:.2f}s (LLM backend: {settings.LLM_BACKEND})")
+
+    pace = f"{args.qps:g} QPS" if args.qps else "closed loop"
+    print(f"Sending {len(questions)} distinct questions for {args.duration:g}s, concurrency {args.concurrency}, {pace}...")
+    started = time.perf_counter()
+    records = run_load(target, questions, concurrency=args.concurrency, qps=args.qps,
+                       duration=args.duration, max_requests=args.requests)
+    wall = time.perf_counter() - started
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "target": args.url or "in-process",
+            "stream": args.stream,
+            "concurrency": args.concurrency,
+            "qps": args.qps,
+            "duration": args.duration,
+            "questions": len(questions),
+            "answer_cache": True if args.url else args.answer_cache,
+            "llm_backend": None if args.url else settings.LLM_BACKEND,
+        },
+        "summary": summarize(records, wall),
+    }
+    if not args.url and settings.LLM_BACKEND == "fake":
+        report["config"]["fake_llm"] = {
+            "latency": settings.FAKE_LLM_LATENCY,
+            "tokens_per_second": settings.FAKE_LLM_TOKENS_PER_SECOND,
+            "answer_tokens": settings.FAKE_LLM_ANSWER_TOKENS,
+            "error_rate": settings.FAKE_LLM_ERROR_RATE,
+            "seed": settings.FAKE_LLM_SEED,
+        }
+    if not args.url:
+        from rag.telemetry import telemetry
+        if telemetry.histograms is not None and telemetry.enabled:
+            report["stages"] = telemetry.histograms.snapshot()["stages"]
+    print_report(report)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load_{'http' if args.url else 'inprocess'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({**report, "requests": records}, f, indent=2)
+    print(f"\nSaved report to {output}")
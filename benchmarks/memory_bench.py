@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from config.settings import settings
+from rag.resources import get_rss_mb
+from benchmarks.retrieval_bench import RESULTS_DIR, percentiles
+
+# Memory per worker process for each VECTOR_STORAGE: N workers load the vector store at the
+# same time (as N Streamlit / API workers would), run searches so the vectors and chunk
+# rows are actually touched, and stay alive while their memory is read.
+#
+#   RSS  resident pages, shared ones counted in full by every process
+#   PSS  shared pages split between the processes mapping them (sum of PSS = real total)
+#   USS  pages private to the process
+#
+# With "faiss" every worker holds its own copy, so PSS ~= RSS. With "mmap" the vectors and
+# the SQLite chunk store are file pages shared by all workers, so PSS and USS drop as N grows.
+# Workers load only the vector store (no embedding model, section index or BM25), so the
+# numbers isolate what VECTOR_STORAGE changes.
+
+def read_memory_mb(pid: int) -> Dict[str, Optional[float]]:
+    """RSS / PSS / USS of a process in MB (PSS and USS need Linux or psutil)."""
+    try:
+        values = {}
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1]) / 1024
+        return {
+            "rss_mb": values.get("Rss"),
+            "pss_mb": values.get("Pss"),
+            "uss_mb": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+        }
+    except OSError:
+        pass
+
+    try:
+        import psutil
+        info = psutil.Process(pid).memory_full_info()
+        mb = 1024 * 1024
+        return {"rss_mb": info.rss / mb, "pss_mb": getattr(info, "pss", 0) / mb or None, "uss_mb": info.uss / mb}
+    except (ImportError, OSError):
+        return {"rss_mb": None, "pss_mb": None, "uss_mb": None}
+
+def worker(storage: str, searches: int):
+    """Loads the store, searches, reports, then waits on stdin until the parent has measured it."""
+    from indexing.vector_store_utils import load_vector_store
+
+    rss_before = get_rss_mb()
+    start = time.perf_counter()
+    store = load_vector_store(None, storage)
+    load_seconds = time.perf_counter() - start
+    if store is None:
+        raise SystemExit("No index on disk. Run `python -m indexing.build_index` first.")
+
+    rng = np.random.default_rng(os.getpid())
+    queries = rng.standard_normal((searches, store.index.d)).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    latencies = []
+    for i in range(searches):
+        start = time.perf_counter()
+        _, ids = store.index.search(queries[i:i + 1], 10)
+        _fetch_documents(store, [int(x) for x in ids[0] if x != -1])
+        latencies.append((time.perf_counter() - start) * 1000)
+    # Touch every chunk once, as a long-running worker eventually does
+    _fetch_documents(store, list(range(store.index.ntotal)))
+
+    print(json.dumps({
+        "pid": os.getpid(),
+        "load_seconds": round(load_seconds, 3),
+        "self_rss_before_mb": rss_before,
+        "self_rss_after_mb": get_rss_mb(),
+        "search_ms": percentiles(latencies),
+    }), flush=True)
+    sys.stdin.readline()
+
+def _fetch_documents(store, rows: List[int]):
+    if hasattr(store, "documents"):
+        return store.documents(rows)
+    return [store.docstore.search(store.index_to_docstore_id[i]) for i in rows]
+
+def measure_storage(storage: str, workers: int, searches: int) -> Dict:
+    env = {**os.environ, "VECTOR_STORAGE": storage}
+    # Export once up front so workers don't race to create the mmap store
+    subprocess.run([sys.executable, "-c", f"from indexing.vector_store_utils import load_vector_store; load_vector_store(None, {storage!r})"],
+                   check=True, env=env)
+
+    procs = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.memory_bench", "--worker", storage, "--searches", str(searches)],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+        for _ in range(workers)
+    ]
+    try:
+        reports = []
+        for proc in procs:
+            line = proc.stdout.readline()
+            if not line:
+                raise RuntimeError(f"Worker {proc.pid} exited early ({storage}).")
+            reports.append(json.loads(line))
+        # Everyone is loaded and alive: shared pages are now split between all workers
+        for report in reports:
+            report.update({key: round(value, 1) if value is not None else None
+                           for key, value in read_memory_mb(report["pid"]).items()})
+    finally:
+        for proc in procs:
+            proc.communicate(input="\n")
+
+    def total(key):
+        values = [r[key] for r in reports if r[key] is not None]
+        return round(sum(values), 1) if values else None
+
+    def mean(key):
+        values = [r[key] for r in reports if r[key] is not None]
+        return round(sum(values) / len(values), 1) if values else None
+
+    return {
+        "storage": storage,
+        "dtype": settings.VECTOR_DTYPE if storage == "mmap" else "float32",
+        "workers": workers,
+        "per_worker": {"rss_mb": mean("rss_mb"), "pss_mb": mean("pss_mb"), "uss_mb": mean("uss_mb")},
+        "total": {"rss_mb": total("rss_mb"), "pss_mb": total("pss_mb"), "uss_mb": total("uss_mb")},
+        "store_rss_mb": mean("self_rss_after_mb") - mean("self_rss_before_mb") if reports[0]["self_rss_before_mb"] is not None else None,
+        "load_seconds": round(sum(r["load_seconds"] for r in reports) / len(reports), 3),
+        "search_ms_p50": round(float(np.median([r["search_ms"]["p50"] for r in reports])), 3),
+        "workers_detail": reports,
+    }
+
+def print_report(results: List[Dict]):
+    print(f"\n{'storage':<14} {'workers':>7} {'RSS/w':>8} {'PSS/w':>8} {'USS/w':>8} {'PSS tot':>8} {'store MB':>9} {'load s':>7} {'p50 ms':>7}")
+    fmt = lambda v, width: f"{v:>{width}.1f}" if v is not None else f"{'n/a':>{width}}"
+    for row in results:
+        w = row["per_worker"]
+        print(f"{row['storage'] + ' ' + row['dtype']:<14} {row['workers']:>7} {fmt(w['rss_mb'], 8)} {fmt(w['pss_mb'], 8)} "
+              f"{fmt(w['uss_mb'], 8)} {fmt(row['total']['pss_mb'], 8)} {fmt(row['store_rss_mb'], 9)} "
+              f"{row['load_seconds']:>7.3f} {row['search_ms_p50']:>7.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-worker memory (RSS/PSS/USS) of the vector store for each VECTOR_STORAGE.")
+    parser.add_argument("--storages", default="faiss,mmap", help="Comma-separated VECTOR_STORAGE values to compare.")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes loading the store at the same time.")
+    parser.add_argument("--searches", type=int, default=200, help="Searches per worker before measuring.")
+    parser.add_argument("--output", default=None, help="JSON report path (default: benchmarks/results/memory_<time>.json).")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)  # internal: one worker process
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.searches)
+        sys.exit(0)
+
+    results = [measure_storage(storage.strip(), args.workers, args.searches)
+               for storage in args.storages.split(",") if storage.strip()]
+    print_report(results)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {"index_type": settings.INDEX_TYPE, "vector_dtype": settings.VECTOR_DTYPE,
+                   "workers": args.workers, "searches": args.searches},
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"memory_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {output}")
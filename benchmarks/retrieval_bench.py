@@ -0,0 +1,191 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from config.settings import settings
+from rag.resources import get_rss_mb
+
+# Retrieval benchmark over a gold set of queries with known BNS sections:
+# recall@k, MRR and latency percentiles for BNSRetriever.retrieve, plus load time
+# and memory, written as JSON so runs (index types, chunk sizes, caching) can be compared.
+
+BENCH_DIR = Path(__file__).resolve().parent
+GOLD_QUERIES = BENCH_DIR / "gold_queries.jsonl"
+RESULTS_DIR = BENCH_DIR / "results"
+RECALL_KS = (1, 3, 5, 10)
+
+def load_gold(path) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def ranked_sections(docs) -> List[str]:
+    """Distinct section numbers in rank order."""
+    sections = []
+    for doc in docs:
+        sec = str(doc.metadata.get("section_number", ""))
+        if sec not in sections:
+            sections.append(sec)
+    return sections
+
+def percentiles(values_ms: List[float]) -> Dict:
+    if not values_ms:
+        return {}
+    values = np.asarray(values_ms)
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+def score_rows(rows: List[Dict]) -> Dict:
+    n = len(rows)
+    if not n:
+        return {}
+    summary = {"queries": n}
+    for k in RECALL_KS:
+        summary[f"recall@{k}"] = round(sum(row["recall"][str(k)] for row in rows) / n, 4)
+    summary["mrr"] = round(sum(row["reciprocal_rank"] for row in rows) / n, 4)
+    summary["latency_ms"] = percentiles([t for row in rows for t in row["latencies_ms"]])
+    return summary
+
+def run_benchmark(gold_path=GOLD_QUERIES, k: int = 12, repeat: int = 5, warm_cache: bool = False, exact: bool = False) -> Dict:
+    from rag.query_cache import query_cache
+
+    gold = load_gold(gold_path)
+
+    # Load time / memory of everything a query needs (embedding model, FAISS, BM25, section index)
+    rss_before = get_rss_mb()
+    start = time.perf_counter()
+    from rag.retriever import BNSRetriever
+    retriever = BNSRetriever()
+    load_seconds = time.perf_counter() - start
+    rss_after = get_rss_mb()
+    if retriever.vector_store is None:
+        raise SystemExit("Index not found. Run `python -m indexing.build_index` first.")
+
+    # First query pays one-off costs (lazy model init); keep it out of the percentiles
+    start = time.perf_counter()
+    retriever.retrieve("warm up query", k=k, exact=exact)
+    first_query_ms = (time.perf_counter() - start) * 1000
+
+    rows = []
+    for item in gold:
+        expected = [str(sec) for sec in item["expected"]]
+        latencies = []
+        docs = []
+        for _ in range(repeat):
+            if not warm_cache:
+                # Measure retrieval itself, not the query cache
+                query_cache.results.clear()
+                query_cache.embeddings.clear()
+            start = time.perf_counter()
+            docs = retriever.retrieve(item["query"], k=k, exact=exact)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        sections = ranked_sections(docs)
+        first_hit = next((rank for rank, sec in enumerate(sections, 1) if sec in expected), None)
+        rows.append({
+            "query": item["query"],
+            "kind": item.get("kind", "semantic"),
+            "expected": expected,
+            "top_sections": sections[:10],
+            "first_relevant_rank": first_hit,
+            "reciprocal_rank": 1 / first_hit if first_hit else 0.0,
+            "recall": {str(n): len(set(expected) & set(sections[:n])) / len(expected) for n in RECALL_KS},
+            "latencies_ms": [round(t, 3) for t in latencies],
+        })
+
+    kinds = sorted({row["kind"] for row in rows})
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "index_type": settings.INDEX_TYPE,
+            "hybrid_search": settings.HYBRID_SEARCH,
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "index_version": retriever.index_version,
+            "vectors": retriever.vector_store.index.ntotal,
+            "chunk_size": _chunker_setting("CHUNK_SIZE"),
+            "chunk_overlap": _chunker_setting("CHUNK_OVERLAP"),
+            "k": k,
+            "repeat": repeat,
+            "warm_cache": warm_cache,
+            "exact": exact,
+            "gold_set": str(gold_path),
+            "python": platform.python_version(),
+        },
+        "load": {
+            "seconds": round(load_seconds, 3),
+            "rss_before_mb": round(rss_before, 1) if rss_before is not None else None,
+            "rss_after_mb": round(rss_after, 1) if rss_after is not None else None,
+            "first_query_ms": round(first_query_ms, 3),
+        },
+        "summary": score_rows(rows),
+        "by_kind": {kind: score_rows([row for row in rows if row["kind"] == kind]) for kind in kinds},
+        "queries": rows,
+    }
+
+def _chunker_setting(name: str):
+    from data_ingestion import chunk_bns
+    return getattr(chunk_bns, name, None)
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Metrics that dropped by more than `tolerance` compared to a previous run."""
+    regressions = []
+    for metric in [f"recall@{k}" for k in RECALL_KS] + ["mrr"]:
+        old = baseline.get("summary", {}).get(metric)
+        new = report["summary"].get(metric)
+        if old is not None and new is not None and new < old - tolerance:
+            regressions.append(f"{metric}: {old} -> {new}")
+    return regressions
+
+def print_report(report: Dict):
+    print(f"\nLoad: {report['load']['seconds']}s, RSS {report['load']['rss_before_mb']} -> {report['load']['rss_after_mb']} MB")
+    header = f"{'':<10} {'n':>4} " + " ".join(f"{'R@' + str(k):>6}" for k in RECALL_KS) + f" {'MRR':>6} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}"
+    print(header)
+    for name, summary in [("all", report["summary"])] + list(report["by_kind"].items()):
+        latency = summary["latency_ms"]
+        print(f"{name:<10} {summary['queries']:>4} "
+              + " ".join(f"{summary[f'recall@{k}']:>6.3f}" for k in RECALL_KS)
+              + f" {summary['mrr']:>6.3f} {latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f}")
+
+    misses = [row for row in report["queries"] if not row["first_relevant_rank"]]
+    if misses:
+        print(f"\nMissed ({len(misses)}):")
+        for row in misses:
+            print(f"  [{row['kind']}] {row['query']!r}: expected {row['expected']}, got {row['top_sections'][:5]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrieval benchmark: recall@k, MRR and latency over a gold query set.")
+    parser.add_argument("--gold", default=str(GOLD_QUERIES), help="Gold queries (JSONL: query, expected, kind).")
+    parser.add_argument("--k", type=int, default=12, help="Chunks retrieved per query.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query.")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the query cache between runs (measures cache hits).")
+    parser.add_argument("--exact", action="store_true", help="Brute-force search even on HNSW / IVF-PQ indexes.")
+    parser.add_argument("--output", default=None, help="JSON report path (default: benchmarks/results/retrieval_<index>_<time>.json).")
+    parser.add_argument("--baseline", default=None, help="Previous JSON report; exit 1 if recall/MRR dropped.")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed drop per metric against the baseline.")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.gold, k=args.k, repeat=args.repeat, warm_cache=args.warm_cache, exact=args.exact)
+    print_report(report)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"retrieval_{settings.INDEX_TYPE}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        if regressions:
+            print("REGRESSION against baseline: " + "; ".join(regressions))
+            sys.exit(1)
+        print("No regression against baseline.")
@@ -17,22 +17,137 @@ class Settings:
     PROCESSED_DIR = DATA_DIR / "processed"
     BNS_TEXT_JSON = PROCESSED_DIR / "bns_text.json"
     BNS_CHUNKS_JSON = PROCESSED_DIR / "bns_chunks.json"
+    # Full text of each section, stored once and referenced by section_number from the chunks
+    BNS_SECTIONS_JSON = PROCESSED_DIR / "bns_sections.json"
+    # Content hashes recorded by each pipeline stage (for incremental rebuilds)
+    EXTRACTION_STATE_JSON = PROCESSED_DIR / "extraction_state.json"
+    CHUNKING_STATE_JSON = PROCESSED_DIR / "chunking_state.json"
     
     # Vector Store
     VECTOR_STORE_DIR = DATA_DIR / "vector_store"
     COLLECTION_NAME = "bns_sections"
     
+    # Retrieval: fuse BM25 (exact legal terms) with dense similarity via reciprocal rank fusion
+    HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    
+    # Section-level results: chunk scores are combined per section ("max", "sum" or "decay")
+    # and the top SECTION_TOP_K distinct sections are returned with up to SECTION_MAX_CHUNKS chunks each
+    SECTION_TOP_K = int(os.getenv("SECTION_TOP_K", "6"))
+    SECTION_MAX_CHUNKS = int(os.getenv("SECTION_MAX_CHUNKS", "3"))
+    SECTION_AGGREGATION = os.getenv("SECTION_AGGREGATION", "decay").lower()
+    SECTION_SCORE_DECAY = float(os.getenv("SECTION_SCORE_DECAY", "0.5"))
+    
+    # Query caches (entries; TTL in seconds, 0 = no expiry)
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+    RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "86400"))
+    QUERY_CACHE_PERSIST = os.getenv("QUERY_CACHE_PERSIST", "false").lower() == "true"
+    QUERY_CACHE_PATH = DATA_DIR / "cache" / "query_cache.pkl"
+    
+    # LLM answer cache (SQLite); answers are reused for identical model + prompt + sections + question
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_PATH = DATA_DIR / "cache" / "answers.sqlite3"
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+    
+    # FAISS index type: "flat" (exact), "hnsw" or "ivfpq" (approximate, for larger corpora)
+    INDEX_TYPE = os.getenv("INDEX_TYPE", "flat").lower()
+    HNSW_M = int(os.getenv("HNSW_M", "32"))
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = auto (~sqrt of the number of chunks)
+    IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+    PQ_M = int(os.getenv("PQ_M", "16"))  # sub-quantizers, must divide the embedding size (384)
+    PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))
+    REFINE_K_FACTOR = float(os.getenv("REFINE_K_FACTOR", "4"))  # IVF-PQ candidates re-ranked exactly
+    INDEX_TRAIN_SIZE = int(os.getenv("INDEX_TRAIN_SIZE", "50000"))  # vectors buffered to train IVF-PQ
+    # Filtered search: filters allowing at most this many rows are scored exactly over those
+    # rows; broader ones search the live index with an ID selector (see indexing/row_groups.py)
+    FILTER_EXACT_MAX_ROWS = int(os.getenv("FILTER_EXACT_MAX_ROWS", "4096"))
+    
+    # How query-time processes hold the vectors: "faiss" (FAISS.load_local, a private copy per
+    # process) or "mmap" (VECTOR_DTYPE vectors memory-mapped + read-only SQLite chunk store,
+    # one page-cached copy shared by all workers; exact search, see indexing/mmap_store.py)
+    VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "faiss").lower()
+    VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float16").lower()  # "float16" or "int8"
+
+    # Builds write versioned snapshots and switch manifest.json atomically (indexing/snapshots.py).
+    # Running servers check the manifest every INDEX_WATCH_INTERVAL seconds and swap to a new
+    # snapshot in the background (0 disables the watcher: reload on the next request instead).
+    INDEX_WATCH_INTERVAL = float(os.getenv("INDEX_WATCH_INTERVAL", "5"))
+    INDEX_SNAPSHOTS_KEEP = int(os.getenv("INDEX_SNAPSHOTS_KEEP", "2"))  # older snapshots are pruned
+    
+    # Prompt size: retrieved sections are added until the context reaches this many tokens
+    # (llama3-8b-8192 has an 8192 token window shared by the system prompt, context and answer)
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+    TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+    
+    # Batch answering (python main.py --batch): parallel LLM calls, questions retrieved per batch
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+    BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
+    
+    # Per-stage timing of the pipeline (rag/telemetry.py); sinks: "log" (JSON line per request),
+    # "histogram" (in-process, exposed at the API's /metrics in Prometheus format)
+    TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "false").lower() == "true"
+    TELEMETRY_SINKS = os.getenv("TELEMETRY_SINKS", "log,histogram")
+    # Level of the pipeline's log records (DEBUG also logs each IPC -> BNS mapping used)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    
+    # HTTP API (api/server.py)
+    API_HOST = os.getenv("API_HOST", "0.0.0.0")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    API_RETRIEVAL_WORKERS = int(os.getenv("API_RETRIEVAL_WORKERS", "4"))  # threads for retrieval (FAISS releases the GIL)
+    API_MAX_IN_FLIGHT = int(os.getenv("API_MAX_IN_FLIGHT", "64"))  # further requests get a 503
+    API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "60"))  # seconds, retrieval + generation
+    API_SHUTDOWN_GRACE = float(os.getenv("API_SHUTDOWN_GRACE", "20"))  # seconds to let in-flight requests finish
+    
     # Mappings
     MAPPINGS_DIR = DATA_DIR / "mappings"
     IPC_BNS_CSV = MAPPINGS_DIR / "ipc_bns_mapping.csv"
     
     # Embeddings: Using sentence-transformers (runs locally - FREE!)
-    EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Fast, lightweight, free
+    EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # Fast, lightweight, free
+    # Index build: chunks per encode call, and CPU worker processes (0 = cores - 1)
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))
+    # Embedding runtime: "torch" (sentence-transformers), "onnx" or "onnx-int8" (onnxruntime, no torch
+    # import; run `python -m indexing.onnx_embeddings` once to fetch / quantize the model)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    ONNX_MODEL_DIR = DATA_DIR / "models" / "minilm-onnx"
+    EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "256"))  # all-MiniLM-L6-v2's max_seq_length
+    # An index built with another backend is reused only if both give (nearly) the same probe vectors;
+    # otherwise EMBEDDING_MISMATCH decides: "rebuild" the index, raise an "error", or "warn" and go on
+    EMBEDDING_COMPAT_MIN_COSINE = float(os.getenv("EMBEDDING_COMPAT_MIN_COSINE", "0.98"))
+    EMBEDDING_MISMATCH = os.getenv("EMBEDDING_MISMATCH", "rebuild").lower()
     
     # LLM: Using Groq API (High Speed!)
     GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-8b-8192")
     
+    # LLM backend (rag/llm_backends.py): "router" (LLM_PROVIDERS with retries/failover), "groq"
+    # (a single client), or "fake" for a local stand-in (load tests, offline runs)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "router").lower()
+    # Router (rag/llm_router.py): providers in preference order; ones without an API key are skipped
+    LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "groq,gemini")
+    LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "20"))  # seconds per attempt (to the first token when streaming)
+    LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))  # seconds per call, retries and failover included
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # per provider, timeouts / 429 / 5xx only
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+    LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+    LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))  # seconds before a slow call is also sent to the next provider (0 = off)
+    LLM_HEALTH_ALPHA = float(os.getenv("LLM_HEALTH_ALPHA", "0.2"))  # EWMA weight of the latest latency / error
+    LLM_FAILURE_THRESHOLD = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))  # consecutive failures before a cooldown
+    LLM_COOLDOWN = float(os.getenv("LLM_COOLDOWN", "30"))
+    LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+    # Fake LLM: seconds before the first token, tokens per second after it, answer length,
+    # share of calls that fail, and the seed that makes latencies/errors reproducible
+    FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))
+    FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "250"))
+    FAKE_LLM_ANSWER_TOKENS = int(os.getenv("FAKE_LLM_ANSWER_TOKENS", "200"))
+    FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+    FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+    
     # Legacy Gemini support
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
@@ -1,3 +1,14 @@
+# Re-exports are resolved on first access so that importing one submodule (or
+# just checking staleness) doesn't load the PDF parser and the text splitter.
+_EXPORTS = {
+    "run_extraction": "load_bns_pdf",
+    "extraction_is_stale": "load_bns_pdf",
+    "run_chunking": "chunk_bns",
+    "chunking_is_stale": "chunk_bns",
+}
 
-from .load_bns_pdf import run_extraction
-from .chunk_bns import run_chunking
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    return getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
@@ -1,9 +1,39 @@
 
 import json
+import sys
 import re
 from typing import List, Dict
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from config.settings import settings
+from indexing.content_hash import hash_file, hash_json, file_signature, load_state, save_state
+
+# Chunker parameters. They are hashed into the chunking state, so changing any
+# of them (or bumping CHUNKER_VERSION after editing the section logic) re-chunks.
+CHUNKER_VERSION = 2
+CHUNK_SIZE = 1200
+CHUNK_OVERLAP = 250
+CHUNK_SEPARATORS = ["\n\n", "\n", "Explanation", "Illustration", ". ", " ", ""]
+
+# Every chunk is tagged with its act and chapter, for filtered retrieval (indexing/row_groups.py)
+ACT = "BNS"
+CHAPTER_HEADING = re.compile(r"^CHAPTER\s+([IVXLC]+)\s*\n\s*([^\n]+)", re.MULTILINE)
+
+def get_chunker_hash() -> str:
+    return hash_json({
+        "version": CHUNKER_VERSION,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "separators": CHUNK_SEPARATORS
+    })
+
+def chunking_is_stale() -> bool:
+    """Cheap check: has the extracted text or the chunker changed since the last run?"""
+    state = load_state(settings.CHUNKING_STATE_JSON)
+    return (
+        not settings.BNS_CHUNKS_JSON.exists()
+        or not settings.BNS_SECTIONS_JSON.exists()
+        or state.get("chunker_hash") != get_chunker_hash()
+        or state.get("input_signature") != file_signature(settings.BNS_TEXT_JSON)
+    )
 
 def load_processed_text():
     if not settings.BNS_TEXT_JSON.exists():
@@ -12,7 +42,23 @@ def load_processed_text():
     with open(settings.BNS_TEXT_JSON, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def run_chunking():
+def run_chunking(force: bool = False):
+    if not force and not chunking_is_stale():
+        print(f"Chunking up to date ({settings.BNS_CHUNKS_JSON}).")
+        return
+
+    state = load_state(settings.CHUNKING_STATE_JSON)
+    input_hash = hash_file(settings.BNS_TEXT_JSON) if settings.BNS_TEXT_JSON.exists() else None
+    chunker_hash = get_chunker_hash()
+    if (not force and input_hash and state.get("input_sha256") == input_hash
+            and state.get("chunker_hash") == chunker_hash
+            and settings.BNS_CHUNKS_JSON.exists() and settings.BNS_SECTIONS_JSON.exists()):
+        # Extraction re-ran but produced identical text
+        state["input_signature"] = file_signature(settings.BNS_TEXT_JSON)
+        save_state(settings.CHUNKING_STATE_JSON, state)
+        print("Extracted text unchanged, chunking up to date.")
+        return
+
     pages = load_processed_text()
     
     print("Processing pages and identifying sections...")
@@ -51,12 +97,22 @@ def run_chunking():
         "title": "Preliminary",
         "text": "",
         "start_page": 1,
-        "end_page": 1
+        "end_page": 1,
+        "chapter": None,
+        "chapter_title": None
     }
-    
+    # A "CHAPTER XVII / OF OFFENCES AGAINST PROPERTY" heading ends up in the text of the
+    # section before it, and applies to the sections that follow
+    current_chapter = (None, None)
+
     section_offset = 0
     # First part is text before any section
     for i, part in enumerate(parts):
+        if i % 2 == 0:
+            headings = CHAPTER_HEADING.findall(part)
+            if headings:
+                current_chapter = (headings[-1][0], headings[-1][1].strip())
+
         if i == 0:
             current_section["text"] += part
             section_offset += len(part)
@@ -93,7 +149,9 @@ def run_chunking():
                     "title": f"Section {sec_num}",
                     "text": part, # Start with the "103."
                     "start_page": get_page_for_idx(section_offset),
-                    "end_page": get_page_for_idx(section_offset)
+                    "end_page": get_page_for_idx(section_offset),
+                    "chapter": current_chapter[0],
+                    "chapter_title": current_chapter[1]
                 }
         else:
             current_section["text"] += part
@@ -111,15 +169,21 @@ def run_chunking():
     print(f"Sample section numbers found: {debug_nums}")
 
     # Sub-chunking
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1200,
-        chunk_overlap=250,
-        separators=["\n\n", "\n", "Explanation", "Illustration", ". ", " ", ""]
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=CHUNK_SEPARATORS
     )
     
     final_chunks = []
+    section_store = {}
+    # Chunk numbering continues when a section number is detected twice, so ids stay unique
+    chunk_counts = {}
     for sec in all_sections:
         chunks = text_splitter.split_text(sec["text"])
+        first_chunk_no = chunk_counts.get(sec["number"], 0)
+        chunk_counts[sec["number"]] = first_chunk_no + len(chunks)
         for i, chunk_text in enumerate(chunks):
             # Refine title: look for the first line or first sentence
             title = sec["title"]
@@ -131,16 +195,36 @@ def run_chunking():
                 if not title: title = f"Section {sec['number']}"
 
             final_chunks.append({
-                "id": f"sec_{sec['number']}_chunk_{i}",
+                "id": f"sec_{sec['number']}_chunk_{first_chunk_no + i}",
                 "text": chunk_text,
                 "metadata": {
                     "section_number": sec["number"],
                     "section_title": title,
                     "page_range": f"{sec['start_page']}-{sec['end_page']}",
                     "start_page": sec["start_page"],
-                    "full_section_text": sec["text"]
+                    "act": ACT,
+                    "chapter": sec["chapter"],
+                    "chapter_title": sec["chapter_title"]
                 }
             })
+
+            # Full section text is stored once per section (see indexing/section_store.py)
+            # instead of being copied into every chunk's metadata.
+            if i == 0:
+                if sec["number"] in section_store:
+                    # Same number detected twice (e.g. a numbered list inside a section): keep it together
+                    entry = section_store[sec["number"]]
+                    entry["text"] += "\n" + sec["text"]
+                    entry["end_page"] = sec["end_page"]
+                    entry["page_range"] = f"{entry['start_page']}-{sec['end_page']}"
+                else:
+                    section_store[sec["number"]] = {
+                        "title": title,
+                        "text": sec["text"],
+                        "page_range": f"{sec['start_page']}-{sec['end_page']}",
+                        "start_page": sec["start_page"],
+                        "end_page": sec["end_page"]
+                    }
             
     print(f"Created {len(final_chunks)} chunks.")
     
@@ -149,5 +233,18 @@ def run_chunking():
         
     print(f"Saved chunks to {settings.BNS_CHUNKS_JSON}")
 
+    with open(settings.BNS_SECTIONS_JSON, "w", encoding="utf-8") as f:
+        json.dump(section_store, f, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"Saved {len(section_store)} sections to {settings.BNS_SECTIONS_JSON}")
+
+    # The whole text is re-chunked (a regex split, fast); build_index works out which
+    # sections actually changed and re-embeds only those
+    save_state(settings.CHUNKING_STATE_JSON, {
+        "input_signature": file_signature(settings.BNS_TEXT_JSON),
+        "input_sha256": input_hash,
+        "chunker_hash": chunker_hash
+    })
+
 if __name__ == "__main__":
-    run_chunking()
+    run_chunking(force="--force" in sys.argv)
@@ -1,10 +1,18 @@
 
 import json
+import sys
 import re
-from langchain_community.document_loaders import PyPDFLoader
+from pathlib import Path
 from config.settings import settings
+from indexing.content_hash import hash_file, file_signature, load_state, save_state
+
+# Bump when clean_page_text changes so existing extractions are redone
+CLEANER_VERSION = 1
 
 def load_pdf(pdf_path):
+    # Imported here: the staleness check and everything else in this module run without pypdf
+    from langchain_community.document_loaders import PyPDFLoader
+
     print(f"Loading PDF from: {pdf_path}")
     loader = PyPDFLoader(str(pdf_path))
     pages = loader.load()
@@ -33,32 +41,69 @@ def clean_page_text(text):
         
     return "\n".join(cleaned_lines)
 
-def run_extraction():
+def extraction_is_stale() -> bool:
+    """Cheap check (no PDF parsing): has the PDF or the cleaning logic changed since the last run?"""
+    state = load_state(settings.EXTRACTION_STATE_JSON)
+    pdf_path = Path(settings.BNS_PDF_PATH)
+    return (
+        not settings.BNS_TEXT_JSON.exists()
+        or state.get("cleaner_version") != CLEANER_VERSION
+        or state.get("source_signature") != file_signature(pdf_path)
+    )
+
+def run_extraction(force: bool = False):
     if not settings.BNS_PDF_PATH:
          print("Error: BNS_PDF_PATH not set.")
          return
 
+    pdf_path = Path(settings.BNS_PDF_PATH)
+    if not force and not extraction_is_stale():
+        print(f"Extraction up to date ({settings.BNS_TEXT_JSON}).")
+        return
+
+    state = load_state(settings.EXTRACTION_STATE_JSON)
     try:
-        pages = load_pdf(settings.BNS_PDF_PATH)
+        pdf_hash = hash_file(pdf_path)
+    except OSError as e:
+        print(f"Error loading PDF: {e}")
+        return
+
+    # Same bytes (file was only touched/copied): just refresh the signature
+    if (not force and settings.BNS_TEXT_JSON.exists() and state.get("pdf_sha256") == pdf_hash
+            and state.get("cleaner_version") == CLEANER_VERSION):
+        state["source_signature"] = file_signature(pdf_path)
+        save_state(settings.EXTRACTION_STATE_JSON, state)
+        print("PDF content unchanged, extraction up to date.")
+        return
+
+    try:
+        pages = load_pdf(pdf_path)
     except Exception as e:
         print(f"Error loading PDF: {e}")
         return
 
+    # Every page is re-extracted: parsing the PDF is the cost, and cleaning is cheap. Only
+    # embedding is incremental (per section, see indexing/build_index.py).
     processed_data = []
-    
     for page in pages:
-        cleaned_text = clean_page_text(page.page_content)
+        page_number = page.metadata.get("page", 0) + 1 # 1-indexed
         processed_data.append({
-            "page_number": page.metadata.get("page", 0) + 1, # 1-indexed
-            "text": cleaned_text
+            "page_number": page_number,
+            "text": clean_page_text(page.page_content)
         })
-        
+
     # Save to JSON
     settings.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     with open(settings.BNS_TEXT_JSON, "w", encoding="utf-8") as f:
         json.dump(processed_data, f, indent=2, ensure_ascii=False)
+
+    save_state(settings.EXTRACTION_STATE_JSON, {
+        "source_signature": file_signature(pdf_path),
+        "pdf_sha256": pdf_hash,
+        "cleaner_version": CLEANER_VERSION
+    })
     
     print(f"Saved {len(processed_data)} pages to {settings.BNS_TEXT_JSON}")
 
 if __name__ == "__main__":
-    run_extraction()
+    run_extraction(force="--force" in sys.argv)
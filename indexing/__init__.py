@@ -1,2 +1,12 @@
+# Resolved on first access: `import indexing.section_store` at serve time must not
+# pull in the index build (FAISS docstore, embedding workers) through this package.
+_EXPORTS = {
+    "run_indexing": "build_index",
+    "indexing_is_stale": "build_index",
+}
 
-from .build_index import run_indexing
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    return getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
@@ -0,0 +1,165 @@
+import json
+import math
+import time
+import faiss
+import numpy as np
+from typing import Dict, Optional, Tuple
+from config.settings import settings
+from indexing.snapshots import get_snapshot_dir
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+def get_index_params_path(snapshot_dir=None):
+    return (snapshot_dir or get_snapshot_dir()) / "index_params.json"
+
+def get_index_report_path(snapshot_dir=None):
+    return (snapshot_dir or get_snapshot_dir()) / "index_report.json"
+
+def create_faiss_index(index_type: str, dim: int, n_vectors: int) -> Tuple[object, Dict]:
+    """
+    Builds an empty FAISS index of the configured type.
+
+    flat  - exact brute-force L2 (default; fine for BNS alone)
+    hnsw  - graph-based ANN; keeps the raw vectors so exact search stays possible
+    ivfpq - inverted lists + product quantization, wrapped in a flat refine
+            stage (re-ranks with raw vectors and doubles as the exact index)
+
+    Returns (index, params); params are persisted next to the index and
+    re-applied at load time.
+    """
+    index_type = index_type.lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown INDEX_TYPE '{index_type}'. Expected one of {INDEX_TYPES}.")
+
+    params = {"index_type": index_type, "dim": dim, "n_vectors": n_vectors}
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim), params
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, settings.HNSW_M)
+        index.hnsw.efConstruction = settings.HNSW_EF_CONSTRUCTION
+        params.update({
+            "hnsw_m": settings.HNSW_M,
+            "ef_construction": settings.HNSW_EF_CONSTRUCTION,
+            "ef_search": settings.HNSW_EF_SEARCH,
+        })
+        return index, params
+
+    # ivfpq: ~sqrt(N) lists unless configured; PQ codebooks need ~39 training points per centroid
+    nlist = settings.IVF_NLIST or max(1, int(math.sqrt(n_vectors)))
+    nlist = min(nlist, max(1, n_vectors // 39))
+    pq_m = settings.PQ_M if dim % settings.PQ_M == 0 else 8
+    pq_nbits = settings.PQ_NBITS
+    if n_vectors < 39 * 2 ** pq_nbits:
+        pq_nbits = max(4, min(pq_nbits, int(math.log2(max(n_vectors // 39, 16)))))
+
+    quantizer = faiss.IndexFlatL2(dim)
+    ivfpq = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits)
+    index = faiss.IndexRefineFlat(ivfpq)
+    params.update({
+        "nlist": nlist,
+        "nprobe": min(settings.IVF_NPROBE, nlist),
+        "pq_m": pq_m,
+        "pq_nbits": pq_nbits,
+        "k_factor": settings.REFINE_K_FACTOR,
+    })
+    return index, params
+
+def needs_training(index) -> bool:
+    return not index.is_trained
+
+def apply_search_params(index, params: Optional[Dict]):
+    """Re-applies query-time knobs (efSearch / nprobe / k_factor) after loading."""
+    if not params:
+        return
+    index_type = params.get("index_type", "flat")
+    if index_type == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = params["ef_search"]
+    elif index_type == "ivfpq":
+        refine = faiss.downcast_index(index)
+        refine.k_factor = params["k_factor"]
+        faiss.downcast_index(refine.base_index).nprobe = params["nprobe"]
+
+def get_exact_index(index):
+    """
+    A brute-force view over the same vectors (same ids), for exact search.
+    HNSW keeps its vectors in a flat storage index; IVF-PQ is wrapped in a
+    flat refine index. Both share memory with the ANN index.
+    """
+    if not isinstance(index, faiss.Index):
+        return index  # already brute force (MmapFlatIndex)
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.downcast_index(index.storage)
+    if isinstance(index, faiss.IndexRefine):
+        return faiss.downcast_index(index.refine_index)
+    return index
+
+def save_index_params(params: Dict, path=None):
+    path = path or get_index_params_path()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=2)
+
+def load_index_params(path=None) -> Optional[Dict]:
+    path = path or get_index_params_path()
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def recall_latency_report(index, params: Dict, k: int = 10, n_queries: int = 200) -> Dict:
+    """
+    Recall@k of the approximate index against exact search, plus per-query latency,
+    for a sweep of the main query-time knob. Queries are a sample of the indexed vectors.
+    """
+    exact_index = get_exact_index(index)
+    n_vectors = exact_index.ntotal
+    rng = np.random.default_rng(0)
+    sample = rng.choice(n_vectors, size=min(n_queries, n_vectors), replace=False)
+    queries = np.ascontiguousarray(exact_index.reconstruct_batch(sample), dtype="float32")
+    k = min(k, n_vectors)
+
+    _, truth = exact_index.search(queries, k)
+
+    def measure(search_index, label, value):
+        latencies = []
+        found = 0
+        for i in range(len(queries)):
+            start = time.perf_counter()
+            _, ids = search_index.search(queries[i:i + 1], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found += len(set(ids[0]) & set(truth[i]))
+        latencies.sort()
+        return {
+            label: value,
+            f"recall_at_{k}": round(found / (len(queries) * k), 4),
+            "mean_ms": round(sum(latencies) / len(latencies), 4),
+            "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 4),
+        }
+
+    index_type = params["index_type"]
+    rows = []
+    if index_type == "hnsw":
+        hnsw = faiss.downcast_index(index)
+        for ef in sorted({16, 32, 64, 128, 256, params["ef_search"]}):
+            hnsw.hnsw.efSearch = ef
+            rows.append(measure(index, "ef_search", ef))
+    elif index_type == "ivfpq":
+        ivf = faiss.downcast_index(faiss.downcast_index(index).base_index)
+        for nprobe in sorted({1, 2, 4, 8, 16, 32, params["nprobe"]}):
+            if nprobe > params["nlist"]:
+                continue
+            ivf.nprobe = nprobe
+            rows.append(measure(index, "nprobe", nprobe))
+    # Baseline: brute force over the same vectors
+    rows.append(measure(exact_index, "search", "exact"))
+
+    # Restore the configured knobs after the sweep
+    apply_search_params(index, params)
+    return {"params": params, "n_queries": len(queries), "k": k, "results": rows}
+
+def save_index_report(report: Dict, path=None):
+    path = path or get_index_report_path()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
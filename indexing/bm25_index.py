@@ -0,0 +1,136 @@
+import heapq
+import logging
+import math
+import pickle
+import re
+from array import array
+from typing import Dict, List, Set, Tuple, Optional
+from config.settings import settings
+from indexing.snapshots import get_snapshot_dir
+
+logger = logging.getLogger(__name__)
+
+# Very common words carry no signal for legal lookups
+STOPWORDS = {
+    "a", "an", "and", "any", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "he", "her", "his", "if", "in", "into", "is", "it", "its", "of", "on", "or", "shall",
+    "she", "such", "that", "the", "their", "there", "this", "to", "under", "was", "which",
+    "who", "whoever", "with", "what", "when", "where", "how", "explain", "section", "bns", "ipc"
+}
+
+def _stem(token: str) -> str:
+    # Light suffix stripping so "furnishing"/"furnishes"/"furnished" share a posting list
+    for suffix in ("ing", "ies", "ed", "es", "s"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[: -len(suffix)] + ("y" if suffix == "ies" else "")
+    return token
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS]
+
+def get_bm25_index_path(snapshot_dir=None):
+    return (snapshot_dir or get_snapshot_dir()) / "bm25_index.pkl"
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunk texts.
+
+    Postings are stored as flat typed arrays (one doc-index array and one
+    term-frequency array, sliced per term through an offsets array) instead of
+    dicts of lists, which keeps the index small and scoring well under a millisecond.
+    """
+
+    def __init__(self, doc_ids, doc_lengths, vocab, offsets, postings_docs, postings_tfs, k1=1.5, b=0.75):
+        self.doc_ids = doc_ids                # list[str]: chunk id per doc index
+        self.doc_lengths = doc_lengths        # array('I')
+        self.vocab = vocab                    # term -> term index
+        self.offsets = offsets                # array('I'), len(vocab) + 1
+        self.postings_docs = postings_docs    # array('I')
+        self.postings_tfs = postings_tfs      # array('H')
+        self.k1 = k1
+        self.b = b
+
+        n_docs = len(doc_ids)
+        self.avg_doc_length = (sum(doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf = array("f", (
+            math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for df in (offsets[i + 1] - offsets[i] for i in range(len(vocab)))
+        ))
+
+    @classmethod
+    def build(cls, chunks_data, k1=1.5, b=0.75) -> "BM25Index":
+        doc_ids = []
+        doc_lengths = array("I")
+        term_postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for doc_idx, chunk in enumerate(chunks_data):
+            doc_ids.append(chunk["id"])
+            # Title helps for chunks that don't repeat the offence name in their body
+            tokens = tokenize(chunk["metadata"].get("section_title", "") + "\n" + chunk["text"])
+            doc_lengths.append(len(tokens))
+
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term_postings.setdefault(token, []).append((doc_idx, min(tf, 65535)))
+
+        vocab = {}
+        offsets = array("I", [0])
+        postings_docs = array("I")
+        postings_tfs = array("H")
+        for term in sorted(term_postings):
+            vocab[term] = len(vocab)
+            for doc_idx, tf in term_postings[term]:
+                postings_docs.append(doc_idx)
+                postings_tfs.append(tf)
+            offsets.append(len(postings_docs))
+
+        return cls(doc_ids, doc_lengths, vocab, offsets, postings_docs, postings_tfs, k1, b)
+
+    def search(self, query: str, k: int = 10, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Returns up to k (chunk_id, bm25_score) pairs, best first; only chunks in `allowed` if given."""
+        scores: Dict[int, float] = {}
+        k1, b, avg_len = self.k1, self.b, self.avg_doc_length or 1.0
+        doc_lengths, docs, tfs = self.doc_lengths, self.postings_docs, self.postings_tfs
+
+        for token in set(tokenize(query)):
+            term_idx = self.vocab.get(token)
+            if term_idx is None:
+                continue
+            idf = self.idf[term_idx]
+            for p in range(self.offsets[term_idx], self.offsets[term_idx + 1]):
+                doc_idx = docs[p]
+                tf = tfs[p]
+                norm = k1 * (1 - b + b * doc_lengths[doc_idx] / avg_len)
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        if allowed is not None:
+            scores = {doc_idx: score for doc_idx, score in scores.items() if self.doc_ids[doc_idx] in allowed}
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[doc_idx], score) for doc_idx, score in best]
+
+    def save(self, path=None):
+        path = path or get_bm25_index_path()
+        state = {
+            "doc_ids": self.doc_ids,
+            "doc_lengths": self.doc_lengths,
+            "vocab": self.vocab,
+            "offsets": self.offsets,
+            "postings_docs": self.postings_docs,
+            "postings_tfs": self.postings_tfs,
+            "k1": self.k1,
+            "b": self.b,
+        }
+        with open(path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path=None) -> Optional["BM25Index"]:
+        path = path or get_bm25_index_path()
+        if not path.exists():
+            logger.warning("BM25 index not found at %s. Run build_index.py to create it.", path)
+            return None
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        return cls(**state)
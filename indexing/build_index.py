@@ -1,34 +1,270 @@
-
 import json
-from indexing.vector_store_utils import get_embedding_model, build_documents_from_chunks
-from langchain_community.vectorstores import FAISS
+import shutil
+import sys
+import numpy as np
+from typing import Dict, List
+from indexing.vector_store_utils import (
+    get_embedding_model, build_documents_from_chunks, get_index_path, create_or_load_vector_store,
+    embeddings_compatible, save_embedding_probe, get_embedding_probe_path
+)
+from indexing.mmap_store import export_mmap_store, get_mmap_store_dir
+from indexing.snapshots import new_snapshot_version, create_staging_dir, discard_staging_dir, promote_snapshot, get_snapshot_dir
+from indexing.section_index import build_section_index, save_section_index, get_section_index_path
+from indexing.bm25_index import BM25Index, get_bm25_index_path
+from indexing.row_groups import build_row_groups, store_rows, save_row_groups, get_row_groups_path
+from indexing.ann_index import (
+    create_faiss_index, needs_training, apply_search_params, save_index_params, get_index_params_path,
+    recall_latency_report, save_index_report, get_index_report_path
+)
+from indexing.embed_workers import embed_in_batches, resolve_worker_count, ProgressReporter
+from indexing.content_hash import hash_json, hash_file, file_signature, load_state, save_state
 from config.settings import settings
+from rag.telemetry import configure_logging
+
+def get_index_state_path():
+    return settings.VECTOR_STORE_DIR / "index_state.json"
+
+def indexing_is_stale() -> bool:
+    """
+    Cheap check: have the chunks, the embedding model or the index type changed since the last build?
+    (Switching EMBEDDING_BACKEND also encodes a few probe texts, see embeddings_compatible.)
+    """
+    state = load_state(get_index_state_path())
+    return (
+        not get_index_path().exists()
+        or state.get("input_signature") != file_signature(settings.BNS_CHUNKS_JSON)
+        or state.get("embedding_model") != settings.EMBEDDING_MODEL
+        or state.get("index_type") != settings.INDEX_TYPE
+        or not embeddings_compatible()[0]
+    )
+
+def group_chunks_by_section(chunks_data) -> Dict[str, List[Dict]]:
+    grouped = {}
+    for chunk in chunks_data:
+        grouped.setdefault(str(chunk["metadata"]["section_number"]), []).append(chunk)
+    return grouped
+
+def _add_chunks(vector_store, docs, embeddings, index_params=None):
+    """
+    Embeds docs in batches and streams the vectors into the store.
+    A new index is created on the first batch if the store has none yet (its
+    parameters go into `index_params`); an untrained one (IVF-PQ) buffers
+    vectors until there are enough to train it.
+    """
+    texts = [doc.page_content for doc in docs]
+    metadatas = [doc.metadata for doc in docs]
+    ids = [doc.metadata["id"] for doc in docs]
+    batch_size = settings.EMBED_BATCH_SIZE
+    workers = resolve_worker_count(settings.EMBED_WORKERS, len(texts), batch_size)
+    print(f"Embedding {len(texts)} chunks (batch size {batch_size}, {workers} worker process(es))...")
+
+    # Vectors waiting for the index to be trained (IVF-PQ only)
+    pending = []
+    pending_count = 0
+    added = 0
+    progress = ProgressReporter(len(texts))
+
+    # Vectors are streamed into the index batch by batch instead of materialising them all
+    for vectors in embed_in_batches(texts, settings.EMBEDDING_MODEL, batch_size, workers, embeddings, settings.EMBEDDING_BACKEND):
+        if vector_store.index is None:
+            # Create FAISS index of the configured type (flat / hnsw / ivfpq)
+            index, params = create_faiss_index(settings.INDEX_TYPE, vectors.shape[1], len(texts))
+            if index_params is not None:
+                index_params.update(params)
+            vector_store.index = index
+
+        pending.append(vectors)
+        pending_count += len(vectors)
+        progress.update(len(vectors))
+
+        if needs_training(vector_store.index):
+            if pending_count < min(settings.INDEX_TRAIN_SIZE, len(texts)):
+                continue
+            print(f"\n  Training {settings.INDEX_TYPE} index on {pending_count} vectors...")
+            vector_store.index.train(np.concatenate(pending))
+
+        for batch in pending:
+            end = added + len(batch)
+            vector_store.add_embeddings(
+                text_embeddings=list(zip(texts[added:end], batch.tolist())),
+                metadatas=metadatas[added:end],
+                ids=ids[added:end]
+            )
+            added = end
+        pending = []
+        pending_count = 0
+
+    progress.finish()
+
+def _export_for_storage(vector_store, snapshot_dir, version):
+    """Ships the mmap store inside the snapshot, so workers don't export it on first load (VECTOR_STORAGE=mmap)."""
+    if settings.VECTOR_STORAGE == "mmap":
+        export_mmap_store(vector_store, version, store_dir=get_mmap_store_dir(snapshot_dir))
+
+def _save_row_groups(vector_store, snapshot_dir):
+    """Index rows per section / chapter / act, for filtered search (indexing/row_groups.py)."""
+    save_row_groups(build_row_groups(store_rows(vector_store)), get_row_groups_path(snapshot_dir))
+
+def _build_full_index(docs, embeddings, snapshot_dir, version):
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=None, # Created once the embedding size is known
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={}
+    )
+    index_params = {}
+    _add_chunks(vector_store, docs, embeddings, index_params=index_params)
+    apply_search_params(vector_store.index, index_params)
+
+    # Save the index and its tuning parameters
+    index_path = get_index_path(snapshot_dir)
+    vector_store.save_local(str(index_path))
+    save_index_params(index_params, get_index_params_path(snapshot_dir))
+    _export_for_storage(vector_store, snapshot_dir, version)
+    _save_row_groups(vector_store, snapshot_dir)
+    # Lets other embedding backends check they can query this index
+    save_embedding_probe(embeddings, get_embedding_probe_path(snapshot_dir))
+
+    print(f"Successfully indexed {len(docs)} documents into {index_path} ({settings.INDEX_TYPE})")
+
+    # Recall-vs-latency of the chosen index type against exact search
+    report = recall_latency_report(vector_store.index, index_params)
+    save_index_report(report, get_index_report_path(snapshot_dir))
+    for row in report["results"]:
+        print(f"  {row}")
+    print(f"Saved recall/latency report to {get_index_report_path(snapshot_dir)}")
 
-def run_indexing():
+def _update_index(chunks_by_section, changed, removed, old_chunk_ids, embeddings, snapshot_dir, version) -> bool:
+    """
+    Applies section-level deletes and adds to a copy of the served index, saved into snapshot_dir.
+    Returns False if the index type can't remove vectors (e.g. HNSW), so the caller rebuilds.
+    """
+    # Updates need the FAISS store itself, whatever VECTOR_STORAGE serves queries
+    current_dir = get_snapshot_dir()
+    vector_store, _ = create_or_load_vector_store(storage="faiss")
+    if vector_store is None:
+        return False
+
+    stale_ids = [chunk_id for sec in list(changed) + list(removed) for chunk_id in old_chunk_ids.get(sec, [])]
+    existing_ids = set(vector_store.index_to_docstore_id.values())
+    stale_ids = [chunk_id for chunk_id in stale_ids if chunk_id in existing_ids]
+    try:
+        if stale_ids:
+            vector_store.delete(stale_ids)
+    except (RuntimeError, ValueError) as e:
+        print(f"Index type '{settings.INDEX_TYPE}' does not support in-place deletes ({e}).")
+        return False
+
+    new_chunks = [chunk for sec in changed for chunk in chunks_by_section[sec]]
+    if new_chunks:
+        _add_chunks(vector_store, build_documents_from_chunks(new_chunks), embeddings)
+
+    vector_store.save_local(str(get_index_path(snapshot_dir)))
+    # Tuning parameters, probe and recall report are unchanged by an update
+    for get_path in (get_index_params_path, get_embedding_probe_path, get_index_report_path):
+        if get_path(current_dir).exists():
+            shutil.copy2(get_path(current_dir), get_path(snapshot_dir))
+    _export_for_storage(vector_store, snapshot_dir, version)
+    _save_row_groups(vector_store, snapshot_dir)
+    print(f"Updated index: -{len(stale_ids)} / +{len(new_chunks)} chunks "
+          f"({len(changed)} section(s) changed, {len(removed)} removed).")
+    return True
+
+def _build_snapshot(chunks_data, chunks_by_section, embeddings, can_update, changed, removed, old_chunk_ids):
+    """
+    Writes a complete index (vectors, section index, BM25) into a staging directory and
+    promotes it as the new snapshot; running servers pick it up (see indexing/snapshots.py).
+    """
+    version = new_snapshot_version()
+    snapshot_dir = create_staging_dir(version)
+    try:
+        updated = can_update and _update_index(chunks_by_section, changed, removed, old_chunk_ids, embeddings, snapshot_dir, version)
+        if not updated:
+            print("Initializing Vector Store (this may take time as it generates embeddings)...")
+            _build_full_index(build_documents_from_chunks(chunks_data), embeddings, snapshot_dir, version)
+
+        # Exact-match lookup table for direct section queries ("BNS 103", "IPC 302")
+        section_index = build_section_index(chunks_data)
+        save_section_index(section_index, get_section_index_path(snapshot_dir))
+        print(f"Saved section index ({len(section_index)} sections) to {get_section_index_path(snapshot_dir)}")
+
+        # Lexical index for hybrid (BM25 + dense) retrieval
+        bm25 = BM25Index.build(chunks_data)
+        bm25.save(get_bm25_index_path(snapshot_dir))
+        print(f"Saved BM25 index ({len(bm25.vocab)} terms) to {get_bm25_index_path(snapshot_dir)}")
+    except BaseException:
+        # A failed build never becomes visible: the current snapshot keeps serving
+        discard_staging_dir(snapshot_dir)
+        raise
+
+    promote_snapshot(snapshot_dir, version, {
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "embedding_backend": settings.EMBEDDING_BACKEND,
+        "index_type": settings.INDEX_TYPE,
+        "chunks_sha256": hash_file(settings.BNS_CHUNKS_JSON),
+        "chunks": len(chunks_data),
+        "sections": len(chunks_by_section),
+    })
+
+def run_indexing(force: bool = False):
     if not settings.BNS_CHUNKS_JSON.exists():
         print(f"Chunks file not found at {settings.BNS_CHUNKS_JSON}. Run chunk_bns.py first.")
         return
 
+    if not force and not indexing_is_stale():
+        print(f"Index up to date ({get_index_path()}).")
+        return
+
     print("Loading chunks...")
     with open(settings.BNS_CHUNKS_JSON, "r", encoding="utf-8") as f:
         chunks_data = json.load(f)
-    
+
     print(f"Loaded {len(chunks_data)} chunks.")
-    
-    docs = build_documents_from_chunks(chunks_data)
+    if not chunks_data:
+        print("No chunks to index.")
+        return
+
+    # Per-section content hash over the chunk texts + metadata (covers chunker changes too)
+    chunks_by_section = group_chunks_by_section(chunks_data)
+    section_hashes = {sec: hash_json(chunks) for sec, chunks in chunks_by_section.items()}
+
     embeddings = get_embedding_model()
-    
-    print("Initializing Vector Store (this may take time as it generates embeddings)...")
     settings.VECTOR_STORE_DIR.mkdir(parents=True, exist_ok=True)
-    
-    # Create FAISS index from documents
-    vector_store = FAISS.from_documents(docs, embeddings)
-    
-    # Save the index
-    index_path = settings.VECTOR_STORE_DIR / "faiss_index"
-    vector_store.save_local(str(index_path))
-    
-    print(f"Successfully indexed {len(docs)} documents into {index_path}")
+
+    state = load_state(get_index_state_path())
+    can_update = (
+        not force
+        and get_index_path().exists()
+        and state.get("embedding_model") == settings.EMBEDDING_MODEL
+        and state.get("index_type") == settings.INDEX_TYPE
+        and "sections" in state
+        # New vectors must match the ones already in the index
+        and embeddings_compatible(embeddings)[0]
+    )
+
+    changed, removed = [], []
+    if can_update:
+        old_hashes = state["sections"]
+        changed = [sec for sec, h in section_hashes.items() if old_hashes.get(sec) != h]
+        removed = [sec for sec in old_hashes if sec not in section_hashes]
+
+    if can_update and not changed and not removed:
+        print("No section changed, keeping the existing index.")
+    else:
+        _build_snapshot(chunks_data, chunks_by_section, embeddings, can_update, changed, removed, state.get("chunk_ids", {}))
+
+    save_state(get_index_state_path(), {
+        "input_signature": file_signature(settings.BNS_CHUNKS_JSON),
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "index_type": settings.INDEX_TYPE,
+        "sections": section_hashes,
+        "chunk_ids": {sec: [chunk["id"] for chunk in chunks] for sec, chunks in chunks_by_section.items()}
+    })
 
 if __name__ == "__main__":
-    run_indexing()
+    # Snapshot promotion and the mmap export report through logging
+    configure_logging()
+    run_indexing(force="--force" in sys.argv)
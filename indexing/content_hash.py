@@ -0,0 +1,42 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+# Helpers for the incremental pipeline: each stage (extraction, chunking,
+# indexing) records what its inputs looked like and skips work that is
+# already up to date.
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def hash_json(obj) -> str:
+    return hash_text(json.dumps(obj, sort_keys=True, ensure_ascii=False))
+
+def hash_file(path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_signature(path) -> Optional[Dict]:
+    """Size + mtime: a cheap "did it change?" check before hashing the whole file."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def load_state(path) -> Dict:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(path, state: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import time
+import numpy as np
+from typing import Iterator, List, Sequence
+
+# Set in each worker process by _init_worker
+_worker_model = None
+
+def _init_worker(model_name: str, threads_per_worker: int, backend: str = "torch"):
+    global _worker_model
+    if backend != "torch":
+        # onnxruntime: same encode() interface, threads set on its session
+        from indexing.onnx_embeddings import OnnxEmbeddings
+        _worker_model = OnnxEmbeddings(quantized=backend == "onnx-int8", threads=threads_per_worker)
+        return
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Without this every worker spins up one torch thread per core and they fight each other
+    torch.set_num_threads(threads_per_worker)
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    # Same defaults as HuggingFaceEmbeddings.embed_documents, so vectors match query-time encoding
+    return _worker_model.encode(texts, batch_size=len(texts), convert_to_numpy=True).astype("float32")
+
+def iter_batches(items: Sequence, batch_size: int) -> Iterator[List]:
+    for start in range(0, len(items), batch_size):
+        yield list(items[start:start + batch_size])
+
+def resolve_worker_count(requested: int, n_texts: int, batch_size: int) -> int:
+    """0 = auto. A pool only pays off when every worker gets a few batches."""
+    workers = requested or max(1, (os.cpu_count() or 1) - 1)
+    return max(1, min(workers, n_texts // (batch_size * 2)))
+
+def embed_in_batches(texts: Sequence[str], model_name: str, batch_size: int, workers: int,
+                     embeddings=None, backend: str = "torch") -> Iterator[np.ndarray]:
+    """
+    Yields float32 embedding batches in input order, so callers can add them to
+    the index as they arrive instead of holding every vector in memory.
+
+    With workers > 1 the batches are spread over a pool of CPU processes, each
+    with its own copy of the model; otherwise `embeddings` (the shared
+    in-process model) is used.
+    """
+    batches = iter_batches(texts, batch_size)
+
+    if workers <= 1:
+        for batch in batches:
+            yield np.asarray(embeddings.embed_documents(batch), dtype="float32")
+        return
+
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    # spawn: torch is not fork-safe, and it is the only option on Windows anyway
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(model_name, threads_per_worker, backend)) as pool:
+        for vectors in pool.imap(_embed_batch, batches):
+            yield vectors
+
+class ProgressReporter:
+    """Prints '<done>/<total> chunks (<rate> chunks/s)' on one line as batches complete."""
+
+    def __init__(self, total: int, label: str = "Embedded"):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.start = time.perf_counter()
+
+    def update(self, n: int):
+        self.done += n
+        print(f"\r  {self.label} {self.done}/{self.total} chunks ({self.rate():.1f} chunks/s)", end="", flush=True)
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.start
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def finish(self) -> float:
+        elapsed = time.perf_counter() - self.start
+        print()
+        print(f"  {self.label} {self.done} chunks in {elapsed:.1f}s ({self.rate():.1f} chunks/s)")
+        return elapsed
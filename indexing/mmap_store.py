@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+from indexing.snapshots import get_snapshot_dir
+
+logger = logging.getLogger(__name__)
+
+# Read-only vector store that worker processes share through the OS page cache.
+#
+# FAISS.load_local gives every process its own heap copy of the float32 vectors and of the
+# unpickled docstore, so N Streamlit / API workers hold N copies. Here the vectors are
+# stored as float16 (or int8 with a scale per vector) in a .npy file opened with mmap, and
+# the chunk text + metadata in a SQLite file opened read-only: both are mapped from the
+# same file pages in every process. Search is brute force over the mapped vectors (same
+# squared L2 distances as IndexFlatL2), in blocks so the float32 working set stays small.
+#
+# Layout (<index snapshot>/mmap_store/, see indexing/snapshots.py):
+#   store.json                   current version, dtype, count, dim
+#   vectors-<version>.npy        (n, dim) float16 / int8
+#   norms-<version>.npy          (n,) float32 squared norms of the stored vectors
+#   scales-<version>.npy         (n,) float32, int8 only
+#   chunks-<version>.sqlite3     row -> chunk id, text, metadata JSON
+#
+# Files are written under temporary names and renamed into place, and store.json last,
+# so a process opening the store never sees a half-written version; processes that still
+# map an older version keep reading it until they reload.
+
+VECTOR_DTYPES = ("float16", "int8")
+
+# Rows per matmul block: 16k x 384 float32 is ~25MB of scratch per search
+SEARCH_BLOCK_ROWS = 16384
+
+def get_mmap_store_dir(snapshot_dir=None):
+    return (snapshot_dir or get_snapshot_dir()) / "mmap_store"
+
+def _read_manifest(store_dir) -> Optional[Dict]:
+    path = store_dir / "store.json"
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def mmap_store_is_current(version: str, dtype: str = None, store_dir=None) -> bool:
+    """True if the store on disk was exported from index `version` with the configured dtype."""
+    manifest = _read_manifest(store_dir or get_mmap_store_dir())
+    return bool(manifest) and manifest["version"] == version and manifest["dtype"] == (dtype or settings.VECTOR_DTYPE)
+
+def encode_vectors(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(codes, scales): float16 codes, or int8 codes with v ~= codes * scale per row."""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown VECTOR_DTYPE '{dtype}'. Expected one of {VECTOR_DTYPES}.")
+
+def export_mmap_store(vector_store, version: str, dtype: str = None, store_dir=None):
+    """Writes the vectors and chunks of a LangChain FAISS store as mmap store version `version`."""
+    from indexing.ann_index import get_exact_index
+
+    dtype = (dtype or settings.VECTOR_DTYPE).lower()
+    store_dir = store_dir or get_mmap_store_dir()
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tmp = f".tmp-{os.getpid()}"
+
+    # The flat view holds the raw vectors for every index type (see get_exact_index)
+    exact_index = get_exact_index(vector_store.index)
+    n = exact_index.ntotal
+    vectors = exact_index.reconstruct_n(0, n) if n else np.zeros((0, exact_index.d), dtype=np.float32)
+    codes, scales = encode_vectors(np.asarray(vectors, dtype=np.float32), dtype)
+    decoded = codes.astype(np.float32) * (scales[:, None] if scales is not None else 1.0)
+    # Norms of what is stored, so distances are consistent with the stored vectors
+    norms = (decoded ** 2).sum(axis=1).astype(np.float32)
+
+    arrays = {"vectors": codes, "norms": norms}
+    if scales is not None:
+        arrays["scales"] = scales
+    for name, array in arrays.items():
+        path = store_dir / f"{name}-{version}.npy"
+        with open(f"{path}{tmp}", "wb") as f:
+            np.save(f, array)
+        os.replace(f"{path}{tmp}", path)
+
+    chunks_path = store_dir / f"chunks-{version}.sqlite3"
+    conn = sqlite3.connect(f"{chunks_path}{tmp}")
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS chunks")
+            conn.execute("CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL)")
+            rows = []
+            for row, docstore_id in sorted(vector_store.index_to_docstore_id.items()):
+                doc = vector_store.docstore.search(docstore_id)
+                rows.append((row, docstore_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False)))
+            conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
+    os.replace(f"{chunks_path}{tmp}", chunks_path)
+
+    manifest = {"version": version, "dtype": dtype, "count": int(n), "dim": int(exact_index.d), "files": sorted(
+        [f"{name}-{version}.npy" for name in arrays] + [chunks_path.name]
+    )}
+    with open(store_dir / f"store.json{tmp}", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(store_dir / f"store.json{tmp}", store_dir / "store.json")
+
+    _remove_old_versions(store_dir, keep=set(manifest["files"]))
+    size_mb = sum((store_dir / name).stat().st_size for name in manifest["files"]) / (1024 * 1024)
+    logger.info("Exported %d vectors (%s) to %s (%.1f MB)", n, dtype, store_dir, size_mb)
+
+def _remove_old_versions(store_dir, keep):
+    for path in store_dir.iterdir():
+        if path.name in keep or path.name == "store.json" or ".tmp-" in path.name:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            pass  # still mapped by a process on a platform that doesn't allow deleting it (Windows)
+
+class MmapFlatIndex:
+    """Exact L2 search over memory-mapped float16 / int8 vectors; `search` matches faiss.Index.search."""
+
+    def __init__(self, vectors: np.ndarray, norms: np.ndarray, scales: Optional[np.ndarray] = None):
+        self.vectors = vectors
+        self.norms = norms
+        self.scales = scales
+        self.ntotal = vectors.shape[0]
+        self.d = vectors.shape[1]
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.asarray(queries, dtype=np.float32)
+        m = queries.shape[0]
+        distances = np.full((m, k), np.inf, dtype=np.float32)
+        indices = np.full((m, k), -1, dtype=np.int64)
+        if self.ntotal == 0 or k <= 0:
+            return distances, indices
+
+        dots = np.empty((m, self.ntotal), dtype=np.float32)
+        for start in range(0, self.ntotal, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, self.ntotal)
+            block = queries @ self.vectors[start:end].astype(np.float32).T
+            if self.scales is not None:
+                block *= self.scales[start:end]
+            dots[:, start:end] = block
+        # ||q - v||^2 = ||q||^2 + ||v||^2 - 2 q.v
+        all_distances = (queries ** 2).sum(axis=1)[:, None] + self.norms[None, :] - 2 * dots
+        np.maximum(all_distances, 0, out=all_distances)
+
+        top = min(k, self.ntotal)
+        candidates = np.argpartition(all_distances, top - 1, axis=1)[:, :top]
+        candidate_distances = np.take_along_axis(all_distances, candidates, axis=1)
+        order = np.argsort(candidate_distances, axis=1, kind="stable")
+        distances[:, :top] = np.take_along_axis(candidate_distances, order, axis=1)
+        indices[:, :top] = np.take_along_axis(candidates, order, axis=1)
+        return distances, indices
+
+    def reconstruct_batch(self, rows) -> np.ndarray:
+        """Decoded float32 vectors of the given rows (faiss.Index.reconstruct_batch)."""
+        vectors = self.vectors[np.asarray(rows, dtype=np.int64)].astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[np.asarray(rows, dtype=np.int64)][:, None]
+        return vectors
+
+class MmapVectorStore:
+    """
+    The current mmap store version: `index` for search (faiss-compatible `search`/`ntotal`)
+    and `documents(rows)` for the chunks at the returned row ids.
+    """
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir or get_mmap_store_dir()
+        manifest = _read_manifest(self.store_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No mmap vector store at {self.store_dir}. Run `python -m indexing.build_index` with VECTOR_STORAGE=mmap.")
+        self.version = manifest["version"]
+        self.dtype = manifest["dtype"]
+
+        def load(name):
+            path = self.store_dir / f"{name}-{self.version}.npy"
+            return np.load(path, mmap_mode="r") if path.exists() else None
+
+        self.index = MmapFlatIndex(load("vectors"), load("norms"), load("scales"))
+
+        # immutable=1: no locking or change detection, the file is never modified in place
+        chunks_path = (self.store_dir / f"chunks-{self.version}.sqlite3").resolve()
+        self._conn = sqlite3.connect(f"{chunks_path.as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def documents(self, rows: List[int]) -> List:
+        """Fresh Documents for the given row ids, in the same order (None for an unknown row)."""
+        from langchain_core.documents import Document
+
+        if not rows:
+            return []
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            found = {
+                row: (text, metadata)
+                for row, text, metadata in self._conn.execute(
+                    f"SELECT row, text, metadata FROM chunks WHERE row IN ({placeholders})", [int(r) for r in rows]
+                )
+            }
+        return [
+            Document(page_content=found[row][0], metadata=json.loads(found[row][1])) if row in found else None
+            for row in (int(r) for r in rows)
+        ]
+
+    def rows_metadata(self):
+        """(row, chunk id, metadata) of every stored chunk."""
+        with self._lock:
+            rows = self._conn.execute("SELECT row, id, metadata FROM chunks ORDER BY row").fetchall()
+        return [(row, chunk_id, json.loads(metadata)) for row, chunk_id, metadata in rows]
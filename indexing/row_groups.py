@@ -0,0 +1,249 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+import faiss
+import numpy as np
+from typing import Dict, Iterable, Optional, Set, Tuple
+from config.settings import settings
+from indexing.ann_index import get_exact_index
+from indexing.snapshots import get_snapshot_dir
+
+logger = logging.getLogger(__name__)
+
+# Metadata-filtered vector search. At build time the index rows are grouped by section,
+# chapter and act (row_groups.json in the index snapshot). A filtered query turns its
+# filters into the sorted row ids they allow and only considers those vectors, instead of
+# over-fetching from the whole index and dropping what doesn't match:
+#   - up to FILTER_EXACT_MAX_ROWS rows (a section, a chapter): brute force over the allowed
+#     vectors, exact. Their decoded matrix is cached per row set, so repeated filters don't
+#     reconstruct it again.
+#   - broader filters (a whole act): the live index is searched with a FAISS ID selector,
+#     so they cost no more than an unfiltered search (approximate on HNSW / IVF-PQ, like it).
+#     The mmap store has no selectors; it is brute force anyway, over the allowed rows only.
+
+# Decoded vectors kept for small filters, per snapshot (~6 MB per 4096 rows at 384 dims)
+MATRIX_CACHE_ROWS = 65536
+# ID selectors kept for broad filters, per snapshot
+SELECTOR_CACHE_SIZE = 32
+
+# Filter name -> chunk metadata field
+GROUP_FIELDS = {"section": "section_number", "chapter": "chapter", "act": "act"}
+
+ROMAN_NUMERALS = ((1000, "M"), (900, "CM"), (500, "D"), (400, "CD"), (100, "C"), (90, "XC"),
+                  (50, "L"), (40, "XL"), (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I"))
+
+def get_row_groups_path(snapshot_dir=None):
+    return (snapshot_dir or get_snapshot_dir()) / "row_groups.json"
+
+def normalize_chapter(chapter) -> str:
+    """Chapter number as a roman numeral: "xvii", "Chapter XVII" and 17 all give "XVII"."""
+    text = str(chapter).strip().upper()
+    if text.startswith("CHAPTER"):
+        text = text[len("CHAPTER"):].strip()
+    if text.isdigit():
+        number, text = int(text), ""
+        for value, numeral in ROMAN_NUMERALS:
+            while number >= value:
+                text += numeral
+                number -= value
+    return text
+
+class SearchFilter:
+    """
+    Metadata constraints for a retrieval: any of sections=["103", "104"], chapter="XVII",
+    section_range=(303, 334) and act="BNS". A chunk must match all of them.
+    """
+
+    def __init__(self, sections=None, chapter=None, section_range=None, act=None):
+        self.sections = frozenset(str(s) for s in sections) if sections is not None else None
+        self.chapter = normalize_chapter(chapter) if chapter is not None else None
+        self.section_range = (int(section_range[0]), int(section_range[1])) if section_range is not None else None
+        self.act = str(act).upper() if act is not None else None
+
+    def __bool__(self):
+        return self.key() != (None, None, None, None)
+
+    def key(self) -> Tuple:
+        """Hashable form, for cache keys."""
+        return (tuple(sorted(self.sections)) if self.sections is not None else None,
+                self.chapter, self.section_range, self.act)
+
+    def allows_section(self, section_number) -> bool:
+        section_number = str(section_number)
+        if self.sections is not None and section_number not in self.sections:
+            return False
+        if self.section_range is not None:
+            if not section_number.isdigit():
+                return False
+            return self.section_range[0] <= int(section_number) <= self.section_range[1]
+        return True
+
+    def matches(self, metadata: Dict) -> bool:
+        return (
+            self.allows_section(metadata.get("section_number", ""))
+            and (self.chapter is None or metadata.get("chapter") == self.chapter)
+            and (self.act is None or metadata.get("act") == self.act)
+        )
+
+def build_row_groups(rows: Iterable[Tuple[int, str, Dict]]) -> Dict:
+    """{"chunk_ids": [...], "groups": {filter: {value: [row, ...]}}} from (row, chunk id, metadata)."""
+    chunk_ids = {}
+    groups = {name: {} for name in GROUP_FIELDS}
+    for row, chunk_id, metadata in rows:
+        chunk_ids[int(row)] = chunk_id
+        for name, field in GROUP_FIELDS.items():
+            value = metadata.get(field)
+            if value is not None:
+                groups[name].setdefault(str(value), []).append(int(row))
+    n = max(chunk_ids) + 1 if chunk_ids else 0
+    return {
+        "chunk_ids": [chunk_ids.get(row) for row in range(n)],
+        "groups": {name: {value: sorted(rows) for value, rows in values.items()} for name, values in groups.items()},
+    }
+
+def store_rows(vector_store) -> Iterable[Tuple[int, str, Dict]]:
+    """(row, chunk id, metadata) for every vector of a FAISS or mmap store."""
+    if hasattr(vector_store, "rows_metadata"):
+        return vector_store.rows_metadata()
+    return (
+        (row, chunk_id, vector_store.docstore.search(chunk_id).metadata)
+        for row, chunk_id in vector_store.index_to_docstore_id.items()
+    )
+
+def save_row_groups(row_groups: Dict, path=None):
+    path = path or get_row_groups_path()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(row_groups, f)
+
+class RowGroups:
+    """Sorted index rows per section / chapter / act, and the allowed rows of a SearchFilter."""
+
+    def __init__(self, row_groups: Dict):
+        self.chunk_ids = row_groups["chunk_ids"]
+        self.groups = {
+            name: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+            for name, values in row_groups["groups"].items()
+        }
+        self._warned = set()
+        self._lock = threading.Lock()
+        self._matrices = OrderedDict()  # rows bytes -> float32 vectors, LRU
+        self._matrix_rows = 0
+        self._selectors = OrderedDict()  # rows bytes -> faiss.IDSelectorBatch, LRU
+
+    @classmethod
+    def load(cls, snapshot_dir=None, vector_store=None) -> "RowGroups":
+        """From the snapshot, or computed from the store for indexes built before row groups."""
+        path = get_row_groups_path(snapshot_dir)
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        return cls(build_row_groups(store_rows(vector_store) if vector_store is not None else []))
+
+    def _group(self, name: str, values: Iterable[str]) -> np.ndarray:
+        groups = self.groups.get(name, {})
+        if not groups and name not in self._warned:
+            self._warned.add(name)
+            logger.warning("No '%s' metadata in the index; re-run chunk_bns.py and build_index.py to filter by it.", name)
+        arrays = [groups[value] for value in values if value in groups]
+        return np.unique(np.concatenate(arrays)) if arrays else np.zeros(0, dtype=np.int64)
+
+    def select(self, search_filter: SearchFilter) -> Optional[np.ndarray]:
+        """Sorted rows matching every constraint of the filter (None if it has none)."""
+        if not search_filter:
+            return None
+        selected = []
+        if search_filter.sections is not None or search_filter.section_range is not None:
+            sections = [value for value in self.groups.get("section", {}) if search_filter.allows_section(value)]
+            selected.append(self._group("section", sections))
+        if search_filter.chapter is not None:
+            selected.append(self._group("chapter", [search_filter.chapter]))
+        if search_filter.act is not None:
+            selected.append(self._group("act", [search_filter.act]))
+
+        rows = selected[0]
+        for other in selected[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def chunk_ids_at(self, rows: np.ndarray) -> Set[str]:
+        return {self.chunk_ids[row] for row in rows if row < len(self.chunk_ids) and self.chunk_ids[row]}
+
+    def search(self, index, queries: np.ndarray, rows: np.ndarray, k: int, exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k over the given rows (from select) of `index`, the live FAISS / mmap index:
+        (distances, row ids) like faiss.Index.search, padded with -1.
+        """
+        exact_index = get_exact_index(index)
+        if len(rows) <= settings.FILTER_EXACT_MAX_ROWS or not isinstance(exact_index, faiss.Index):
+            return search_rows(exact_index, queries, rows, k, vectors=self._vectors(exact_index, rows))
+        return search_selected(exact_index if exact else index, queries, rows, k, selector=self._selector(rows))
+
+    def _vectors(self, exact_index, rows: np.ndarray) -> Optional[np.ndarray]:
+        """Decoded vectors of a small row set, cached (None for sets too large to cache)."""
+        if len(rows) > settings.FILTER_EXACT_MAX_ROWS:
+            return None
+        key = np.asarray(rows, dtype=np.int64).tobytes()
+        with self._lock:
+            vectors = self._matrices.get(key)
+            if vectors is not None:
+                self._matrices.move_to_end(key)
+                return vectors
+
+        vectors = np.ascontiguousarray(exact_index.reconstruct_batch(rows), dtype=np.float32)
+        with self._lock:
+            if key not in self._matrices:
+                self._matrices[key] = vectors
+                self._matrix_rows += len(rows)
+            while self._matrix_rows > MATRIX_CACHE_ROWS and len(self._matrices) > 1:
+                _, evicted = self._matrices.popitem(last=False)
+                self._matrix_rows -= len(evicted)
+        return vectors
+
+    def _selector(self, rows: np.ndarray):
+        key = np.asarray(rows, dtype=np.int64).tobytes()
+        with self._lock:
+            selector = self._selectors.get(key)
+            if selector is None:
+                selector = self._selectors[key] = faiss.IDSelectorBatch(np.asarray(rows, dtype=np.int64))
+                if len(self._selectors) > SELECTOR_CACHE_SIZE:
+                    self._selectors.popitem(last=False)
+            self._selectors.move_to_end(key)
+        return selector
+
+def search_rows(index, queries: np.ndarray, rows: np.ndarray, k: int, vectors: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact L2 search over the given rows of a flat index (faiss.IndexFlat or MmapFlatIndex):
+    (distances, row ids) like faiss.Index.search, padded with -1. Costs O(len(rows)), not O(ntotal).
+    `vectors` are the rows' vectors if already reconstructed.
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    distances = np.full((queries.shape[0], k), np.inf, dtype=np.float32)
+    indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+    top = min(k, len(rows))
+    if top <= 0:
+        return distances, indices
+
+    if vectors is None:
+        vectors = np.ascontiguousarray(index.reconstruct_batch(rows), dtype=np.float32)
+    distances[:, :top], positions = faiss.knn(queries, vectors, top)
+    indices[:, :top] = np.asarray(rows, dtype=np.int64)[positions]
+    return distances, indices
+
+def search_selected(index, queries: np.ndarray, rows: np.ndarray, k: int, selector=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    faiss.Index.search restricted to the given rows by an ID selector, keeping the index's
+    query-time knobs (efSearch / nprobe / k_factor). Flat, HNSW and IVF-PQ + refine indexes.
+    """
+    selector = selector or faiss.IDSelectorBatch(np.asarray(rows, dtype=np.int64))
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    elif isinstance(index, faiss.IndexRefine):
+        base = faiss.downcast_index(index.base_index)
+        params = faiss.IndexRefineSearchParameters(
+            k_factor=index.k_factor, base_index_params=faiss.SearchParametersIVF(sel=selector, nprobe=base.nprobe)
+        )
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(np.ascontiguousarray(queries, dtype=np.float32), k, params=params)
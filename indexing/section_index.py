@@ -0,0 +1,63 @@
+import json
+import logging
+from typing import Dict, List, Optional
+from config.settings import settings
+from indexing.snapshots import get_snapshot_dir
+
+logger = logging.getLogger(__name__)
+
+def get_section_index_path(snapshot_dir=None):
+    return (snapshot_dir or get_snapshot_dir()) / "section_index.json"
+
+def build_section_index(chunks_data) -> Dict[str, Dict]:
+    """
+    Exact-match index: section number -> its chunks in document order.
+    Built at indexing time so direct lookups ("BNS 103", "IPC 302") never touch the embedding model.
+    """
+    index = {}
+    for chunk in chunks_data:
+        metadata = chunk["metadata"]
+        sec_num = str(metadata["section_number"])
+        entry = index.setdefault(sec_num, {
+            "section_title": metadata.get("section_title", f"Section {sec_num}"),
+            "page_range": metadata.get("page_range", ""),
+            "chunks": []
+        })
+        entry["chunks"].append({"id": chunk["id"], "text": chunk["text"], "metadata": metadata})
+    return index
+
+def save_section_index(index: Dict[str, Dict], path=None):
+    path = path or get_section_index_path()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+
+class SectionIndex:
+    def __init__(self, path=None):
+        self.path = path or get_section_index_path()
+        self.sections = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.sections = json.load(f)
+        else:
+            logger.warning("Section index not found at %s. Run build_index.py to create it.", self.path)
+
+        # chunk id -> chunk, for materialising lexical (BM25) hits
+        self.chunks_by_id = {
+            chunk["id"]: chunk
+            for entry in self.sections.values()
+            for chunk in entry["chunks"]
+        }
+
+    def __contains__(self, section_number) -> bool:
+        return str(section_number) in self.sections
+
+    def get_chunks(self, section_number) -> List[Dict]:
+        entry = self.sections.get(str(section_number))
+        return entry["chunks"] if entry else []
+
+    def get_chunk(self, chunk_id) -> Optional[Dict]:
+        return self.chunks_by_id.get(chunk_id)
+
+    def get_title(self, section_number) -> Optional[str]:
+        entry = self.sections.get(str(section_number))
+        return entry["section_title"] if entry else None
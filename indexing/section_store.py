@@ -0,0 +1,64 @@
+import json
+import logging
+import threading
+from typing import Dict, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class SectionStore:
+    """
+    Full text of every BNS section, keyed by section number.
+
+    Chunks only carry `section_number`; the full text is looked up here when a
+    citation or prompt actually needs it, so it lives once in memory instead of
+    once per chunk in the FAISS docstore.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.BNS_SECTIONS_JSON
+        self.sections = self._load()
+        self._mtime = self._get_mtime()
+
+    def _get_mtime(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path.exists():
+            logger.warning("Section store not found at %s. Run chunk_bns.py to create it.", self.path)
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def is_stale(self) -> bool:
+        return self._get_mtime() != self._mtime
+
+    def get(self, section_number) -> Optional[Dict]:
+        return self.sections.get(str(section_number).strip())
+
+    def get_text(self, section_number) -> Optional[str]:
+        section = self.get(section_number)
+        return section["text"] if section else None
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_section_store() -> SectionStore:
+    """Process-wide store, loaded on first use and reloaded if the file is rewritten."""
+    global _store
+    with _store_lock:
+        if _store is None or _store.is_stale():
+            _store = SectionStore()
+    return _store
+
+def resolve_section_text(doc) -> str:
+    """Full text of the section a chunk belongs to (falls back to the chunk itself)."""
+    # Indexes built before the section store still carry the text inline
+    if "full_section_text" in doc.metadata:
+        return doc.metadata["full_section_text"]
+
+    text = get_section_store().get_text(doc.metadata.get("section_number", ""))
+    return text if text is not None else doc.page_content
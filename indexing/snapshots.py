@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Versioned index snapshots. Every build writes a complete, new snapshot (FAISS index,
+# section index, BM25, probe, mmap store) into a staging directory, renames it into
+# VECTOR_STORE_DIR/snapshots/<version>/ and only then points manifest.json at it:
+#
+#   vector_store/
+#     manifest.json              {"version", "path", "embedding_model", "chunks_sha256", ...}
+#     index_state.json           build bookkeeping (incremental updates), not served
+#     snapshots/<version>/       faiss_index/, section_index.json, bm25_index.pkl, ...
+#
+# Both renames are atomic, so a reader resolving paths through the manifest sees either
+# the old snapshot or the new one, never a half-written index. Snapshots are immutable
+# once promoted (the lazily exported mmap store is itself written atomically); the last
+# INDEX_SNAPSHOTS_KEEP are kept so processes still serving an older one can finish.
+#
+# Indexes built before snapshots have no manifest and live directly in VECTOR_STORE_DIR;
+# they are served from there until the next build.
+
+SNAPSHOTS_DIR_NAME = "snapshots"
+STAGING_PREFIX = ".staging-"
+
+def get_manifest_path():
+    return settings.VECTOR_STORE_DIR / "manifest.json"
+
+def get_snapshots_dir():
+    return settings.VECTOR_STORE_DIR / SNAPSHOTS_DIR_NAME
+
+# (file key, manifest), replaced as a whole so concurrent readers never see a mix
+_manifest_cache = (None, None)
+
+def read_manifest() -> Optional[Dict]:
+    """The current manifest (None for a pre-snapshot index); re-read only when the file changes."""
+    global _manifest_cache
+    path = get_manifest_path()
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    cached_key, manifest = _manifest_cache
+    if cached_key != key:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        _manifest_cache = (key, manifest)
+    return manifest
+
+def get_snapshot_dir(manifest: Optional[Dict] = None) -> Path:
+    """Directory holding the served index: the manifest's snapshot, or VECTOR_STORE_DIR without one."""
+    manifest = manifest or read_manifest()
+    if manifest is None:
+        return settings.VECTOR_STORE_DIR
+    return settings.VECTOR_STORE_DIR / manifest["path"]
+
+def new_snapshot_version() -> str:
+    # Sorts by creation time; the suffix keeps two builds in the same second apart
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+def create_staging_dir(version: str) -> Path:
+    staging_dir = get_snapshots_dir() / f"{STAGING_PREFIX}{version}"
+    staging_dir.mkdir(parents=True, exist_ok=False)
+    return staging_dir
+
+def discard_staging_dir(staging_dir: Path):
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+def promote_snapshot(staging_dir: Path, version: str, info: Dict) -> Dict:
+    """Makes a fully written staging directory the served snapshot; returns the new manifest."""
+    previous = read_manifest()
+    snapshot_dir = get_snapshots_dir() / version
+    os.replace(staging_dir, snapshot_dir)
+
+    manifest = {
+        "version": version,
+        "path": f"{SNAPSHOTS_DIR_NAME}/{version}",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "previous": previous["version"] if previous else None,
+        **info,
+    }
+    tmp_path = get_manifest_path().with_name(f"manifest.json.tmp-{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, get_manifest_path())
+    logger.info("Promoted index snapshot %s (%s)", version, snapshot_dir)
+
+    prune_snapshots(keep=settings.INDEX_SNAPSHOTS_KEEP)
+    return manifest
+
+def prune_snapshots(keep: int):
+    """Deletes all but the newest `keep` snapshots (never the current one)."""
+    current = read_manifest()
+    snapshots = sorted(
+        (path for path in get_snapshots_dir().iterdir() if path.is_dir() and not path.name.startswith(STAGING_PREFIX)),
+        key=lambda path: path.name,
+        reverse=True,
+    )
+    for path in snapshots[max(keep, 1):]:
+        if current and path.name == current["version"]:
+            continue
+        # ignore_errors: files still open in another process can't be deleted on Windows
+        shutil.rmtree(path, ignore_errors=True)
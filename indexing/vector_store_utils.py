@@ -1,34 +1,200 @@
-
+import hashlib
+import json
+import logging
+import threading
+import numpy as np
+from typing import Optional, Tuple
 from config.settings import settings
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
+from indexing.ann_index import apply_search_params, load_index_params, get_index_params_path
+from indexing.snapshots import get_snapshot_dir, read_manifest
+
+logger = logging.getLogger(__name__)
+
+_embedding_model = None
+_embedding_lock = threading.Lock()
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+def create_embedding_model(backend: str = None, threads: int = 0):
+    backend = (backend or settings.EMBEDDING_BACKEND).lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Expected one of {EMBEDDING_BACKENDS}.")
+    # Backends import their runtime (torch / onnxruntime) only when selected
+    if backend == "torch":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
+    from indexing.onnx_embeddings import OnnxEmbeddings
+    return OnnxEmbeddings(quantized=backend == "onnx-int8", threads=threads)
 
 def get_embedding_model():
-    # Use free local embeddings from HuggingFace
-    return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
+    # Use free local embeddings from HuggingFace (PyTorch, or onnxruntime, see EMBEDDING_BACKEND).
+    # Loading MiniLM takes seconds and ~100MB, so keep one instance per process.
+    global _embedding_model
+    with _embedding_lock:
+        if _embedding_model is None:
+            _embedding_model = create_embedding_model()
+    return _embedding_model
+
+# --- Which embedding backends can share an index ---
+# A full build stores the vectors of a few probe texts; another backend may query that
+# index only if its vectors for the same texts point the same way (cosine similarity).
+
+EMBEDDING_PROBE_TEXTS = [
+    "Punishment for theft of movable property",
+    "Whoever commits murder shall be punished with death or imprisonment for life",
+    "What is the punishment for cheating and dishonestly inducing delivery of property?",
+    "Section 103 Bharatiya Nyaya Sanhita",
+    "kidnapping a minor from lawful guardianship",
+    "Explanation.—A person is said to cause hurt",
+]
+
+def get_embedding_probe_path(snapshot_dir=None):
+    return (snapshot_dir or get_snapshot_dir()) / "embedding_probe.json"
+
+def save_embedding_probe(embeddings, path=None):
+    probe = {
+        "backend": settings.EMBEDDING_BACKEND,
+        "model": settings.EMBEDDING_MODEL,
+        "texts": EMBEDDING_PROBE_TEXTS,
+        "vectors": np.asarray(embeddings.embed_documents(EMBEDDING_PROBE_TEXTS), dtype="float32").round(6).tolist(),
+    }
+    with open(path or get_embedding_probe_path(), "w", encoding="utf-8") as f:
+        json.dump(probe, f)
+
+def embeddings_compatible(embeddings=None, snapshot_dir=None) -> Tuple[bool, Optional[float]]:
+    """
+    (compatible, lowest probe cosine) of the configured backend against the index on disk.
+    Indexes built before probes were stored count as built with torch.
+    """
+    probe_path = get_embedding_probe_path(snapshot_dir)
+    if not probe_path.exists():
+        return settings.EMBEDDING_BACKEND == "torch", None
+    with open(probe_path, "r", encoding="utf-8") as f:
+        probe = json.load(f)
+    if probe["model"] != settings.EMBEDDING_MODEL:
+        return False, None
+    if probe["backend"] == settings.EMBEDDING_BACKEND:
+        return True, 1.0
+
+    embeddings = embeddings or get_embedding_model()
+    stored = np.asarray(probe["vectors"], dtype="float32")
+    current = np.asarray(embeddings.embed_documents(probe["texts"]), dtype="float32")
+    if current.shape != stored.shape:
+        return False, None
+    cosines = (stored * current).sum(axis=1) / (np.linalg.norm(stored, axis=1) * np.linalg.norm(current, axis=1) + 1e-12)
+    lowest = float(cosines.min())
+    return lowest >= settings.EMBEDDING_COMPAT_MIN_COSINE, lowest
+
+def check_embedding_compatibility(embeddings):
+    compatible, cosine = embeddings_compatible(embeddings)
+    if compatible:
+        return
+    detail = f"probe cosine {cosine:.4f} < {settings.EMBEDDING_COMPAT_MIN_COSINE}" if cosine is not None else "built with another model, or before probes were stored"
+    message = f"The index was not built with EMBEDDING_BACKEND={settings.EMBEDDING_BACKEND} ({detail})."
+    if settings.EMBEDDING_MISMATCH == "error":
+        raise ValueError(message + " Rebuild it with `python -m indexing.build_index --force`.")
+    if settings.EMBEDDING_MISMATCH == "warn":
+        logger.warning("%s Retrieval quality may suffer.", message)
+        return
+    logger.warning("%s Rebuilding the index...", message)
+    from indexing.build_index import run_indexing
+    run_indexing(force=True)
+
+def get_index_path(snapshot_dir=None):
+    return (snapshot_dir or get_snapshot_dir()) / "faiss_index"
+
+def get_index_fingerprint():
+    """
+    Cheap identity of the on-disk index: the snapshot version from the manifest, or for
+    an index built before snapshots the mtime + size of its files.
+    Returns None if no index has been built yet.
+    """
+    manifest = read_manifest()
+    if manifest is not None:
+        return f"snapshot:{manifest['version']}"
+    index_path = get_index_path()
+    parts = []
+    for name in ("index.faiss", "index.pkl"):
+        file_path = index_path / name
+        if file_path.exists():
+            stat = file_path.stat()
+            parts.append(f"{name}:{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(parts) or None
+
+def get_index_version():
+    """Short id of the on-disk index; changes whenever the index is rebuilt or updated."""
+    manifest = read_manifest()
+    if manifest is not None:
+        return manifest["version"]
+    fingerprint = get_index_fingerprint()
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:12] if fingerprint else None
+
+VECTOR_STORAGES = ("faiss", "mmap")
+
+def resolve_snapshot() -> Tuple[object, Optional[str]]:
+    """(directory, version) of the served index, from a single manifest read."""
+    manifest = read_manifest()
+    if manifest is None:
+        return get_snapshot_dir(), get_index_version()
+    return get_snapshot_dir(manifest), manifest["version"]
+
+def _load_faiss_store(embeddings, snapshot_dir):
+    from langchain_community.vectorstores import FAISS
+
+    vector_store = FAISS.load_local(
+        str(get_index_path(snapshot_dir)),
+        embeddings,
+        allow_dangerous_deserialization=True
     )
+    # efSearch / nprobe are not stored in the .faiss file itself
+    apply_search_params(vector_store.index, load_index_params(get_index_params_path(snapshot_dir)))
+    return vector_store
+
+def _load_mmap_store(embeddings, snapshot_dir, version):
+    """
+    Opens the shared read-only store (indexing/mmap_store.py). It is exported from the
+    FAISS index first if it is missing, older than the index or of another VECTOR_DTYPE.
+    """
+    from indexing.mmap_store import MmapVectorStore, export_mmap_store, get_mmap_store_dir, mmap_store_is_current
+
+    store_dir = get_mmap_store_dir(snapshot_dir)
+    if not mmap_store_is_current(version, store_dir=store_dir):
+        logger.info("Exporting the index to the mmap store (%s)...", settings.VECTOR_DTYPE)
+        export_mmap_store(_load_faiss_store(embeddings, snapshot_dir), version, store_dir=store_dir)
+    return MmapVectorStore(store_dir)
 
-def create_or_load_vector_store():
+def load_vector_store(embeddings, storage: str = None, snapshot_dir=None, version: str = None):
+    """
+    The index on disk as a FAISS store or an MmapVectorStore (None if no index has been built).
+    Pass the snapshot_dir + version of one manifest read to load a consistent snapshot.
+    """
+    storage = (storage or settings.VECTOR_STORAGE).lower()
+    if storage not in VECTOR_STORAGES:
+        raise ValueError(f"Unknown VECTOR_STORAGE '{storage}'. Expected one of {VECTOR_STORAGES}.")
+    if snapshot_dir is None:
+        snapshot_dir, version = resolve_snapshot()
+    if not get_index_path(snapshot_dir).exists():
+        return None
+    if storage == "mmap":
+        return _load_mmap_store(embeddings, snapshot_dir, version)
+    return _load_faiss_store(embeddings, snapshot_dir)
+
+def create_or_load_vector_store(storage: str = None):
     settings.VECTOR_STORE_DIR.mkdir(parents=True, exist_ok=True)
     embeddings = get_embedding_model()
     
     # Check if FAISS index already exists
-    index_path = settings.VECTOR_STORE_DIR / "faiss_index"
-    if index_path.exists():
-        vector_store = FAISS.load_local(
-            str(index_path),
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
-    else:
-        # Create empty FAISS index (will be populated later)
-        vector_store = None
+    if get_index_path().exists():
+        # Query vectors must live in the same space as the indexed ones
+        check_embedding_compatibility(embeddings)
+    # None if there is no index yet (it is created by build_index)
+    vector_store = load_vector_store(embeddings, storage)
     
     return vector_store, embeddings
 
 def build_documents_from_chunks(chunks_data):
+    from langchain_core.documents import Document
+
     documents = []
     for chunk in chunks_data:
         # Convert metadata to match what chroma expects (flat dict usually best)
@@ -1,18 +1,57 @@
+import argparse
+from rag.query_parser import is_reference_only
 
-import sys
-from rag.answer_generator import RAGController
+# Only the lookup path is imported up front: "IPC 302" / "BNS 103" is answered from the
+# mapping CSV and the section store (rag/section_lookup.py) in well under a second. The
+# index, the embedding model and the LLM are loaded on the first question that needs them.
+
+def print_lookup(query: str):
+    from rag.section_lookup import lookup_sections
+
+    for item in lookup_sections(query):
+        mapping = item["mapping"]
+        if mapping:
+            target = f"BNS {mapping['bns_section']}" if item["section"] else "no BNS equivalent"
+            print(f"{item['reference']} -> {target}: {mapping['description']}")
+            if mapping.get("notes"):
+                print(f"  Note: {mapping['notes']}")
+        if item["section"] is None:
+            if not mapping:
+                print(f"{item['reference']} is not in the IPC -> BNS mapping.")
+            print()
+            continue
+        if item["text"] is None:
+            print(f"BNS Section {item['section']} was not found in the section store.\n")
+            continue
+        subsection = f"({item['subsection']})" if item["subsection"] else ""
+        print(f"\nBNS Section {item['section']}{subsection}\n{item['text'].strip()}\n")
+    print("Source: Bharatiya Nyaya Sanhita, 2023 (Official Gazette)")
+
+def load_controller():
+    from rag.resources import resources, format_rss
 
-def main():
     print("Initializing Nyaya-Sahayak... (Loading Vector Store)")
-    try:
-        controller = RAGController()
-        print("\n=== Nyaya-Sahayak: BNS Legal Assistant ===")
-        print("Type 'exit' or 'quit' to stop.\n")
-    except Exception as e:
-        print(f"\nError initializing system: {e}")
-        print("Make sure you have run 'data_ingestion/load_bns_pdf.py' and 'indexing/build_index.py' first.")
+    controller = resources.get_controller()
+    stats = resources.get_stats()
+    print(f"Loaded in {stats['last_load_seconds']}s (RSS: {format_rss(stats['rss_mb'])})")
+    return controller
+
+def answer(question: str, controller=None):
+    if is_reference_only(question):
+        print_lookup(question)
         return
 
+    controller = controller or load_controller()
+    # Print the answer as it is generated
+    for token in controller.stream_answer(question)["stream"]:
+        print(token, end="", flush=True)
+    print()
+
+def main():
+    print("\n=== Nyaya-Sahayak: BNS Legal Assistant ===")
+    print("Type 'exit' or 'quit' to stop.\n")
+
+    controller = None
     while True:
         try:
             user_input = input("You: ").strip()
@@ -22,10 +61,18 @@ def main():
             if user_input.lower() in ["exit", "quit"]:
                 print("Goodbye!")
                 break
+
+            if controller is None and not is_reference_only(user_input):
+                try:
+                    controller = load_controller()
+                except Exception as e:
+                    print(f"\nError initializing system: {e}")
+                    print("Make sure you have run 'data_ingestion/load_bns_pdf.py' and 'indexing/build_index.py' first.")
+                    continue
                 
-            print("Nyaya-Sahayak: Thinking...")
-            answer = controller.ask_question(user_input)
-            print(f"\nNyaya-Sahayak: {answer}\n")
+            print("\nNyaya-Sahayak: ", end="", flush=True)
+            answer(user_input, controller)
+            print()
             
         except KeyboardInterrupt:
             print("\nGoodbye!")
@@ -34,4 +81,19 @@ def main():
             print(f"Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Nyaya-Sahayak command line.")
+    parser.add_argument("question", nargs="?", help="Answer one question and exit (e.g. \"IPC 302\").")
+    parser.add_argument("--batch", metavar="QUESTIONS", help="Answer questions from a .jsonl or .csv file instead of the interactive prompt.")
+    parser.add_argument("--output", metavar="RESULTS", help="JSONL file for batch results (appended to; answered questions are skipped on re-run).")
+    parser.add_argument("--concurrency", type=int, default=None, help="Parallel LLM calls in batch mode (default: BATCH_LLM_CONCURRENCY).")
+    args = parser.parse_args()
+
+    from rag.telemetry import configure_logging
+    configure_logging()
+    if args.batch:
+        from rag.batch import run_batch
+        run_batch(args.batch, args.output or "batch_results.jsonl", max_concurrency=args.concurrency)
+    elif args.question:
+        answer(args.question)
+    else:
+        main()
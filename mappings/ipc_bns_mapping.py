@@ -1,8 +1,12 @@
 
 import csv
+import logging
+import threading
 from typing import List, Dict, Optional
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 class IPCBNSMapper:
     def __init__(self):
         self.mapping = self._load_mapping()
@@ -35,7 +39,7 @@ class IPCBNSMapper:
                             "notes": row["notes"]
                         }
         except Exception as e:
-            print(f"Error loading mapping CSV: {e}")
+            logger.error("Error loading mapping CSV: %s", e)
             
         return mapping
 
@@ -50,4 +54,19 @@ class IPCBNSMapper:
         """
         return self.mapping.get(str(ipc_section).strip())
 
-mapper = IPCBNSMapper()
+_mapper = None
+_mapper_lock = threading.Lock()
+
+def get_mapper() -> IPCBNSMapper:
+    """Process-wide mapper; the CSV is read on first use, not when this module is imported."""
+    global _mapper
+    with _mapper_lock:
+        if _mapper is None:
+            _mapper = IPCBNSMapper()
+    return _mapper
+
+def __getattr__(name):
+    # Keeps `from mappings.ipc_bns_mapping import mapper` working (it loads the CSV at that point)
+    if name == "mapper":
+        return get_mapper()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
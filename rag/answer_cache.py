@@ -0,0 +1,102 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from config.settings import settings
+
+class AnswerCache:
+    """
+    Persistent cache of LLM answers in a local SQLite file.
+
+    Generation runs at temperature 0 and the prompt is fully determined by the
+    model, the prompt template, the retrieved chunks and the question, so an
+    identical request can reuse the stored answer instead of calling the LLM.
+    Least recently used entries are evicted past `max_entries`.
+    """
+
+    def __init__(self, path=None, max_entries: int = None):
+        self.path = path or settings.ANSWER_CACHE_PATH
+        self.max_entries = max_entries if max_entries is not None else settings.ANSWER_CACHE_MAX_ENTRIES
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            # WAL lets several worker processes read while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    answer TEXT NOT NULL,
+                    model TEXT,
+                    question TEXT,
+                    section_ids TEXT,
+                    created_at REAL,
+                    last_used REAL,
+                    hits INTEGER DEFAULT 0
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers(last_used)")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, section_ids: List[str], question_key: str) -> str:
+        payload = json.dumps([model, prompt_version, list(section_ids), question_key], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT answer FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE answers SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, answer: str, model: str = None, question: str = None, section_ids: List[str] = None):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO answers (key, answer, model, question, section_ids, created_at, last_used, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 0)""",
+                (key, answer, model, question, json.dumps(section_ids or []), now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Process-wide cache, opened on first use (None when disabled)."""
+    global _cache
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+    return _cache
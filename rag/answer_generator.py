@@ -1,69 +1,317 @@
-
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List
 from config.settings import settings
-from langchain_groq import ChatGroq
-from rag.prompts import build_chat_prompt
+from rag.llm_backends import create_llm, llm_model_name
+from rag.prompts import build_chat_prompt, BASE_SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, PROMPT_VERSION
 from rag.retriever import BNSRetriever
+from rag.answer_cache import AnswerCache, get_answer_cache
+from rag.query_parser import query_cache_key
+from rag.single_flight import flights
+from rag.context_builder import build_context, count_tokens
+from rag.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+NOT_AVAILABLE_ANSWER = "The requested information is not available in the official BNS document or the index is not ready."
+
+# Bump when format_context changes what the LLM sees, so cached answers are not reused
+CONTEXT_FORMAT_VERSION = 2
 
 class RAGController:
     def __init__(self):
         self.retriever = BNSRetriever()
         
-        if not settings.GROQ_API_KEY:
-            raise ValueError("GROQ_API_KEY is missing. Please set it in your .env file.")
-            
-        self.llm = ChatGroq(
-            model=settings.GROQ_MODEL,
-            groq_api_key=settings.GROQ_API_KEY,
-            temperature=0
-        )
+        # Routed over the configured providers by default; LLM_BACKEND=fake for load tests without an API key
+        self.llm = create_llm()
+        self.model_name = llm_model_name(self.llm)
 
     def format_context(self, docs):
-        context_str = ""
-        for i, doc in enumerate(docs):
-            sec_num = doc.metadata.get("section_number", "Unknown")
-            title = doc.metadata.get("section_title", "")
-            page_info = doc.metadata.get("page_range", doc.metadata.get("start_page", "Unknown"))
-            text = doc.page_content.replace("\n", " ")
-            context_str += f"[{i+1}] Section {sec_num}: {title} (Page: {page_info})\nTEXT: {text}\n\n"
-        return context_str
+        return build_context(docs)["text"]
+
+    def prepare(self, question: str, sections: List[Dict] = None):
+        """
+        Everything before generation: retrieve, check the answer cache, build the prompt.
+        If "answer" is set (no documents, or a cache hit) no LLM call is needed.
+        `sections` skips retrieval when they were already retrieved (see answer_questions).
+        """
+        # 1. Retrieve: top distinct sections, each with its best-matching chunks
+        if sections is None:
+            with telemetry.span("retrieve"):
+                sections = self.retriever.retrieve_sections(question)
+        docs = [doc for section in sections for doc in section["chunks"]]
+        
+        # 2. Guard: No docs found
+        if not docs:
+            return {"answer": NOT_AVAILABLE_ANSWER, "documents": [], "sections": [], "cached": False}
+
+        # 3. Answer cache: same model + prompt + retrieved chunks + question => same answer (temperature 0)
+        cache_key = self._answer_cache_key(question, docs)
+        cache = get_answer_cache()
+        if cache:
+            with telemetry.span("answer_cache_lookup"):
+                cached_answer = cache.get(cache_key)
+            telemetry.set(answer_cache_hit=cached_answer is not None)
+            if cached_answer is not None:
+                return {"answer": cached_answer, "documents": docs, "sections": sections, "cached": True}
+        
+        # 4. Format context: overlapping chunks merged per section, within the token budget
+        with telemetry.span("context_format"):
+            context = build_context(docs)
+        
+        # 5. Build the full prompt
+        with telemetry.span("prompt_build"):
+            full_prompt = BASE_SYSTEM_PROMPT + "\n\n" + USER_PROMPT_TEMPLATE.format(
+                context=context["text"],
+                question=question
+            )
+            prompt_tokens = count_tokens(full_prompt)
+        telemetry.set(prompt_tokens=prompt_tokens, context_tokens=context["tokens"], sections=context["sections"])
+        logger.info(
+            "Prompt: %d tokens (context %d/%d, %d sections from %d chunks, %d truncated, %d dropped)",
+            prompt_tokens, context["tokens"], settings.CONTEXT_TOKEN_BUDGET, context["sections"],
+            context["chunks"], context["truncated"], context["dropped"]
+        )
+        return {
+            "answer": None,
+            "documents": docs,
+            "sections": sections,
+            "cached": False,
+            "prompt": full_prompt,
+            "prompt_tokens": prompt_tokens,
+            "question": question,
+            "cache_key": cache_key
+        }
+
+    def store_answer(self, prepared, answer: str):
+        cache = get_answer_cache()
+        if cache and answer:
+            cache.put(prepared["cache_key"], answer, model=self.model_name, question=prepared["question"],
+                      section_ids=[doc.metadata.get("id") for doc in prepared["documents"]])
+
+    def generate(self, prepared) -> str:
+        """Blocking LLM call for a prepared request; the answer goes into the answer cache."""
+        started = time.perf_counter()
+        answer = self.llm.invoke(prepared["prompt"]).content
+        self._record_generation(telemetry.current(), started, None, answer)
+        self.store_answer(prepared, answer)
+        return answer
 
     def answer_question(self, question: str):
-        """Unified method for UI and CLI that returns answer + docs."""
+        """Unified method for UI and CLI that returns answer + docs (and the same docs grouped into "sections")."""
+        with telemetry.trace("answer_question"):
+            # Concurrent identical questions share one retrieval + LLM call
+            result = flights.do(self._flight_key("answer", question), lambda: self._answer_question(question))
+        return dict(result)
+
+    def _answer_question(self, question: str):
         try:
-            # 1. Retrieve
-            docs = self.retriever.retrieve(question)
-            
-            # 2. Guard: No docs found
-            if not docs:
+            prepared = self.prepare(question)
+            if prepared["answer"] is not None:
                 return {
-                    "answer": "The requested information is not available in the official BNS document or the index is not ready.",
-                    "documents": []
+                    "answer": prepared["answer"],
+                    "documents": prepared["documents"],
+                    "sections": prepared["sections"],
+                    "cached": prepared["cached"]
                 }
             
-            # 3. Format context
-            context_text = self.format_context(docs)
-            
-            # 4. Build the full prompt
-            from rag.prompts import BASE_SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
-            full_prompt = BASE_SYSTEM_PROMPT + "\n\n" + USER_PROMPT_TEMPLATE.format(
-                context=context_text,
-                question=question
-            )
-            
-            # 5. Generate
-            response = self.llm.invoke(full_prompt)
+            # 6. Generate
+            answer = self.generate(prepared)
             
             return {
-                "answer": response.content,
-                "documents": docs
+                "answer": answer,
+                "documents": prepared["documents"],
+                "sections": prepared["sections"],
+                "cached": False
             }
         except Exception as e:
-            print(f"CRITICAL ERROR in RAG Pipeline: {e}")
+            logger.exception("Error in RAG pipeline: %s", e)
             return {
                 "answer": f"An error occurred while processing your request: {str(e)}",
-                "documents": []
+                "documents": [],
+                "sections": [],
+                "cached": False,
+                "error": str(e)
+            }
+
+    def answer_questions(self, questions: List[str], max_concurrency: int = None,
+                         on_result: Callable = None) -> List[Dict]:
+        """
+        Answers many questions: retrieval for all of them runs as one batch (one embedding
+        pass, one FAISS search), then the LLM calls run with at most `max_concurrency` in flight.
+        Returns results in input order; on_result(i, result) is called as each one completes.
+        A failed question gets {"answer": None, "error": ...} instead of failing the batch.
+        """
+        max_concurrency = max_concurrency or settings.BATCH_LLM_CONCURRENCY
+        results = [None] * len(questions)
+
+        def finish(i, result):
+            results[i] = result
+            if on_result:
+                on_result(i, result)
+
+        try:
+            sections_list = self.retriever.retrieve_sections_batch(questions)
+        except Exception as e:
+            logger.exception("Error in RAG pipeline: %s", e)
+            for i in range(len(questions)):
+                finish(i, {"answer": None, "documents": [], "sections": [], "cached": False, "error": str(e)})
+            return results
+
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch-llm") as pool:
+            futures = {
+                pool.submit(self._answer_prepared, question, sections): i
+                for i, (question, sections) in enumerate(zip(questions, sections_list))
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error("Error in RAG pipeline (%r): %s", questions[i][:60], e)
+                    result = {"answer": None, "documents": [], "sections": [], "cached": False, "error": str(e)}
+                finish(i, result)
+        return results
+
+    def _answer_prepared(self, question: str, sections: List[Dict]) -> Dict:
+        def run():
+            prepared = self.prepare(question, sections=sections)
+            answer = prepared["answer"]
+            if answer is None:
+                answer = self.generate(prepared)
+            return {
+                "answer": answer,
+                "documents": prepared["documents"],
+                "sections": prepared["sections"],
+                "cached": prepared["cached"]
+            }
+        with telemetry.trace("batch_question"):
+            # Duplicate questions in one batch share the LLM call
+            return dict(flights.do(self._flight_key("batch", question), run))
+
+    def stream_answer(self, question: str):
+        """
+        Streaming variant of answer_question.
+        Returns {"documents", "sections", "cached", "shared", "stream"}: the documents are available right away
+        and "stream" yields the answer text piece by piece as the LLM produces it.
+        Identical questions in flight share one generation; a late joiner ("shared")
+        first gets the tokens generated so far, then follows the live stream.
+        """
+        def start():
+            response = self._start_stream(question)
+            info = {key: response[key] for key in ("documents", "sections", "cached")}
+            return info, response["stream"]
+
+        info, stream, shared = flights.stream(self._flight_key("stream", question), start)
+        return {
+            "documents": info["documents"],
+            "sections": info["sections"],
+            "cached": info["cached"],
+            "shared": shared,
+            "stream": stream
+        }
+
+    def _start_stream(self, question: str):
+        # The trace stays open until the last token (see _stream_tokens)
+        trace = telemetry.start_trace("stream_answer")
+        try:
+            with telemetry.activate(trace):
+                prepared = self.prepare(question)
+        except Exception as e:
+            logger.exception("Error in RAG pipeline: %s", e)
+            if trace:
+                trace.set(error=True)
+            telemetry.finish(trace)
+            return {
+                "documents": [],
+                "sections": [],
+                "cached": False,
+                "stream": iter([f"An error occurred while processing your request: {str(e)}"])
             }
 
+        if prepared["answer"] is not None:
+            telemetry.finish(trace)
+            stream = iter([prepared["answer"]])
+        else:
+            stream = self._stream_tokens(prepared, trace)
+        return {
+            "documents": prepared["documents"],
+            "sections": prepared["sections"],
+            "cached": prepared["cached"],
+            "stream": stream
+        }
+
+    def _stream_tokens(self, prepared, trace=None):
+        parts = []
+        started = time.perf_counter()
+        first_token_at = None
+        try:
+            for chunk in self.llm.stream(prepared["prompt"]):
+                if chunk.content:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(chunk.content)
+                    yield chunk.content
+        except Exception as e:
+            logger.exception("Error in RAG pipeline: %s", e)
+            if trace:
+                trace.set(error=True)
+            yield f"\n\nAn error occurred while generating the answer: {str(e)}"
+            return
+        finally:
+            self._record_generation(trace, started, first_token_at, "".join(parts))
+            telemetry.finish(trace)
+        # Only complete answers go into the cache
+        self.store_answer(prepared, "".join(parts))
+
+    async def agenerate(self, prepared) -> str:
+        """Async generation for a prepared request (the event loop keeps serving others meanwhile)."""
+        trace = telemetry.current()
+        started = time.perf_counter()
+        response = await self.llm.ainvoke(prepared["prompt"])
+        self._record_generation(trace, started, None, response.content)
+        # SQLite write off the event loop
+        await asyncio.to_thread(self.store_answer, prepared, response.content)
+        return response.content
+
+    async def astream_tokens(self, prepared, trace=None):
+        """Async variant of _stream_tokens; errors are left to the caller."""
+        parts = []
+        started = time.perf_counter()
+        first_token_at = None
+        try:
+            async for chunk in self.llm.astream(prepared["prompt"]):
+                if chunk.content:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(chunk.content)
+                    yield chunk.content
+        finally:
+            self._record_generation(trace, started, first_token_at, "".join(parts))
+        await asyncio.to_thread(self.store_answer, prepared, "".join(parts))
+
+    def _record_generation(self, trace, started: float, first_token_at: float, answer: str):
+        if trace is None:
+            return
+        if first_token_at is not None:
+            trace.add("llm_ttft", first_token_at - started)
+        trace.add("llm_generation", time.perf_counter() - started)
+        trace.set(completion_tokens=count_tokens(answer))
+
+    def _flight_key(self, kind: str, question: str):
+        return (kind, self.retriever.index_version, query_cache_key(question))
+
+    def _answer_cache_key(self, question: str, docs) -> str:
+        return AnswerCache.make_key(
+            self.model_name,
+            # Index version: a rebuilt index may carry amended text under the same chunk ids
+            f"{PROMPT_VERSION}/{CONTEXT_FORMAT_VERSION}/{self.retriever.index_version}",
+            [doc.metadata.get("id") for doc in docs],
+            query_cache_key(question)
+        )
+
     def ask_question(self, question: str):
         """Legacy CLI support."""
         res = self.answer_question(question)
@@ -0,0 +1,103 @@
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Set
+from config.settings import settings
+from rag.resources import resources
+
+def load_questions(path) -> List[Dict]:
+    """
+    Reads questions from JSONL ({"question": ..., "id": ...} per line) or CSV (a "question"
+    column, optional "id"). Rows without an id get their 1-based position as id.
+    """
+    path = Path(path)
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            records = list(csv.DictReader(f))
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    for n, record in enumerate(records, 1):
+        question = (record.get("question") or "").strip()
+        if not question:
+            print(f"Skipping row {n}: no question.")
+            continue
+        row_id = record.get("id")
+        rows.append({"id": str(row_id if row_id not in (None, "") else n), "question": question})
+    return rows
+
+def load_completed_ids(output_path) -> Set[str]:
+    """Ids already answered in a previous run (failed rows are retried)."""
+    output_path = Path(output_path)
+    if not output_path.exists():
+        return set()
+    done = set()
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # Partially written last line of an interrupted run
+            if not record.get("error"):
+                done.add(str(record["id"]))
+    return done
+
+def _to_record(row: Dict, result: Dict) -> Dict:
+    record = {
+        "id": row["id"],
+        "question": row["question"],
+        "answer": result["answer"],
+        "cached": result.get("cached", False),
+        "sections": [
+            {"section_number": s["section_number"], "section_title": s["section_title"], "score": round(s["score"], 4)}
+            for s in result.get("sections", [])
+        ],
+    }
+    if result.get("error"):
+        record["error"] = result["error"]
+    return record
+
+def run_batch(input_path, output_path, max_concurrency: int = None, batch_size: int = None):
+    """
+    Answers every question in `input_path` and appends one JSON line per result to
+    `output_path`. Re-running with the same output skips questions already answered.
+    """
+    batch_size = batch_size or settings.BATCH_SIZE
+    rows = load_questions(input_path)
+    completed = load_completed_ids(output_path)
+    todo = [row for row in rows if row["id"] not in completed]
+    print(f"{len(rows)} questions, {len(rows) - len(todo)} already answered, {len(todo)} to go.")
+    if not todo:
+        return
+
+    controller = resources.get_controller()
+    start = time.perf_counter()
+    answered = failed = cached = 0
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        for offset in range(0, len(todo), batch_size):
+            batch = todo[offset:offset + batch_size]
+
+            def write(i, result):
+                nonlocal answered, failed, cached
+                # Written (and flushed) as each answer completes, so an interrupted run can resume
+                out.write(json.dumps(_to_record(batch[i], result), ensure_ascii=False) + "\n")
+                out.flush()
+                if result.get("error"):
+                    failed += 1
+                else:
+                    answered += 1
+                    cached += bool(result.get("cached"))
+
+            controller.answer_questions([row["question"] for row in batch], max_concurrency=max_concurrency, on_result=write)
+            elapsed = time.perf_counter() - start
+            done = answered + failed
+            print(f"  {done}/{len(todo)} ({done / elapsed * 60:.1f} questions/min, {failed} failed, {cached} from cache)")
+
+    elapsed = time.perf_counter() - start
+    print(f"Done: {answered} answered, {failed} failed in {elapsed:.1f}s "
+          f"({(answered + failed) / elapsed * 60:.1f} questions/min). Results in {output_path}")
+    if failed:
+        print("Re-run the same command to retry the failed questions.")
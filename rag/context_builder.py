@@ -0,0 +1,162 @@
+import logging
+import re
+import threading
+from typing import Dict, List
+from config.settings import settings
+from indexing.section_store import resolve_section_text
+
+logger = logging.getLogger(__name__)
+
+# Chunks are split with a 250 character overlap (see data_ingestion/chunk_bns.py);
+# the splitter may cut a little earlier, so look a bit further back.
+MAX_OVERLAP_CHARS = 400
+# Shorter suffix/prefix matches are treated as coincidence, not overlap
+MIN_OVERLAP_CHARS = 20
+# A section that only fits with fewer tokens than this is dropped instead of cut
+MIN_SECTION_TOKENS = 64
+# Appended to a section cut to fit the budget
+TRUNCATION_SUFFIX = " ...\n\n"
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+def _get_encoder():
+    """tiktoken encoder, loaded once; None if unavailable (e.g. offline without a cached BPE file)."""
+    global _encoder, _encoder_loaded
+    if _encoder_loaded:
+        return _encoder
+    with _encoder_lock:
+        if not _encoder_loaded:
+            try:
+                import tiktoken
+                _encoder = tiktoken.get_encoding(settings.TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.warning("Tokenizer '%s' unavailable (%s), estimating tokens as chars/4.", settings.TOKENIZER_ENCODING, e.__class__.__name__)
+                _encoder = None
+            _encoder_loaded = True
+    return _encoder
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of `text`. cl100k is not the Llama tokenizer, but counts are
+    close enough for budgeting; the budget leaves headroom for the difference.
+    """
+    encoder = _get_encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoder = _get_encoder()
+    if encoder is None:
+        return text[:max_tokens * 4]
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoder.decode(tokens[:max_tokens])
+
+def _chunk_position(doc) -> int:
+    match = re.search(r"_chunk_(\d+)$", str(doc.metadata.get("id", "")))
+    return int(match.group(1)) if match else 0
+
+def merge_overlapping(texts: List[str]) -> str:
+    """Joins consecutive chunks of one section, dropping the text they repeat from each other."""
+    merged = ""
+    for text in texts:
+        if not merged:
+            merged = text
+            continue
+        if text in merged:
+            continue # Fully covered already
+        overlap = 0
+        tail = merged[-MAX_OVERLAP_CHARS:]
+        # Longest suffix of `merged` that is also a prefix of `text`
+        start = tail.find(text[:MIN_OVERLAP_CHARS])
+        while start != -1:
+            candidate = tail[start:]
+            if text.startswith(candidate):
+                overlap = len(candidate)
+                break
+            start = tail.find(text[:MIN_OVERLAP_CHARS], start + 1)
+        if overlap:
+            merged += text[overlap:]
+        else:
+            merged += " ... " + text # Non-adjacent chunks of the same section
+    return merged
+
+def merge_section_chunks(docs) -> str:
+    """Text of one section's chunks, in document order and without the overlap."""
+    return merge_overlapping([doc.page_content for doc in sorted(docs, key=_chunk_position)])
+
+def group_by_section(docs) -> List[Dict]:
+    """Retrieved chunks grouped per section, sections in rank order, chunks in document order."""
+    sections = {}
+    for doc in docs:
+        sec_num = str(doc.metadata.get("section_number", "Unknown"))
+        section = sections.setdefault(sec_num, {"section_number": sec_num, "docs": [], "seen": set()})
+        doc_id = doc.metadata.get("id") or doc.page_content
+        if doc_id in section["seen"]:
+            continue
+        section["seen"].add(doc_id)
+        section["docs"].append(doc)
+    for section in sections.values():
+        section["docs"].sort(key=_chunk_position)
+        del section["seen"]
+    return list(sections.values())
+
+def build_context(docs, token_budget: int = None) -> Dict:
+    """
+    Builds the CONTEXT block of the prompt within `token_budget` tokens.
+
+    The top-ranked section is given in full (the answer must show one complete
+    section, see BASE_SYSTEM_PROMPT); every other section is its retrieved chunks,
+    merged in document order without the overlap between them. Sections are
+    added in rank order until the budget runs out.
+    """
+    budget = token_budget if token_budget is not None else settings.CONTEXT_TOKEN_BUDGET
+    blocks = []
+    used = 0
+    truncated = 0
+    dropped = 0
+
+    for rank, section in enumerate(group_by_section(docs)):
+        first = section["docs"][0]
+        if rank == 0:
+            text = resolve_section_text(first)
+        else:
+            text = merge_section_chunks(section["docs"])
+
+        n = len(blocks) + 1
+        title = first.metadata.get("section_title", "")
+        page_info = first.metadata.get("page_range", first.metadata.get("start_page", "Unknown"))
+        header = f"[{n}] Section {section['section_number']}: {title} (Page: {page_info})\nTEXT: "
+        text = text.replace("\n", " ")
+        block = f"{header}{text}\n\n"
+        tokens = count_tokens(block)
+
+        if used + tokens > budget:
+            remaining = budget - used - count_tokens(header) - count_tokens(TRUNCATION_SUFFIX)
+            while remaining >= MIN_SECTION_TOKENS:
+                block = f"{header}{truncate_to_tokens(text, remaining)}{TRUNCATION_SUFFIX}"
+                tokens = count_tokens(block)
+                if used + tokens <= budget:
+                    break
+                # Token counts don't add up exactly where the pieces are joined: cut further
+                remaining -= used + tokens - budget
+            if remaining < MIN_SECTION_TOKENS:
+                dropped += 1
+                continue
+            truncated += 1
+
+        blocks.append(block)
+        used += tokens
+
+    return {
+        "text": "".join(blocks),
+        "tokens": used,
+        "sections": len(blocks),
+        "chunks": len(docs),
+        "truncated": truncated,
+        "dropped": dropped,
+    }
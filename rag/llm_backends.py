@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Iterator, List
+from config.settings import settings
+
+# The RAG controller talks to its LLM through four calls, the same ones LangChain
+# chat models provide:
+#
+#   invoke(prompt) -> message          ainvoke(prompt) -> message
+#   stream(prompt) -> message chunks   astream(prompt) -> message chunks
+#
+# where a message (or chunk) has a `.content` string. ChatGroq already fits, and so does
+# LLMRouter (rag/llm_router.py), which spreads calls over several providers.
+# FakeLLM is a local stand-in for load tests and offline runs (no API key, no quota).
+
+class LLMMessage:
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+class FakeLLMError(RuntimeError):
+    pass
+
+class FakeLLM:
+    """
+    Deterministic LLM stand-in: waits `latency` seconds before the first token, then
+    emits `tokens_per_second`, and fails a seeded `error_rate` share of calls. The
+    answer is built from the prompt's first context section, so it looks like a
+    (short) real answer and the same prompt always gives the same text.
+    """
+
+    def __init__(self, latency: float = None, tokens_per_second: float = None,
+                 answer_tokens: int = None, error_rate: float = None, seed: int = None):
+        self.latency = settings.FAKE_LLM_LATENCY if latency is None else latency
+        self.tokens_per_second = settings.FAKE_LLM_TOKENS_PER_SECOND if tokens_per_second is None else tokens_per_second
+        self.answer_tokens = settings.FAKE_LLM_ANSWER_TOKENS if answer_tokens is None else answer_tokens
+        self.error_rate = settings.FAKE_LLM_ERROR_RATE if error_rate is None else error_rate
+        self._random = random.Random(settings.FAKE_LLM_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.model_name = "fake-llm"
+
+    def _start_call(self):
+        # One draw per call, in call order: same seed + same call sequence => same failures
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise FakeLLMError(f"Injected LLM failure (FAKE_LLM_ERROR_RATE={self.error_rate:g})")
+
+    def _tokens(self, prompt) -> List[str]:
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        heading = re.search(r"\[1\] (Section [^\n(]+)", text)
+        context = text.split("CONTEXT:", 1)[-1]
+        words = re.findall(r"\S+", context) or ["..."]
+        # Deterministic filler from the prompt's own words
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        tokens = [f"**{heading.group(1).strip()}**\n\n" if heading else "**Answer**\n\n"]
+        while len(tokens) < self.answer_tokens - 1:
+            tokens.append(rng.choice(words) + " ")
+        tokens.append("\n\nSource: Bharatiya Nyaya Sanhita, 2023 (Official Gazette)")
+        return tokens
+
+    def _interval(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def invoke(self, prompt) -> LLMMessage:
+        self._start_call()
+        tokens = self._tokens(prompt)
+        time.sleep(self.latency + (len(tokens) - 1) * self._interval())
+        return LLMMessage("".join(tokens))
+
+    def stream(self, prompt) -> Iterator[LLMMessage]:
+        self._start_call()
+        tokens = self._tokens(prompt)
+        # Token i is due at latency + i * interval; sleeping to that schedule keeps
+        # many short sleeps from drifting
+        deadline = time.perf_counter() + self.latency
+        for token in tokens:
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            yield LLMMessage(token)
+            deadline += self._interval()
+
+    async def ainvoke(self, prompt) -> LLMMessage:
+        self._start_call()
+        tokens = self._tokens(prompt)
+        await asyncio.sleep(self.latency + (len(tokens) - 1) * self._interval())
+        return LLMMessage("".join(tokens))
+
+    async def astream(self, prompt):
+        self._start_call()
+        tokens = self._tokens(prompt)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.latency
+        for token in tokens:
+            remaining = deadline - loop.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            yield LLMMessage(token)
+            deadline += self._interval()
+
+def _create_groq():
+    from langchain_groq import ChatGroq
+
+    if not settings.GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY is missing. Please set it in your .env file.")
+    return ChatGroq(
+        model=settings.GROQ_MODEL,
+        groq_api_key=settings.GROQ_API_KEY,
+        temperature=0
+    )
+
+def _create_router():
+    from rag.llm_router import LLMRouter
+    return LLMRouter.from_settings()
+
+LLM_BACKENDS = {
+    "router": _create_router,
+    "groq": _create_groq,
+    "fake": FakeLLM,
+}
+
+def create_llm(backend: str = None):
+    backend = (backend or settings.LLM_BACKEND).lower()
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND '{backend}' (expected one of: {', '.join(LLM_BACKENDS)})")
+    return LLM_BACKENDS[backend]()
+
+def llm_model_name(llm) -> str:
+    """Model name recorded with cached answers, so answers from different backends never mix."""
+    return getattr(llm, "model_name", None) or settings.GROQ_MODEL
@@ -0,0 +1,407 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from config.settings import settings
+from rag.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+# LLM calls routed over the configured providers (LLM_PROVIDERS, e.g. "groq,gemini").
+#
+# Every attempt has a timeout (LLM_CALL_TIMEOUT; for streams, the time to the first
+# token) and the whole call a deadline (LLM_DEADLINE). Retryable failures (timeouts,
+# connection errors, 429, 5xx) are retried with jittered exponential backoff, up to
+# LLM_MAX_RETRIES times per provider; after that, or on any other error, the next
+# provider is tried. With LLM_HEDGE_AFTER > 0 an attempt that hasn't answered by then
+# is also sent to the next provider and the first answer wins.
+#
+# Each provider keeps an EWMA of its latency and error rate; calls go to the fastest
+# available provider, and one that fails LLM_FAILURE_THRESHOLD times in a row sits
+# out LLM_COOLDOWN seconds. A stream can only switch providers before its first token.
+#
+# The router has the same invoke/stream/ainvoke/astream interface as the LangChain
+# chat models it wraps (see rag/llm_backends.py).
+
+class LLMUnavailableError(RuntimeError):
+    pass
+
+RETRYABLE_STATUS = {408, 409, 425, 429}
+
+def is_retryable(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    # groq.APITimeoutError / APIConnectionError, httpx.ConnectTimeout, ...
+    name = error.__class__.__name__
+    return "Timeout" in name or "Connection" in name
+
+def _describe(error: BaseException) -> str:
+    return f"{error.__class__.__name__}: {error}" if str(error) else error.__class__.__name__
+
+class ProviderHealth:
+    """EWMA latency (per call kind) and error rate of one provider, plus a failure cooldown."""
+
+    def __init__(self, alpha: float = None):
+        self.alpha = settings.LLM_HEALTH_ALPHA if alpha is None else alpha
+        self.latency = {}  # "invoke" -> seconds per answer, "stream" -> seconds to first token
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, seconds: float, error: Optional[BaseException]):
+        with self._lock:
+            self.calls += 1
+            if error is None:
+                previous = self.latency.get(kind)
+                self.latency[kind] = seconds if previous is None else self.alpha * seconds + (1 - self.alpha) * previous
+                self.error_rate *= 1 - self.alpha
+                self.consecutive_failures = 0
+                return
+            self.failures += 1
+            self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= settings.LLM_FAILURE_THRESHOLD:
+                self.cooldown_until = time.monotonic() + settings.LLM_COOLDOWN
+                self.consecutive_failures = 0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def score(self, kind: str) -> float:
+        """Expected seconds, inflated by the error rate (lower is better); unmeasured = inf."""
+        latency = self.latency.get(kind)
+        if latency is None:
+            return float("inf")
+        return latency * (1 + 4 * self.error_rate)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "latency_ms": {kind: round(seconds * 1000, 1) for kind, seconds in self.latency.items()},
+                "error_rate": round(self.error_rate, 4),
+                "calls": self.calls,
+                "failures": self.failures,
+                "available": self.available,
+            }
+
+class Provider:
+    def __init__(self, name: str, model: str, llm):
+        self.name = name
+        self.model = model
+        self.llm = llm
+        self.health = ProviderHealth()
+
+# --- Providers (None when not configured) ---
+
+def _groq_provider() -> Optional[Provider]:
+    if not settings.GROQ_API_KEY:
+        return None
+    import httpx
+    from langchain_groq import ChatGroq
+
+    # One pooled client per process (the controller is shared), so TLS connections are
+    # reused across requests instead of being set up per call
+    limits = httpx.Limits(
+        max_connections=settings.LLM_POOL_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS,
+    )
+    timeout = httpx.Timeout(settings.LLM_CALL_TIMEOUT, connect=min(5.0, settings.LLM_CALL_TIMEOUT))
+    llm = ChatGroq(
+        model=settings.GROQ_MODEL,
+        groq_api_key=settings.GROQ_API_KEY,
+        temperature=0,
+        max_retries=0,  # Retries are done here, across providers
+        request_timeout=settings.LLM_CALL_TIMEOUT,
+        http_client=httpx.Client(limits=limits, timeout=timeout),
+        http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+    )
+    return Provider("groq", settings.GROQ_MODEL, llm)
+
+def _gemini_provider() -> Optional[Provider]:
+    if not settings.GOOGLE_API_KEY:
+        return None
+    try:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+    except ImportError:
+        logger.warning("Gemini provider skipped: pip install langchain-google-genai to enable it.")
+        return None
+    llm = ChatGoogleGenerativeAI(
+        model=settings.GEMINI_MODEL,
+        google_api_key=settings.GOOGLE_API_KEY,
+        temperature=0,
+        max_retries=0,
+        timeout=settings.LLM_CALL_TIMEOUT,
+    )
+    return Provider("gemini", settings.GEMINI_MODEL, llm)
+
+def _fake_provider() -> Optional[Provider]:
+    from rag.llm_backends import FakeLLM
+
+    llm = FakeLLM()
+    return Provider("fake", llm.model_name, llm)
+
+PROVIDERS = {
+    "groq": _groq_provider,
+    "gemini": _gemini_provider,
+    "fake": _fake_provider,
+}
+
+# --- Router ---
+
+class LLMRouter:
+    def __init__(self, providers: List[Provider]):
+        if not providers:
+            raise ValueError("No LLM provider configured. Please set GROQ_API_KEY (or GOOGLE_API_KEY) in your .env file.")
+        self.providers = providers
+        # Answers may come from any provider; the cache key covers the whole set
+        self.model_name = "+".join(provider.model for provider in providers)
+        # Sync attempts run here so they can be timed out and hedged
+        self._pool = ThreadPoolExecutor(max_workers=settings.LLM_POOL_CONNECTIONS, thread_name_prefix="llm-call")
+
+    @classmethod
+    def from_settings(cls) -> "LLMRouter":
+        providers = []
+        for name in settings.LLM_PROVIDERS.split(","):
+            name = name.strip().lower()
+            if not name:
+                continue
+            if name not in PROVIDERS:
+                raise ValueError(f"Unknown LLM provider '{name}' in LLM_PROVIDERS (expected: {', '.join(PROVIDERS)})")
+            provider = PROVIDERS[name]()
+            if provider is not None:
+                providers.append(provider)
+        return cls(providers)
+
+    def ordered(self, kind: str) -> List[Provider]:
+        """Available providers fastest first (configured order until measured), then cooling-down ones."""
+        indexed = list(enumerate(self.providers))
+        indexed.sort(key=lambda item: (not item[1].health.available, item[1].health.score(kind), item[0]))
+        return [provider for _, provider in indexed]
+
+    def stats(self) -> Dict:
+        return {provider.name: provider.health.snapshot() for provider in self.providers}
+
+    def _backoff(self, attempt: int, deadline: float) -> float:
+        # Full jitter: concurrent callers that failed together don't retry together
+        delay = random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+        return max(0.0, min(delay, deadline - time.monotonic()))
+
+    def _plan(self, kind: str):
+        """(provider, backup for hedging, attempt number) in the order they are tried."""
+        order = self.ordered(kind)
+        for i, provider in enumerate(order):
+            backup = next((p for p in order[i + 1:] + order[:i] if p.health.available), None)
+            for attempt in range(settings.LLM_MAX_RETRIES + 1):
+                yield provider, backup, attempt
+
+    def _unavailable(self, errors: List[str]) -> LLMUnavailableError:
+        detail = "; ".join(errors[-4:]) if errors else f"deadline of {settings.LLM_DEADLINE:g}s exceeded"
+        return LLMUnavailableError(f"No LLM provider answered ({detail})")
+
+    # --- Sync ---
+
+    def _submit(self, provider: Provider, kind: str, fn: Callable):
+        started = time.monotonic()
+        future = self._pool.submit(contextvars.copy_context().run, fn, provider.llm)
+        future.add_done_callback(lambda f: provider.health.record(kind, time.monotonic() - started, f.exception()))
+        return future
+
+    def _attempt(self, provider: Provider, backup: Optional[Provider], kind: str, fn: Callable,
+                 timeout: float, discard: Callable = None):
+        """fn(llm) on `provider`, hedged to `backup` after LLM_HEDGE_AFTER; returns (result, provider)."""
+        start = time.monotonic()
+        futures = {self._submit(provider, kind, fn): provider}
+        hedge_at = settings.LLM_HEDGE_AFTER if backup is not None and 0 < settings.LLM_HEDGE_AFTER < timeout else None
+        pending = set(futures)
+        error = None
+        while pending:
+            elapsed = time.monotonic() - start
+            if elapsed >= timeout:
+                break
+            wait_for = timeout - elapsed
+            if hedge_at is not None and len(futures) == 1:
+                wait_for = min(wait_for, max(0.0, hedge_at - elapsed))
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._discard_later(pending, discard)
+                    return future.result(), futures[future]
+                error = error or future.exception()
+            if hedge_at is not None and len(futures) == 1 and pending and time.monotonic() - start >= hedge_at:
+                hedge = self._submit(backup, kind, fn)
+                futures[hedge] = backup
+                pending.add(hedge)
+        if error is not None and not pending:
+            raise error
+        # Threads can't be interrupted; a late result is released when it arrives
+        self._discard_later(pending, discard)
+        raise TimeoutError(f"no response within {timeout:.3g}s")
+
+    def _discard_later(self, futures, discard: Callable = None):
+        if discard is None:
+            return
+        for future in futures:
+            future.add_done_callback(lambda f: discard(f.result()) if f.exception() is None else None)
+
+    def _call(self, kind: str, fn: Callable, discard: Callable = None):
+        deadline = time.monotonic() + settings.LLM_DEADLINE
+        errors = []
+        given_up = set()  # providers whose remaining attempts are skipped
+        for provider, backup, attempt in self._plan(kind):
+            if provider.name in given_up:
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                result, winner = self._attempt(provider, backup, kind, fn, min(settings.LLM_CALL_TIMEOUT, remaining), discard)
+                telemetry.set(llm_provider=winner.name, llm_attempts=len(errors) + 1)
+                return result
+            except Exception as e:
+                errors.append(f"{provider.name}: {_describe(e)}")
+                logger.warning("LLM call to %s failed (attempt %d): %s", provider.name, attempt + 1, _describe(e))
+                if not is_retryable(e):
+                    # Retrying the same provider can't help (bad key, bad request): fail over now
+                    given_up.add(provider.name)
+                    continue
+                if attempt == settings.LLM_MAX_RETRIES:
+                    continue
+                time.sleep(self._backoff(attempt, deadline))
+        telemetry.set(llm_attempts=len(errors))
+        raise self._unavailable(errors)
+
+    def invoke(self, prompt):
+        return self._call("invoke", lambda llm: llm.invoke(prompt))
+
+    def stream(self, prompt):
+        def first_token(llm):
+            iterator = iter(llm.stream(prompt))
+            # Skip leading empty chunks (role/metadata) so this measures time to first token
+            first = next((chunk for chunk in iterator if chunk.content), None)
+            return first, iterator
+
+        def close(result):
+            if hasattr(result[1], "close"):
+                result[1].close()
+
+        first, iterator = self._call("stream", first_token, discard=close)
+        if first is not None:
+            yield first
+            yield from iterator
+
+    # --- Async ---
+
+    def _start(self, provider: Provider, kind: str, fn: Callable) -> asyncio.Task:
+        started = time.monotonic()
+        task = asyncio.ensure_future(fn(provider.llm))
+
+        def record(t):
+            if not t.cancelled():
+                provider.health.record(kind, time.monotonic() - started, t.exception())
+
+        task.add_done_callback(record)
+        return task
+
+    async def _aattempt(self, provider: Provider, backup: Optional[Provider], kind: str, fn: Callable,
+                        timeout: float, discard: Callable = None):
+        start = time.monotonic()
+        tasks = {self._start(provider, kind, fn): provider}
+        hedge_at = settings.LLM_HEDGE_AFTER if backup is not None and 0 < settings.LLM_HEDGE_AFTER < timeout else None
+        pending = set(tasks)
+        error = None
+        winner = None
+        try:
+            while pending:
+                elapsed = time.monotonic() - start
+                if elapsed >= timeout:
+                    break
+                wait_for = timeout - elapsed
+                if hedge_at is not None and len(tasks) == 1:
+                    wait_for = min(wait_for, max(0.0, hedge_at - elapsed))
+                done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result(), tasks[task]
+                    error = error or task.exception()
+                if hedge_at is not None and len(tasks) == 1 and pending and time.monotonic() - start >= hedge_at:
+                    hedge = self._start(backup, kind, fn)
+                    tasks[hedge] = backup
+                    pending.add(hedge)
+            if error is not None and not pending:
+                raise error
+            raise asyncio.TimeoutError(f"no response within {timeout:.3g}s")
+        finally:
+            # Losers and stragglers are cancelled, which aborts their HTTP requests
+            for task, task_provider in tasks.items():
+                if task is winner:
+                    continue
+                if not task.done():
+                    if winner is None:
+                        # Timed out: counts against the provider (a cancelled task records nothing)
+                        task_provider.health.record(kind, time.monotonic() - start, asyncio.TimeoutError())
+                    task.cancel()
+                elif discard and not task.cancelled() and task.exception() is None:
+                    discard(task.result())
+
+    async def _acall(self, kind: str, fn: Callable, discard: Callable = None):
+        deadline = time.monotonic() + settings.LLM_DEADLINE
+        errors = []
+        given_up = set()  # providers whose remaining attempts are skipped
+        for provider, backup, attempt in self._plan(kind):
+            if provider.name in given_up:
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                result, winner = await self._aattempt(provider, backup, kind, fn, min(settings.LLM_CALL_TIMEOUT, remaining), discard)
+                telemetry.set(llm_provider=winner.name, llm_attempts=len(errors) + 1)
+                return result
+            except Exception as e:
+                errors.append(f"{provider.name}: {_describe(e)}")
+                logger.warning("LLM call to %s failed (attempt %d): %s", provider.name, attempt + 1, _describe(e))
+                if not is_retryable(e):
+                    # Retrying the same provider can't help (bad key, bad request): fail over now
+                    given_up.add(provider.name)
+                    continue
+                if attempt == settings.LLM_MAX_RETRIES:
+                    continue
+                await asyncio.sleep(self._backoff(attempt, deadline))
+        telemetry.set(llm_attempts=len(errors))
+        raise self._unavailable(errors)
+
+    async def ainvoke(self, prompt):
+        return await self._acall("invoke", lambda llm: llm.ainvoke(prompt))
+
+    async def astream(self, prompt):
+        async def first_token(llm):
+            iterator = llm.astream(prompt).__aiter__()
+            async for chunk in iterator:
+                if chunk.content:
+                    return chunk, iterator
+            return None, iterator
+
+        def close(result):
+            if hasattr(result[1], "aclose"):
+                asyncio.ensure_future(result[1].aclose())
+
+        first, iterator = await self._acall("stream", first_token, discard=close)
+        if first is not None:
+            yield first
+            async for chunk in iterator:
+                yield chunk
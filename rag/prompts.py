@@ -1,5 +1,5 @@
 
-from langchain_core.prompts import ChatPromptTemplate
+import hashlib
 
 BASE_SYSTEM_PROMPT = """You are Nyaya-Sahayak, an official legal assistant for the Bharatiya Nyaya Sanhita (BNS).
 
@@ -53,7 +53,13 @@ USER QUESTION:
 Answer:
 """
 
+# Part of the answer cache key: editing either template invalidates cached answers
+PROMPT_VERSION = hashlib.sha256((BASE_SYSTEM_PROMPT + USER_PROMPT_TEMPLATE).encode("utf-8")).hexdigest()[:12]
+
 def build_chat_prompt():
+    # langchain_core.prompts pulls in the tracing stack (~0.5s); only load it when a template is built
+    from langchain_core.prompts import ChatPromptTemplate
+
     return ChatPromptTemplate.from_messages([
         ("system", BASE_SYSTEM_PROMPT),
         ("human", USER_PROMPT_TEMPLATE)
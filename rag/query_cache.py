@@ -0,0 +1,164 @@
+import atexit
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """Thread-safe LRU cache with an entry limit, optional TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict() # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, stored_at = entry
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        with self._lock:
+            return list(self._data.items())
+
+    def load_items(self, items):
+        now = time.time()
+        with self._lock:
+            for key, (value, stored_at) in items:
+                if self.ttl_seconds and now - stored_at > self.ttl_seconds:
+                    continue
+                self._data[key] = (value, stored_at)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+class QueryCache:
+    """
+    Two-level retrieval cache shared by every retriever in the process:
+      - embeddings: normalized query -> query vector (valid as long as the embedding model is)
+      - results:    (normalized query, k, threshold, ..., index version) -> ranked chunk ids + scores
+
+    Result entries carry the index version in their key, and are dropped as soon
+    as a retriever for a newer index version registers itself.
+    """
+
+    def __init__(self):
+        self.embeddings = LRUCache(settings.QUERY_EMBEDDING_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+        self.results = LRUCache(settings.RETRIEVAL_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+        self.index_version = None
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def set_index_version(self, version: Optional[str]):
+        with self._lock:
+            self._load_once()
+            if version != self.index_version:
+                if self.index_version is not None:
+                    logger.info("Index version changed (%s -> %s), clearing retrieval cache.", self.index_version, version)
+                self.results.clear()
+                self.index_version = version
+
+    def embedding_key(self, query_key: str):
+        return (settings.EMBEDDING_MODEL, settings.EMBEDDING_BACKEND, query_key)
+
+    def get_embedding(self, query_key: str):
+        return self.embeddings.get(self.embedding_key(query_key))
+
+    def put_embedding(self, query_key: str, vector):
+        self.embeddings.put(self.embedding_key(query_key), vector)
+
+    def get_results(self, key):
+        return self.results.get(key)
+
+    def put_results(self, key, value):
+        self.results.put(key, value)
+
+    def stats(self) -> Dict:
+        return {
+            "index_version": self.index_version,
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+        }
+
+    # --- Optional persistence across restarts ---
+
+    def _load_once(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not settings.QUERY_CACHE_PERSIST or not settings.QUERY_CACHE_PATH.exists():
+            return
+        try:
+            with open(settings.QUERY_CACHE_PATH, "rb") as f:
+                state = pickle.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable query cache (%s).", e)
+            return
+        self.embeddings.load_items(state.get("embeddings", []))
+        # Results are only reusable against the index they were computed on
+        self.index_version = state.get("index_version")
+        self.results.load_items(state.get("results", []))
+        logger.info("Loaded query cache: %d embeddings, %d results.", len(self.embeddings), len(self.results))
+
+    def save(self):
+        if not settings.QUERY_CACHE_PERSIST:
+            return
+        state = {
+            "index_version": self.index_version,
+            "embeddings": self.embeddings.items(),
+            "results": self.results.items(),
+        }
+        settings.QUERY_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = settings.QUERY_CACHE_PATH.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, settings.QUERY_CACHE_PATH)
+
+query_cache = QueryCache()
+atexit.register(query_cache.save)
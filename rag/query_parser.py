@@ -0,0 +1,145 @@
+import re
+from typing import List, Dict, Optional
+
+# One section number with its optional subsection: "103", "304A", "498-A", "64(2)"
+SECTION_ITEM = r"\b\d{1,3}(?:-?[A-Z]{1,2})?\b(?:\s*\(\s*(?:\d{1,2}|[a-z])\s*\))?"
+
+# Matches explicit statute references such as:
+#   "BNS Section 103", "IPC 302", "Section 304A of IPC", "s. 64(2) BNS", "Sec 103", "420 IPC",
+#   "IPC section 498-A", "IPC 302 and 304", "sections 303 to 305 BNS", "303-305 BNS"
+# A bare number ("what happened in 2023") is never treated as a section: without a
+# "section" keyword or an act before it, the number must be followed by the act.
+# Lists ("302, 304 and 307") share the act and keyword of their first item.
+SECTION_REF_PATTERN = re.compile(
+    rf"""
+    (?P<prefix>
+        \b(?P<act_before>BNS|IPC)\s*(?:sections?|sec\.?|s\.)?\s*   # "BNS 103", "IPC section 302"
+      | \b(?:sections?|sec\.?|s\.)\s*                                # "Section 103"
+    )?
+    (?P<sections>
+        {SECTION_ITEM}
+        (?:(?:\s*(?:,|&|\band\b|\bor\b|\bto\b)\s*|[-–])(?:sections?\s*|sec\.?\s*|s\.\s*)?
+           {SECTION_ITEM}(?!\s*(?:years?|months?|days?|people|persons|times)\b))*          # not "and 7 years"
+    )
+    (?(prefix)
+        (?:\s*(?:of\s+(?:the\s+)?)?(?P<act_after>BNS|IPC)\b)?      # "302 of IPC"
+      | \s*(?:of\s+(?:the\s+)?)?(?P<act_bare>BNS|IPC)\b            # "420 IPC"
+    )
+    """,
+    re.IGNORECASE | re.VERBOSE
+)
+
+# The items of a matched list; `range` marks "X to Y" / "X-Y"
+LIST_ITEM_PATTERN = re.compile(
+    r"(?:(?P<range>\bto\b|[-–])\s*)?(?:sections?\s*|sec\.?\s*|s\.\s*)?"
+    r"\b(?P<section>\d{1,3}(?:-?[A-Z]{1,2})?)\b(?:\s*\(\s*(?P<subsection>\d{1,2}|[a-z])\s*\))?",
+    re.IGNORECASE
+)
+
+# "303 to 305" is expanded; anything longer is more likely a typo than a real question
+MAX_SECTION_RANGE = 20
+
+# "top 10 BNS sections", "first 5 IPC offences": a count, not a section number
+COUNT_WORDS = {"top", "first", "last", "next", "all", "any", "these", "those", "about", "around", "over"}
+
+ACT_PATTERN = re.compile(r"\b(BNS|IPC)\b", re.IGNORECASE)
+
+SUB_SECTION_PATTERN = re.compile(r"^\s*(\d{1,3}(?:-?[A-Z]{1,2})?)\s*(?:\(\s*(\d{1,2}|[a-z])\s*\))?\s*$", re.IGNORECASE)
+
+def normalize_query(query: str) -> str:
+    # Treat user queries the same regardless of surrounding whitespace and trailing punctuation
+    return query.strip().rstrip(".,;!?")
+
+def query_cache_key(query: str) -> str:
+    """Key for the query caches: case, spacing and trailing punctuation don't change the answer."""
+    # MiniLM is uncased, so lower-casing doesn't change the embedding either
+    return " ".join(normalize_query(query).lower().split())
+
+def _section_refs(query: str) -> List:
+    """Matches of SECTION_REF_PATTERN that are section references (counts like "top 10 BNS" are not)."""
+    matches = []
+    for match in SECTION_REF_PATTERN.finditer(query):
+        if not match.group("prefix"):
+            before = re.findall(r"\w+", query[:match.start()])
+            if before and before[-1].lower() in COUNT_WORDS:
+                continue
+        matches.append(match)
+    return matches
+
+def _normalize_section(section: str) -> str:
+    return section.replace("-", "").upper()
+
+def _list_items(text: str) -> List[tuple]:
+    """(section, subsection) of each item of a matched list, with "X to Y" ranges expanded."""
+    items = []
+    for item in LIST_ITEM_PATTERN.finditer(text):
+        section = _normalize_section(item.group("section"))
+        subsection = item.group("subsection")
+        if item.group("range") and items:
+            first, first_subsection = items[-1]
+            if (first.isdigit() and section.isdigit() and not first_subsection and not subsection
+                    and 0 < int(section) - int(first) <= MAX_SECTION_RANGE):
+                items.extend((str(n), None) for n in range(int(first) + 1, int(section)))
+        items.append((section, subsection))
+    return items
+
+def _unbound_acts(query: str, matches) -> set:
+    """Acts named in the query outside any section reference ("In IPC, section 302 ...")."""
+    spans = [match.span() for match in matches]
+    return {
+        act.group(1).upper() for act in ACT_PATTERN.finditer(query)
+        if not any(start <= act.start() < end for start, end in spans)
+    }
+
+def parse_section_references(query: str) -> List[Dict]:
+    """
+    Finds BNS/IPC section references in a query.
+    Returns e.g. [{"act": "IPC", "section": "304A", "subsection": None}].
+    A reference without an act of its own takes the act named elsewhere in the query
+    ("In IPC, section 302 ..."), or BNS if none is. If both acts are named elsewhere,
+    it can't be told which one is meant and the reference is left out.
+    """
+    matches = _section_refs(query)
+    unbound = _unbound_acts(query, matches)
+    default_act = unbound.pop() if len(unbound) == 1 else ("BNS" if not unbound else None)
+
+    refs = []
+    seen = set()
+    for match in matches:
+        act = match.group("act_before") or match.group("act_after") or match.group("act_bare") or default_act
+        if act is None:
+            continue
+        act = act.upper()
+        for section, subsection in _list_items(match.group("sections")):
+            key = (act, section, subsection)
+            if key in seen:
+                continue
+            seen.add(key)
+            refs.append({
+                "act": act,
+                "section": section,
+                "subsection": subsection.lower() if subsection else None
+            })
+    return refs
+
+def is_reference_only(query: str) -> bool:
+    """True if the query is nothing but section references, e.g. "IPC 302" or "Section 103 and IPC 304A"."""
+    matches = _section_refs(query)
+    if not matches:
+        return False
+    leftover, end = [], 0
+    for match in matches:
+        leftover += re.findall(r"\w+", query[end:match.start()])
+        end = match.end()
+    leftover += re.findall(r"\w+", query[end:])
+    return all(word.lower() in ("and", "or") for word in leftover)
+
+def split_section_number(value: str) -> Optional[Dict]:
+    """'103(2)' -> {"section": "103", "subsection": "2"}; None for 'null' or junk."""
+    match = SUB_SECTION_PATTERN.match(str(value))
+    if not match:
+        return None
+    return {
+        "section": _normalize_section(match.group(1)),
+        "subsection": match.group(2).lower() if match.group(2) else None
+    }
@@ -0,0 +1,151 @@
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Dict
+from config.settings import settings
+from indexing.vector_store_utils import get_index_fingerprint
+
+logger = logging.getLogger(__name__)
+
+def get_rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB (None if it can't be measured)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux, bytes on macOS (peak, not current)
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+def format_rss(rss_mb: Optional[float]) -> str:
+    return f"{rss_mb:.0f} MB" if rss_mb is not None else "n/a"
+
+class ResourceManager:
+    """
+    Owns the process-wide RAGController.
+
+    Streamlit re-runs the whole script on every interaction, so building the
+    controller there reloads the embedding model and the FAISS index each time.
+    Here it is built once, shared by every session/thread, and only rebuilt
+    when the index on disk changes. With the snapshot watcher on (INDEX_WATCH_INTERVAL)
+    the retriever swaps a rebuilt index in by itself and the controller is kept.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._controller = None
+        self._fingerprint = None
+        self._warm_thread = None
+        self.stats = {
+            "loads": 0,
+            "last_load_seconds": None,
+            "loaded_at": None,
+            "rss_mb": None,
+            "index_fingerprint": None,
+        }
+
+    def _index_fingerprint(self):
+        if settings.INDEX_WATCH_INTERVAL > 0:
+            return "watched"  # BNSRetriever.refresh() follows the index instead
+        return get_index_fingerprint()
+
+    def get_controller(self):
+        fingerprint = self._index_fingerprint()
+
+        # Fast path: no lock once loaded and the index hasn't changed
+        controller = self._controller
+        if controller is not None and fingerprint == self._fingerprint:
+            return controller
+
+        with self._lock:
+            if self._controller is None or fingerprint != self._fingerprint:
+                self._load()
+            return self._controller
+
+    def peek_controller(self):
+        """The loaded controller, or None; unlike get_controller() this never loads."""
+        return self._controller
+
+    def _load(self):
+        from rag.answer_generator import RAGController
+
+        if self._controller is not None:
+            logger.info("Index changed on disk, reloading RAG controller (pid %d)...", os.getpid())
+            # Drop the old index before loading the new one to avoid holding both
+            self._controller.retriever.close()
+            self._controller = None
+
+        start = time.perf_counter()
+        controller = RAGController()
+        elapsed = time.perf_counter() - start
+
+        self._controller = controller
+        # The index may have been rebuilt while loading (see EMBEDDING_MISMATCH)
+        self._fingerprint = self._index_fingerprint()
+        self.stats.update({
+            "loads": self.stats["loads"] + 1,
+            "last_load_seconds": round(elapsed, 3),
+            "loaded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "rss_mb": get_rss_mb(),
+            "index_fingerprint": get_index_fingerprint(),
+        })
+        logger.info(
+            "RAG controller loaded in %.2fs (load #%d, RSS %s, pid %d)",
+            elapsed, self.stats["loads"], format_rss(self.stats["rss_mb"]), os.getpid()
+        )
+
+    def warm(self, background: bool = True):
+        """Load the controller ahead of the first query."""
+        if not background:
+            self.get_controller()
+            return
+
+        with self._lock:
+            if self._controller is not None or (self._warm_thread and self._warm_thread.is_alive()):
+                return
+            self._warm_thread = threading.Thread(target=self._warm_safely, name="rag-warmup", daemon=True)
+            self._warm_thread.start()
+
+    def _warm_safely(self):
+        try:
+            self.get_controller()
+        except Exception as e:
+            logger.warning("Warm-up failed (will retry on first query): %s", e)
+
+    def reload(self):
+        """Force a rebuild on the next get_controller() call."""
+        with self._lock:
+            self._fingerprint = None
+
+    def close(self):
+        with self._lock:
+            if self._controller is not None:
+                self._controller.retriever.close()
+            self._controller = None
+            self._fingerprint = None
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["current_rss_mb"] = get_rss_mb()
+        controller = self._controller
+        stats["index_version"] = controller.retriever.index_version if controller else None
+        return stats
+
+resources = ResourceManager()
@@ -1,79 +1,437 @@
-
-import re
+import contextvars
+import logging
+import threading
+import weakref
+import numpy as np
+from contextlib import contextmanager
+from functools import wraps
 from typing import List, Dict
 from langchain_core.documents import Document
-from indexing.vector_store_utils import create_or_load_vector_store
-from mappings.ipc_bns_mapping import mapper
+from indexing.vector_store_utils import (
+    get_embedding_model, get_index_path, check_embedding_compatibility, embeddings_compatible,
+    load_vector_store, resolve_snapshot
+)
+from indexing.section_index import SectionIndex, get_section_index_path
+from indexing.bm25_index import BM25Index, get_bm25_index_path
+from indexing.ann_index import get_exact_index
+from indexing.mmap_store import MmapVectorStore
+from indexing.row_groups import RowGroups, SearchFilter
+from config.settings import settings
+from rag.query_parser import normalize_query, query_cache_key, parse_section_references
+from rag.section_lookup import resolve_section_refs
+from rag.query_cache import query_cache
+from rag.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Metadata added by retrieve() on top of the stored chunk metadata; this is what the result cache keeps
+RESULT_FIELDS = ("score", "match_type", "is_mapped", "similarity", "bm25_score", "subsection")
+
+SECTION_AGGREGATIONS = ("max", "sum", "decay")
+
+def _aggregate(scores: List[float], aggregation: str) -> float:
+    """Combines the chunk scores (best first) of one section."""
+    if aggregation == "max":
+        return scores[0]
+    if aggregation == "sum":
+        return sum(scores)
+    if aggregation == "decay":
+        # Best chunk counts fully, each further matching chunk a little less
+        return sum(score * settings.SECTION_SCORE_DECAY ** i for i, score in enumerate(scores))
+    raise ValueError(f"Unknown section aggregation '{aggregation}' (expected one of {SECTION_AGGREGATIONS})")
+
+def collapse_sections(docs: List[Document], k: int, chunks_per_section: int, aggregation: str = "decay") -> List[Dict]:
+    """
+    Groups ranked chunks by section and ranks the sections by their aggregated score.
+    Exact and IPC-mapped sections always come first.
+    """
+    grouped = {}
+    for doc in docs:
+        sec_num = str(doc.metadata.get("section_number", ""))
+        grouped.setdefault(sec_num, []).append(doc)
+
+    sections = []
+    for sec_num, chunks in grouped.items():
+        chunks.sort(key=lambda d: d.metadata.get("score", 0), reverse=True)
+        best = chunks[0].metadata
+        sections.append({
+            "section_number": sec_num,
+            "section_title": best.get("section_title", ""),
+            "page_range": best.get("page_range", best.get("start_page")),
+            "score": _aggregate([d.metadata.get("score", 0) for d in chunks], aggregation),
+            "best_score": best.get("score", 0),
+            "match_type": best.get("match_type"),
+            "is_mapped": any(d.metadata.get("is_mapped") for d in chunks),
+            "chunks": chunks[:chunks_per_section],
+        })
+
+    sections.sort(key=lambda s: (s["match_type"] in ("exact", "mapped"), s["score"]), reverse=True)
+    return sections[:k]
+
+class IndexSnapshot:
+    """Everything loaded from one index snapshot (see indexing/snapshots.py); swapped as a whole."""
+
+    def __init__(self, embeddings, snapshot_dir, version):
+        self.version = version
+        self.vector_store = load_vector_store(embeddings, snapshot_dir=snapshot_dir, version=version)
+        self.section_index = SectionIndex(get_section_index_path(snapshot_dir))
+        self.bm25 = BM25Index.load(get_bm25_index_path(snapshot_dir)) if settings.HYBRID_SEARCH else None
+        self.exact_index = get_exact_index(self.vector_store.index) if self.vector_store else None
+        self.row_groups = RowGroups.load(snapshot_dir, self.vector_store) if self.vector_store else None
+
+# (retriever, snapshot) serving the current retrieve() call
+_pinned_snapshot = contextvars.ContextVar("pinned_snapshot", default=None)
+
+def _serves_one_snapshot(method):
+    """Runs a retrieval method against a single snapshot, even if a new one is swapped in meanwhile."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._pinned():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _watch_snapshots(retriever_ref, stop: threading.Event, interval: float):
+    # Holds only a weak reference, so a dropped retriever is collected and its watcher exits
+    while not stop.wait(interval):
+        retriever = retriever_ref()
+        if retriever is None:
+            return
+        try:
+            retriever.refresh()
+        except Exception as e:
+            logger.error("Could not load the new index snapshot, still serving %s: %s", retriever.index_version, e)
+        del retriever
 
 class BNSRetriever:
     def __init__(self):
-        self.vector_store, self.embeddings = create_or_load_vector_store()
-        
+        self.embeddings = get_embedding_model()
+        if get_index_path().exists():
+            # Query vectors must live in the same space as the indexed ones
+            check_embedding_compatibility(self.embeddings)
+        self._snapshot = IndexSnapshot(self.embeddings, *resolve_snapshot())
+        self._swap_lock = threading.Lock()
+        self._skipped_version = None
+        # Cached results are keyed by index version, so a rebuilt index never serves stale hits
+        query_cache.set_index_version(self.index_version)
+
+        # A rebuilt index is swapped in by a background thread, without blocking queries
+        self._stop_watching = threading.Event()
+        if settings.INDEX_WATCH_INTERVAL > 0:
+            threading.Thread(
+                target=_watch_snapshots,
+                args=(weakref.ref(self), self._stop_watching, settings.INDEX_WATCH_INTERVAL),
+                name="index-watcher", daemon=True
+            ).start()
+
+    # The served index: the snapshot pinned by the running retrieve() call, else the latest
+    def _current_snapshot(self) -> IndexSnapshot:
+        pinned = _pinned_snapshot.get()
+        if pinned is not None and pinned[0] is self:
+            return pinned[1]
+        return self._snapshot
+
+    @contextmanager
+    def _pinned(self):
+        pinned = _pinned_snapshot.get()
+        if pinned is not None and pinned[0] is self:
+            yield  # nested call (retrieve_sections -> retrieve): keep the outer pin
+            return
+        token = _pinned_snapshot.set((self, self._snapshot))
+        try:
+            yield
+        finally:
+            _pinned_snapshot.reset(token)
+
+    @property
+    def vector_store(self):
+        return self._current_snapshot().vector_store
+
+    @property
+    def section_index(self) -> SectionIndex:
+        return self._current_snapshot().section_index
+
+    @property
+    def bm25(self):
+        return self._current_snapshot().bm25
+
+    @property
+    def exact_index(self):
+        return self._current_snapshot().exact_index
+
+    @property
+    def row_groups(self) -> RowGroups:
+        return self._current_snapshot().row_groups
+
+    @property
+    def index_version(self):
+        return self._current_snapshot().version
+
+    def refresh(self) -> bool:
+        """
+        Loads and swaps in the snapshot manifest.json points at, if it is not the one served.
+        Queries keep running on the old snapshot while the new one loads. True if swapped.
+        """
+        snapshot_dir, version = resolve_snapshot()
+        if version == self._snapshot.version or version == self._skipped_version:
+            return False
+        with self._swap_lock:
+            if version == self._snapshot.version:
+                return False
+            compatible, _ = embeddings_compatible(self.embeddings, snapshot_dir)
+            if not compatible:
+                # Needs another embedding model: only a restart (or the controller reload) can serve it
+                logger.warning("Index snapshot %s was built with other embeddings, still serving %s.", version, self._snapshot.version)
+                self._skipped_version = version
+                return False
+
+            snapshot = IndexSnapshot(self.embeddings, snapshot_dir, version)
+            previous, self._snapshot = self._snapshot.version, snapshot
+            query_cache.set_index_version(version)
+        logger.info("Swapped index snapshot %s -> %s.", previous, version)
+        return True
+
+    def close(self):
+        """Stops the snapshot watcher."""
+        self._stop_watching.set()
+
+
     def _extract_ipc_sections(self, query: str) -> List[str]:
-        # Regex to find "IPC" followed by number
-        matches = re.findall(r"IPC\s*(\d+[A-Z]?)", query, re.IGNORECASE)
-        return matches
+        return [ref["section"] for ref in parse_section_references(query) if ref["act"] == "IPC"]
+
+    def _resolve_section_refs(self, refs: List[Dict]) -> List[Dict]:
+        """resolve_section_refs, logging each IPC reference that was mapped."""
+        targets = resolve_section_refs(refs)
+        for ref, target in zip(refs, targets):
+            if target["section"] and target["is_mapped"]:
+                logger.debug("IPC %s maps to BNS %s", ref["section"], target["mapping"]["bns_section"])
+        return targets
+
+    def _chunk_to_document(self, chunk: Dict) -> Document:
+        metadata = dict(chunk["metadata"])
+        metadata["id"] = chunk["id"]
+        return Document(page_content=chunk["text"], metadata=metadata)
+
+    def _exact_lookup(self, targets: List[Dict], k: int) -> List[Document]:
+        """Direct section lookup: no embedding, no vector search."""
+        docs = []
+        for target in targets:
+            for chunk in self.section_index.get_chunks(target["section"]):
+                doc = self._chunk_to_document(chunk)
+                doc.metadata.update({
+                    "score": 1.0,
+                    "match_type": "exact",
+                    "is_mapped": target["is_mapped"]
+                })
+                if target["subsection"]:
+                    doc.metadata["subsection"] = target["subsection"]
+                docs.append(doc)
+        return docs[:k]
 
-    def retrieve(self, query: str, k: int = 12, score_threshold: float = 0.3) -> List[Document]:
+    @_serves_one_snapshot
+    def retrieve(self, query: str, k: int = 12, score_threshold: float = 0.3, exact: bool = False,
+                 sections: List[str] = None, chapter: str = None, section_range=None, act: str = None) -> List[Document]:
+        """
+        exact=True forces brute-force search even when the index is approximate (HNSW / IVF-PQ).
+        sections=["103", "105"], chapter="XVII", section_range=(303, 334) and act="BNS" restrict
+        the results to matching chunks; only the vectors they allow are searched (RowGroups.search).
+        Results are served from the process-wide query cache when the same question was seen before.
+        """
+        search_filter = SearchFilter(sections, chapter, section_range, act)
+        cache_key = self._results_key(query, k, score_threshold, exact, search_filter)
+        cached = query_cache.get_results(cache_key)
+        telemetry.set(retrieval_cache_hit=cached is not None, index_version=self.index_version)
+        if cached is not None:
+            return self._materialize(cached)
+
+        docs = self._retrieve_uncached(query, k, score_threshold, exact, search_filter)
+        self._cache_results(cache_key, docs)
+        return docs
+
+    @_serves_one_snapshot
+    def retrieve_sections(self, query: str, k: int = None, chunks_per_section: int = None,
+                          aggregation: str = None, score_threshold: float = 0.3, exact: bool = False, **filters) -> List[Dict]:
+        """
+        Top-k distinct sections for a query, each with its best-matching chunks:
+        [{"section_number", "section_title", "page_range", "score", "best_score",
+          "match_type", "is_mapped", "chunks": [Document, ...]}, ...]
+        Sibling chunks of one section raise its score instead of taking the slots of other sections.
+        filters: sections / chapter / section_range / act, as for retrieve().
+        """
+        k = k or settings.SECTION_TOP_K
+        chunks_per_section = chunks_per_section or settings.SECTION_MAX_CHUNKS
+        aggregation = aggregation or settings.SECTION_AGGREGATION
+        docs = self.retrieve(query, k=k * chunks_per_section, score_threshold=score_threshold, exact=exact, **filters)
+        return collapse_sections(docs, k, chunks_per_section, aggregation)
+
+    @_serves_one_snapshot
+    def retrieve_batch(self, queries: List[str], k: int = 12, score_threshold: float = 0.3, exact: bool = False,
+                       **filters) -> List[List[Document]]:
+        """
+        retrieve() for many queries at once: the cache misses are embedded in one batch
+        and searched with one FAISS call, then ranked one by one as usual.
+        filters: sections / chapter / section_range / act, applied to every query.
+        """
+        search_filter = SearchFilter(**filters)
+        results = [None] * len(queries)
+        pending = []
+        for i, query in enumerate(queries):
+            cached = query_cache.get_results(self._results_key(query, k, score_threshold, exact, search_filter))
+            if cached is not None:
+                results[i] = self._materialize(cached)
+            else:
+                pending.append(i)
+
+        dense = {}
+        dense_needed = [i for i in pending if self._needs_dense_search(queries[i], search_filter)]
+        if dense_needed and self.vector_store:
+            vectors = self._embed_queries([normalize_query(queries[i]) for i in dense_needed])
+            rows = self.row_groups.select(search_filter)
+            for i, hits in zip(dense_needed, self._search_vectors(vectors, k, exact, rows)):
+                dense[i] = hits
+
+        for i in pending:
+            docs = self._retrieve_uncached(queries[i], k, score_threshold, exact, search_filter, dense_results=dense.get(i))
+            self._cache_results(self._results_key(queries[i], k, score_threshold, exact, search_filter), docs)
+            results[i] = docs
+        return results
+
+    @_serves_one_snapshot
+    def retrieve_sections_batch(self, queries: List[str], k: int = None, chunks_per_section: int = None,
+                                aggregation: str = None, score_threshold: float = 0.3, exact: bool = False,
+                                **filters) -> List[List[Dict]]:
+        """retrieve_sections() for many queries, using one batched retrieval."""
+        k = k or settings.SECTION_TOP_K
+        chunks_per_section = chunks_per_section or settings.SECTION_MAX_CHUNKS
+        aggregation = aggregation or settings.SECTION_AGGREGATION
+        batch = self.retrieve_batch(queries, k=k * chunks_per_section, score_threshold=score_threshold, exact=exact, **filters)
+        return [collapse_sections(docs, k, chunks_per_section, aggregation) for docs in batch]
+
+    def _results_key(self, query: str, k: int, score_threshold: float, exact: bool, search_filter: SearchFilter):
+        return (query_cache_key(query), k, score_threshold, exact, search_filter.key(), settings.HYBRID_SEARCH, self.index_version)
+
+    def _cache_results(self, cache_key, docs: List[Document]):
+        query_cache.put_results(cache_key, [
+            (doc.metadata["id"], {f: doc.metadata[f] for f in RESULT_FIELDS if f in doc.metadata})
+            for doc in docs
+        ])
+
+    def _needs_dense_search(self, query: str, search_filter: SearchFilter) -> bool:
+        """False if the query is answered by the exact section lookup alone."""
+        targets = self._filter_targets(self._resolve_section_refs(parse_section_references(normalize_query(query))), search_filter)
+        return not (targets and all(t["section"] in self.section_index for t in targets))
+
+    def _filter_targets(self, targets: List[Dict], search_filter: SearchFilter) -> List[Dict]:
+        """Drops referenced sections the filter excludes (unknown ones are kept, they fall back to search)."""
+        if not search_filter:
+            return targets
+        return [
+            t for t in targets
+            if t["section"] not in self.section_index
+            or search_filter.matches(self.section_index.get_chunks(t["section"])[0]["metadata"])
+        ]
+
+    def _materialize(self, cached) -> List[Document]:
+        docs = []
+        for chunk_id, extras in cached:
+            chunk = self.section_index.get_chunk(chunk_id)
+            if chunk:
+                doc = self._chunk_to_document(chunk)
+                doc.metadata.update(extras)
+                docs.append(doc)
+        return docs
+
+    def _retrieve_uncached(self, query: str, k: int, score_threshold: float, exact: bool,
+                           search_filter: SearchFilter, dense_results=None) -> List[Document]:
         # 0. Normalize Query: Strip whitespace and common trailing punctuation
         # This addresses the user requirement: "Treat user queries the same regardless of punctuation"
-        query = query.strip().rstrip(".,;!?")
+        with telemetry.span("normalize"):
+            query = normalize_query(query)
         
-        # 1. Check for IPC references and map to BNS
-        ipc_refs = self._extract_ipc_sections(query)
-        mapped_bns_sections = []
-        
-        for ipc_sec in ipc_refs:
-            mapping = mapper.resolve_ipc(ipc_sec)
-            if mapping:
-                bns_sec = str(mapping["bns_section"])
-                mapped_bns_sections.append(bns_sec)
-                print(f"DEBUG: Found IPC {ipc_sec} -> Mapping to BNS {bns_sec}")
+        # 1. Check for explicit BNS/IPC section references (IPC is mapped to BNS)
+        with telemetry.span("ipc_mapping"):
+            targets = self._filter_targets(self._resolve_section_refs(parse_section_references(query)), search_filter)
+
+        # Fast path: every referenced section is known, return it exactly
+        if targets and all(t["section"] in self.section_index for t in targets):
+            telemetry.set(exact_match=True)
+            with telemetry.span("exact_lookup"):
+                return self._exact_lookup(targets, k)
+
+        mapped_bns_sections = [t["section"] for t in targets if t["is_mapped"] and t["section"]]
         
         if not self.vector_store:
-            print("ERROR: Vector store not initialized.")
+            logger.error("Vector store not initialized.")
             return []
 
-        # 2. Get semantic Search results
-        # Use a larger k initially if we have mappings to filter
-        search_k = k * 3 if mapped_bns_sections else k
-        results = self.vector_store.similarity_search_with_score(query, k=search_k)
-        
+        # 2. Candidates: dense (semantic) + lexical (BM25), fused by reciprocal rank,
+        # over the rows the filters allow (all rows without filters)
+        rows = self.row_groups.select(search_filter)
+        if dense_results is None:
+            dense_results = self._dense_search(query, k, exact=exact, rows=rows)
+        with telemetry.span("bm25_search"):
+            allowed_ids = self.row_groups.chunk_ids_at(rows) if rows is not None else None
+            lexical_results = self._lexical_search(query, k, allowed_ids) if self.bm25 else []
+        # Chunks of IPC-mapped sections: searched among their own vectors only, not over-fetched
+        mapped_results = self._dense_search(query, k, rows=self.row_groups.select(
+            SearchFilter(sections=mapped_bns_sections))) if mapped_bns_sections else []
+        with telemetry.span("fusion_filter"):
+            candidates = self._fuse(dense_results, lexical_results)
+            for doc, distance in mapped_results:
+                candidates.setdefault(doc.metadata["id"], {"doc": doc, "distance": distance, "bm25": None, "rrf": 0.0})
+            return self._rank_candidates(candidates, mapped_bns_sections, bool(lexical_results), k)
+
+    def _rank_candidates(self, candidates: Dict[str, Dict], mapped_bns_sections: List[str],
+                         has_lexical: bool, k: int) -> List[Document]:
         final_docs = []
         seen_ids = set()
         
         # 3. Priority 1: Chunks explicitly mapped from IPC
         if mapped_bns_sections:
-            for doc, distance in results:
+            for doc_id, cand in candidates.items():
+                doc = cand["doc"]
                 sec_num = str(doc.metadata.get("section_number", ""))
                 if sec_num in mapped_bns_sections:
                     doc.metadata["score"] = 1.0 # Priority boost
                     doc.metadata["is_mapped"] = True
-                    doc_id = doc.metadata.get("id", str(hash(doc.page_content)))
-                    if doc_id not in seen_ids:
-                        final_docs.append(doc)
-                        seen_ids.add(doc_id)
-
-        # 4. Priority 2: Semantic matches
-        for doc, distance in results:
-            similarity = 1 / (1 + distance)
-            doc_id = doc.metadata.get("id", str(hash(doc.page_content)))
-            
+                    doc.metadata["match_type"] = "mapped"
+                    final_docs.append(doc)
+                    seen_ids.add(doc_id)
+
+        # 4. Priority 2: Semantic / lexical matches
+        best_bm25 = max((c["bm25"] for c in candidates.values() if c["bm25"] is not None), default=0.0)
+        max_rrf = 2 / (settings.RRF_K + 1)
+        for doc_id, cand in candidates.items():
             if doc_id in seen_ids:
                 continue
+
+            doc, distance, bm25 = cand["doc"], cand["distance"], cand["bm25"]
                 
             # Strict Thresholding:
             # If IPC was mentioned (is_mapped=True), we are lenient because mappings are hard-coded rules.
             # If pure semantic search, we must be strict to avoid hallucinating unrelated sections.
-            if distance > 1.1 and not doc.metadata.get("is_mapped", False):
-                # distance is L2 distance (lower is better).
-                # 0.0 = exact match. > 1.0 is very far.
-                # Threshold ~0.65-0.7 keeps quality high for MiniLM.
+            # distance is L2 distance (lower is better).
+            # 0.0 = exact match. > 1.0 is very far.
+            # Threshold ~0.65-0.7 keeps quality high for MiniLM.
+            dense_ok = distance is not None and distance <= 1.1
+            # Lexical-only hits must be strong relative to the best BM25 hit for this query,
+            # otherwise generic words ("punishment") would pull in unrelated sections.
+            lexical_ok = bm25 is not None and bm25 >= 0.5 * best_bm25
+            if not (dense_ok or lexical_ok):
                 continue
             
             # Normalize score for UI (0 to 1)
-            similarity = 1 / (1 + distance)
-            doc.metadata["score"] = similarity
+            if has_lexical:
+                doc.metadata["score"] = cand["rrf"] / max_rrf
+            else:
+                doc.metadata["score"] = 1 / (1 + distance)
+            if distance is not None:
+                doc.metadata["similarity"] = 1 / (1 + distance)
+            if bm25 is not None:
+                doc.metadata["bm25_score"] = bm25
+            if distance is not None and bm25 is not None:
+                doc.metadata["match_type"] = "hybrid"
+            else:
+                doc.metadata["match_type"] = "semantic" if distance is not None else "lexical"
             
             final_docs.append(doc)
             seen_ids.add(doc_id)
@@ -81,3 +439,87 @@ class BNSRetriever:
         # 5. Sort by relevance and limit to k
         final_docs.sort(key=lambda x: x.metadata.get("score", 0), reverse=True)
         return final_docs[:k]
+
+    def _dense_search(self, query: str, n: int, exact: bool = False, rows: np.ndarray = None):
+        """[(Document, l2_distance)] from FAISS, best first."""
+        return self._search_vectors(self._embed_query(query), n, exact, rows)[0]
+
+    def _search_vectors(self, vectors: np.ndarray, n: int, exact: bool = False, rows: np.ndarray = None):
+        """
+        One FAISS search for a batch of query vectors: a [(Document, l2_distance)] list per row.
+        With `rows` (RowGroups.select) only those vectors are considered (see RowGroups.search).
+        """
+        with telemetry.span("faiss_search"):
+            if rows is not None:
+                distances, indices = self.row_groups.search(self.vector_store.index, vectors, rows, n, exact=exact)
+            else:
+                # HNSW / IVF-PQ indexes expose a brute-force view over the same vectors
+                index = self.exact_index if exact else self.vector_store.index
+                distances, indices = index.search(vectors, n)
+
+        batch = []
+        for row_distances, row_indices in zip(distances, indices):
+            # ANN indexes may return fewer than n hits (-1)
+            hits = [(int(i), float(distance)) for distance, i in zip(row_distances, row_indices) if i != -1]
+            docs = self._documents_at([i for i, _ in hits])
+            batch.append([(doc, distance) for doc, (_, distance) in zip(docs, hits) if doc is not None])
+        return batch
+
+    def _documents_at(self, rows: List[int]) -> List[Document]:
+        """Documents for index row ids, safe to tag (None for an unknown row)."""
+        if isinstance(self.vector_store, MmapVectorStore):
+            return self.vector_store.documents(rows)
+        docs = []
+        for i in rows:
+            doc = self.vector_store.docstore.search(self.vector_store.index_to_docstore_id[i])
+            # The retriever is shared across sessions/threads, so tag copies rather
+            # than the docstore's own Document objects.
+            docs.append(Document(page_content=doc.page_content, metadata=dict(doc.metadata)))
+        return docs
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        key = query_cache_key(query)
+        vector = query_cache.get_embedding(key)
+        telemetry.set(embedding_cache_hit=vector is not None)
+        if vector is None:
+            with telemetry.span("embedding"):
+                vector = np.asarray([self.embeddings.embed_query(query)], dtype="float32")
+            query_cache.put_embedding(key, vector)
+        return vector
+
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Query vectors for many queries; cache misses are embedded in one vectorized call."""
+        keys = [query_cache_key(query) for query in queries]
+        vectors = [query_cache.get_embedding(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with telemetry.span("embedding"):
+                embedded = self.embeddings.embed_documents([queries[i] for i in missing])
+            for i, values in zip(missing, embedded):
+                vectors[i] = np.asarray([values], dtype="float32")
+                query_cache.put_embedding(keys[i], vectors[i])
+        return np.concatenate(vectors)
+
+    def _lexical_search(self, query: str, n: int, allowed_ids=None):
+        """[(Document, bm25_score)] from the inverted index, best first (only `allowed_ids` if given)."""
+        hits = []
+        for chunk_id, score in self.bm25.search(query, n, allowed_ids):
+            chunk = self.section_index.get_chunk(chunk_id)
+            if chunk:
+                hits.append((self._chunk_to_document(chunk), score))
+        return hits
+
+    def _fuse(self, dense_results, lexical_results) -> Dict[str, Dict]:
+        """Reciprocal rank fusion: rrf = sum(1 / (RRF_K + rank)) over both rankings."""
+        candidates = {}
+        for rank, (doc, distance) in enumerate(dense_results):
+            doc_id = doc.metadata.get("id", str(hash(doc.page_content)))
+            cand = candidates.setdefault(doc_id, {"doc": doc, "distance": None, "bm25": None, "rrf": 0.0})
+            cand["distance"] = distance
+            cand["rrf"] += 1 / (settings.RRF_K + rank + 1)
+        for rank, (doc, score) in enumerate(lexical_results):
+            doc_id = doc.metadata.get("id", str(hash(doc.page_content)))
+            cand = candidates.setdefault(doc_id, {"doc": doc, "distance": None, "bm25": None, "rrf": 0.0})
+            cand["bm25"] = score
+            cand["rrf"] += 1 / (settings.RRF_K + rank + 1)
+        return dict(sorted(candidates.items(), key=lambda item: item[1]["rrf"], reverse=True))
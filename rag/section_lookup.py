@@ -0,0 +1,48 @@
+from typing import Dict, List
+from mappings.ipc_bns_mapping import get_mapper
+from rag.query_parser import parse_section_references, split_section_number
+from indexing.section_store import get_section_store
+
+# Section lookups without the retrieval stack: "IPC 302" or "BNS 103(1)" only needs the
+# IPC -> BNS mapping CSV and the section store JSON. No FAISS, no embedding model, no
+# LLM, so the CLI can answer these in a fraction of a second (see main.py). The
+# retriever uses resolve_section_refs for its exact-match path too.
+
+def resolve_section_refs(refs: List[Dict]) -> List[Dict]:
+    """Maps parsed BNS/IPC references to BNS sections (section is None if an IPC ref has no mapping)."""
+    targets = []
+    for ref in refs:
+        if ref["act"] != "IPC":
+            targets.append({"section": ref["section"], "subsection": ref["subsection"], "is_mapped": False, "mapping": None})
+            continue
+
+        mapping = get_mapper().resolve_ipc(ref["section"])
+        bns = split_section_number(mapping["bns_section"]) if mapping else None
+        targets.append({
+            "section": bns["section"] if bns else None,
+            "subsection": bns["subsection"] if bns else None,
+            "is_mapped": True,
+            "mapping": mapping
+        })
+    return targets
+
+def lookup_sections(query: str) -> List[Dict]:
+    """
+    One entry per section reference in the query:
+    {"reference": "IPC 302", "section": "103", "subsection": None, "mapping": {...} or None,
+     "title": str or None, "text": str or None}
+    """
+    refs = parse_section_references(query)
+    store = get_section_store()
+    results = []
+    for ref, target in zip(refs, resolve_section_refs(refs)):
+        entry = store.get(target["section"]) if target["section"] else None
+        results.append({
+            "reference": f"{ref['act']} {ref['section']}" + (f"({ref['subsection']})" if ref["subsection"] else ""),
+            "section": target["section"],
+            "subsection": target["subsection"],
+            "mapping": target["mapping"],
+            "title": entry.get("title") if entry else None,
+            "text": entry["text"] if entry else None,
+        })
+    return results
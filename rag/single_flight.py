@@ -0,0 +1,360 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, Dict, Iterator
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _AsyncStream:
+    def __init__(self):
+        self.task = None
+        self.waiters = 0  # callers still awaiting the (info, broadcast) pair
+
+class TokenBroadcast:
+    """
+    Fans one token stream out to any number of readers.
+
+    A background thread pulls tokens from the source into a shared buffer; each
+    reader first replays what is already buffered, then follows the live stream.
+    If every reader goes away before the end, the source is closed (which stops
+    the LLM call).
+    """
+
+    def __init__(self, source: Iterator[str], on_done: Callable = None):
+        self._source = source
+        self._on_done = on_done
+        self._tokens = []
+        self._finished = False
+        self._error = None
+        self._readers = 0
+        self._started = False
+        self._cond = threading.Condition()
+
+    def subscribe(self) -> Iterator[str]:
+        with self._cond:
+            self._readers += 1
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._pump, name="single-flight-stream", daemon=True).start()
+        return _Reader(self)
+
+    def _leave(self):
+        with self._cond:
+            self._readers -= 1
+
+    def _pump(self):
+        try:
+            for token in self._source:
+                with self._cond:
+                    if self._readers == 0:
+                        break # Nobody is listening any more
+                    self._tokens.append(token)
+                    self._cond.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            if hasattr(self._source, "close"):
+                self._source.close()
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+            if self._on_done:
+                self._on_done()
+
+    def _follow(self) -> Iterator[str]:
+        position = 0
+        try:
+            while True:
+                with self._cond:
+                    while position >= len(self._tokens) and not self._finished:
+                        self._cond.wait()
+                    new_tokens = self._tokens[position:]
+                    position = len(self._tokens)
+                    finished = self._finished
+                yield from new_tokens
+                if finished and position >= len(self._tokens):
+                    break
+            if self._error is not None:
+                raise self._error
+        finally:
+            self._leave()
+
+class _Reader:
+    """One subscriber of a TokenBroadcast; closing (or dropping) it before the first token also counts as leaving."""
+
+    def __init__(self, broadcast: TokenBroadcast):
+        self._broadcast = broadcast
+        self._tokens = broadcast._follow()
+        self._started = False
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._closed:
+            raise StopIteration
+        self._started = True
+        return next(self._tokens)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._started:
+            self._tokens.close()
+        else:
+            self._broadcast._leave()
+
+    def __del__(self):
+        self.close()
+
+class AsyncTokenBroadcast:
+    """
+    TokenBroadcast for the event loop: a task pulls tokens from an async source into
+    the shared buffer, readers replay it and then follow the live stream. When the last
+    reader goes away before the end, the task is cancelled (which stops the LLM call).
+    """
+
+    def __init__(self, source: AsyncIterator[str], on_done: Callable = None):
+        self._source = source
+        self._on_done = on_done
+        self._tokens = []
+        self._finished = False
+        self._error = None
+        self._readers = 0
+        self._task = None
+        self._changed = asyncio.Condition()
+
+    def subscribe(self) -> AsyncIterator[str]:
+        self._readers += 1
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._pump())
+        return _AsyncReader(self)
+
+    def abandon(self):
+        """Drop a broadcast nobody subscribed to: close the source and end the flight."""
+        if self._task is None:
+            self._finished = True
+            self._task = asyncio.ensure_future(self._close())
+
+    async def _close(self):
+        try:
+            if hasattr(self._source, "aclose"):
+                await self._source.aclose()
+        finally:
+            if self._on_done:
+                self._on_done()
+
+    async def _pump(self):
+        try:
+            async for token in self._source:
+                self._tokens.append(token)
+                async with self._changed:
+                    self._changed.notify_all()
+        except asyncio.CancelledError:
+            self._error = RuntimeError("The token stream was cancelled: every reader went away.")
+        except Exception as e:
+            self._error = e
+        finally:
+            if hasattr(self._source, "aclose"):
+                await self._source.aclose()
+            self._finished = True
+            async with self._changed:
+                self._changed.notify_all()
+            if self._on_done:
+                self._on_done()
+
+    async def _follow(self) -> AsyncIterator[str]:
+        position = 0
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: position < len(self._tokens) or self._finished)
+                new_tokens = self._tokens[position:]
+                position += len(new_tokens)
+                for token in new_tokens:
+                    yield token
+                if self._finished and position >= len(self._tokens):
+                    break
+            if self._error is not None:
+                raise self._error
+        finally:
+            self._leave()
+
+    def _leave(self):
+        self._readers -= 1
+        if self._readers == 0 and not self._finished:
+            self._task.cancel() # Nobody is listening any more
+
+class _AsyncReader:
+    """One subscriber of an AsyncTokenBroadcast; closing it before the first token also counts as leaving."""
+
+    def __init__(self, broadcast: AsyncTokenBroadcast):
+        self._broadcast = broadcast
+        self._tokens = broadcast._follow()
+        self._started = False
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        self._started = True
+        return await self._tokens.__anext__()
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._started:
+            await self._tokens.aclose()
+        else:
+            self._broadcast._leave()
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work: while a call for a key is in flight,
+    other callers with the same key wait for it and share its result instead
+    of running their own retrieval and LLM call.
+
+    Only in-flight work is shared; once a call finishes the next caller starts
+    a new one (the answer cache covers repeats after that).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict = {}
+        self._async_flights: Dict = {}
+        self._async_streams: Dict = {}
+        self.started = 0
+        self.joined = 0
+
+    def _join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.joined += 1
+                return flight, False
+            flight = _Flight()
+            self._flights[key] = flight
+            self.started += 1
+            return flight, True
+
+    def _forget(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _wait(self, flight):
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def do(self, key, fn: Callable):
+        """Returns fn(), running it once for all concurrent callers with the same key."""
+        flight, leader = self._join(key)
+        if not leader:
+            return self._wait(flight)
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            self._forget(key, flight)
+            flight.done.set()
+        return flight.result
+
+    def stream(self, key, fn: Callable):
+        """
+        fn() returns (info, token iterator). Concurrent callers with the same key share
+        one call: each gets (info, its own reader over the shared token stream, joined).
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            info, broadcast = self._wait(flight)
+            return info, broadcast.subscribe(), True
+
+        try:
+            info, source = fn()
+            # The flight stays open until the last token, so late joiners can still catch up
+            broadcast = TokenBroadcast(source, on_done=lambda: self._forget(key, flight))
+            flight.result = (info, broadcast)
+            reader = broadcast.subscribe()
+        except Exception as e:
+            flight.error = e
+            self._forget(key, flight)
+            raise
+        finally:
+            flight.done.set()
+        return info, reader, False
+
+    async def ado(self, key, coro_fn: Callable):
+        """Async variant of do() for the event loop: coro_fn() is awaited once per key."""
+        task = self._async_flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self._async_flights[key] = task
+            task.add_done_callback(lambda _: self._async_flights.pop(key, None))
+            self.started += 1
+        else:
+            self.joined += 1
+        # A caller that times out or disconnects must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def astream(self, key, coro_fn: Callable):
+        """
+        Async variant of stream(): coro_fn() is awaited once per key and returns
+        (info, async token iterator); each caller gets (info, its own reader, joined).
+        """
+        flight = self._async_streams.get(key)
+        joined = flight is not None
+        if joined:
+            self.joined += 1
+        else:
+            self.started += 1
+            flight = _AsyncStream()
+
+            def forget():
+                if self._async_streams.get(key) is flight:
+                    del self._async_streams[key]
+
+            async def start():
+                try:
+                    info, source = await coro_fn()
+                except BaseException:
+                    forget()
+                    raise
+                # The flight stays open until the last token, so late joiners can still catch up
+                return info, AsyncTokenBroadcast(source, on_done=forget)
+
+            flight.task = asyncio.ensure_future(start())
+            self._async_streams[key] = flight
+
+        flight.waiters += 1
+        try:
+            # A caller that times out or disconnects must not cancel the call for the others
+            info, broadcast = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            flight.waiters -= 1
+            if flight.waiters == 0:
+                # Every caller gave up before the first token: nobody will read the stream
+                if flight.task.done() and not flight.task.cancelled() and flight.task.exception() is None:
+                    flight.task.result()[1].abandon()
+                else:
+                    flight.task.cancel()
+            raise
+        flight.waiters -= 1
+        return info, broadcast.subscribe(), joined
+
+    def stats(self) -> Dict:
+        in_flight = len(self._flights) + len(self._async_flights) + len(self._async_streams)
+        return {"started": self.started, "joined": self.joined, "in_flight": in_flight}
+
+flights = SingleFlight()
@@ -0,0 +1,281 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-request timing of the RAG pipeline.
+#
+#   with telemetry.trace("answer_question"):       # one trace per request
+#       with telemetry.span("faiss_search"):       # stages, anywhere down the call stack
+#           ...
+#       telemetry.set(answer_cache_hit=True)       # attributes (cache hits, token counts, ...)
+#
+# The current trace lives in a context variable, so the retriever doesn't need it passed in.
+# Finished traces go to the configured sinks. When telemetry is disabled span() returns a
+# shared no-op object, so instrumented code costs one attribute check per stage.
+
+_current_trace = contextvars.ContextVar("rag_trace", default=None)
+
+class Trace:
+    __slots__ = ("name", "start", "duration", "spans", "attrs")
+
+    def __init__(self, name: str, attrs: Dict = None):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans = {}  # stage -> seconds (summed if a stage runs more than once)
+        self.attrs = dict(attrs or {})
+
+    def add(self, stage: str, seconds: float):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace": self.name,
+            "total_ms": round((self.duration or 0.0) * 1000, 3),
+            "spans_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.spans.items()},
+            **self.attrs,
+        }
+
+class _Span:
+    __slots__ = ("trace", "stage", "start")
+
+    def __init__(self, trace: Trace, stage: str):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.stage, time.perf_counter() - self.start)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+# --- Sinks: anything with emit(trace) ---
+
+class LogSink:
+    """One structured (JSON) log line per finished trace."""
+
+    def emit(self, trace: Trace):
+        logger.info("TRACE %s", json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+
+class HistogramSink:
+    """
+    In-process aggregation: a latency histogram per stage, counters for boolean
+    attributes (cache hits, ...) and totals for token counts.
+    """
+
+    # Seconds; the last bucket is +Inf
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    TOKEN_ATTRS = ("prompt_tokens", "completion_tokens", "context_tokens")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (trace, stage) -> [bucket counts..., +Inf count, sum]
+        self._events = {}      # (trace, attr) -> count of traces where attr was True
+        self._tokens = {}      # attr -> total
+        self._traces = {}      # trace name -> count
+        self._index_version = None
+
+    def _observe(self, key, seconds: float):
+        hist = self._histograms.get(key)
+        if hist is None:
+            hist = self._histograms[key] = [0] * (len(self.BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+                break
+        else:
+            hist[len(self.BUCKETS)] += 1
+        hist[-1] += seconds
+
+    def emit(self, trace: Trace):
+        with self._lock:
+            self._traces[trace.name] = self._traces.get(trace.name, 0) + 1
+            self._observe((trace.name, "total"), trace.duration or 0.0)
+            for stage, seconds in trace.spans.items():
+                self._observe((trace.name, stage), seconds)
+            for attr, value in trace.attrs.items():
+                if value is True:
+                    self._events[(trace.name, attr)] = self._events.get((trace.name, attr), 0) + 1
+                elif attr in self.TOKEN_ATTRS and isinstance(value, (int, float)):
+                    self._tokens[attr] = self._tokens.get(attr, 0) + value
+            if trace.attrs.get("index_version"):
+                self._index_version = trace.attrs["index_version"]
+
+    def snapshot(self) -> Dict:
+        """Count, mean and approximate p50/p95 per stage (from the buckets), in ms."""
+        with self._lock:
+            stages = {}
+            for (trace_name, stage), hist in self._histograms.items():
+                count = sum(hist[:-1])
+                stages[f"{trace_name}.{stage}"] = {
+                    "count": count,
+                    "mean_ms": round(hist[-1] / count * 1000, 3) if count else 0.0,
+                    "p50_ms": self._quantile(hist, count, 0.5),
+                    "p95_ms": self._quantile(hist, count, 0.95),
+                }
+            return {
+                "traces": dict(self._traces),
+                "stages": stages,
+                "events": {f"{t}.{a}": n for (t, a), n in self._events.items()},
+                "tokens": dict(self._tokens),
+            }
+
+    def _quantile(self, hist, count: int, q: float) -> Optional[float]:
+        if not count:
+            return None
+        target = q * count
+        seen = 0
+        for i, bound in enumerate(self.BUCKETS):
+            seen += hist[i]
+            if seen >= target:
+                return bound * 1000
+        return float("inf")
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP rag_stage_duration_seconds Time spent per RAG pipeline stage.",
+            "# TYPE rag_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (trace_name, stage), hist in sorted(self._histograms.items()):
+                labels = f'trace="{trace_name}",stage="{stage}"'
+                cumulative = 0
+                for i, bound in enumerate(self.BUCKETS):
+                    cumulative += hist[i]
+                    lines.append(f'rag_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                cumulative += hist[len(self.BUCKETS)]
+                lines.append(f'rag_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+                lines.append(f"rag_stage_duration_seconds_sum{{{labels}}} {hist[-1]:.6f}")
+                lines.append(f"rag_stage_duration_seconds_count{{{labels}}} {cumulative}")
+
+            lines += ["# HELP rag_requests_total Finished traces.", "# TYPE rag_requests_total counter"]
+            for trace_name, count in sorted(self._traces.items()):
+                lines.append(f'rag_requests_total{{trace="{trace_name}"}} {count}')
+
+            lines += ["# HELP rag_events_total Traces in which an event (e.g. a cache hit) happened.", "# TYPE rag_events_total counter"]
+            for (trace_name, attr), count in sorted(self._events.items()):
+                lines.append(f'rag_events_total{{trace="{trace_name}",event="{attr}"}} {count}')
+
+            lines += ["# HELP rag_tokens_total Prompt / completion tokens.", "# TYPE rag_tokens_total counter"]
+            for attr, total in sorted(self._tokens.items()):
+                lines.append(f'rag_tokens_total{{kind="{attr}"}} {total}')
+
+            if self._index_version:
+                lines += ["# HELP rag_index_info Index version currently served.", "# TYPE rag_index_info gauge"]
+                lines.append(f'rag_index_info{{version="{self._index_version}"}} 1')
+        return "\n".join(lines) + "\n"
+
+SINKS = {
+    "log": LogSink,
+    "histogram": HistogramSink,
+}
+
+class Telemetry:
+    def __init__(self, enabled: bool = None, sinks: List = None):
+        self.enabled = settings.TELEMETRY_ENABLED if enabled is None else enabled
+        if sinks is None:
+            names = [name.strip() for name in settings.TELEMETRY_SINKS.split(",") if name.strip()]
+            sinks = [SINKS[name]() for name in names if name in SINKS]
+        self.sinks = sinks
+
+    @property
+    def histograms(self) -> Optional[HistogramSink]:
+        return next((sink for sink in self.sinks if isinstance(sink, HistogramSink)), None)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    # --- Traces ---
+
+    def start_trace(self, name: str, **attrs) -> Optional[Trace]:
+        return Trace(name, attrs) if self.enabled else None
+
+    def finish(self, trace: Optional[Trace]):
+        if trace is None or trace.duration is not None:
+            return
+        trace.duration = time.perf_counter() - trace.start
+        for sink in self.sinks:
+            try:
+                sink.emit(trace)
+            except Exception as e:
+                logger.warning("Telemetry sink %s failed: %s", sink.__class__.__name__, e)
+
+    @contextmanager
+    def activate(self, trace: Optional[Trace]):
+        """Makes `trace` the current one (e.g. in a worker thread or a generator)."""
+        if trace is None:
+            yield None
+            return
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def trace(self, name: str, **attrs):
+        trace = self.start_trace(name, **attrs)
+        if trace is None:
+            yield None
+            return
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        except BaseException:
+            trace.set(error=True)
+            raise
+        finally:
+            _current_trace.reset(token)
+            self.finish(trace)
+
+    def current(self) -> Optional[Trace]:
+        return _current_trace.get() if self.enabled else None
+
+    # --- Inside a trace ---
+
+    def span(self, stage: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        trace = _current_trace.get()
+        return _Span(trace, stage) if trace is not None else _NULL_SPAN
+
+    def set(self, **attrs):
+        if not self.enabled:
+            return
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.set(**attrs)
+
+    def render_prometheus(self) -> str:
+        histograms = self.histograms
+        return histograms.render_prometheus() if histograms else ""
+
+telemetry = Telemetry()
+
+def configure_logging():
+    """Log records (traces included) to stderr at LOG_LEVEL, unless the application set up logging itself."""
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -0,0 +1,75 @@
+import argparse
+import time
+from rag.resources import resources
+from rag.answer_cache import get_answer_cache
+
+# Questions that account for most of the traffic
+COMMON_QUESTIONS = [
+    "What is the punishment for murder?",
+    "Punishment for theft",
+    "What is the punishment for rape?",
+    "What is culpable homicide?",
+    "Punishment for dowry death",
+    "What is stalking?",
+    "Punishment for cheating",
+    "What is criminal breach of trust?",
+    "Punishment for kidnapping",
+    "What is extortion?",
+    "Punishment for robbery",
+    "What is dacoity?",
+    "Punishment for defamation",
+    "What is mob lynching?",
+    "What is organised crime?",
+    "What is petty organised crime?",
+    "Punishment for snatching",
+    "What is terrorist act under BNS?",
+    "Punishment for causing death by negligence",
+    "What is sedition under BNS?",
+    "IPC 302",
+    "IPC 420",
+    "IPC 376",
+    "IPC 498A",
+    "IPC 304B",
+    "IPC 379",
+]
+
+def section_questions(controller):
+    numbers = [n for n in controller.retriever.section_index.sections if n.isdigit() and n != "0"]
+    return [f"Explain BNS Section {n}" for n in sorted(numbers, key=int)]
+
+def warm_answer_cache(include_sections: bool = True, limit: int = None):
+    """Runs the common questions (and optionally every section) through the pipeline to fill the answer cache."""
+    cache = get_answer_cache()
+    if cache is None:
+        print("Answer cache is disabled (ANSWER_CACHE_ENABLED=false).")
+        return
+
+    controller = resources.get_controller()
+    questions = list(COMMON_QUESTIONS)
+    if include_sections:
+        questions += section_questions(controller)
+    if limit:
+        questions = questions[:limit]
+
+    print(f"Warming answer cache with {len(questions)} questions...")
+    start = time.perf_counter()
+    generated = already_cached = failed = 0
+    for i, question in enumerate(questions, 1):
+        result = controller.answer_question(question)
+        if result.get("cached"):
+            already_cached += 1
+        elif result["documents"]:
+            generated += 1
+        else:
+            failed += 1
+        print(f"\r  {i}/{len(questions)} (generated {generated}, already cached {already_cached}, no answer {failed})", end="", flush=True)
+
+    print()
+    print(f"Done in {time.perf_counter() - start:.1f}s. Cache: {cache.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-warm the LLM answer cache.")
+    parser.add_argument("--no-sections", action="store_true", help="Only warm the common questions.")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many questions.")
+    args = parser.parse_args()
+    warm_answer_cache(include_sections=not args.no_sections, limit=args.limit)
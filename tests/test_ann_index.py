@@ -0,0 +1,56 @@
+import faiss
+import numpy as np
+import pytest
+from indexing.ann_index import (
+    apply_search_params, create_faiss_index, get_exact_index, load_index_params, recall_latency_report,
+    save_index_params
+)
+
+DIM = 32
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((2000, DIM)).astype("float32")
+
+def build(index_type, vectors):
+    index, params = create_faiss_index(index_type, DIM, len(vectors))
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    apply_search_params(index, params)
+    return index, params
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivfpq"])
+def test_exact_index_is_brute_force_over_the_same_ids(index_type, vectors):
+    index, _ = build(index_type, vectors)
+    exact = get_exact_index(index)
+    assert exact.ntotal == len(vectors)
+    _, ids = exact.search(vectors[:5], 1)
+    assert ids[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivfpq"])
+def test_ann_index_finds_the_indexed_vectors(index_type, vectors):
+    index, _ = build(index_type, vectors)
+    _, ids = index.search(vectors[:50], 1)
+    assert (ids[:, 0] == np.arange(50)).mean() >= 0.9
+
+def test_search_params_survive_a_reload(tmp_path, vectors):
+    index, params = build("hnsw", vectors)
+    save_index_params(params, tmp_path / "index_params.json")
+    index.hnsw.efSearch = 1  # what a freshly read .faiss file would carry
+    apply_search_params(index, load_index_params(tmp_path / "index_params.json"))
+    assert index.hnsw.efSearch == params["ef_search"]
+    assert load_index_params(tmp_path / "missing.json") is None
+
+def test_unknown_index_type_is_rejected():
+    with pytest.raises(ValueError, match="Unknown INDEX_TYPE"):
+        create_faiss_index("annoy", DIM, 100)
+
+def test_recall_report_compares_against_exact_search(vectors):
+    index, params = build("ivfpq", vectors)
+    report = recall_latency_report(index, params, k=5, n_queries=20)
+    rows = report["results"]
+    assert (rows[-1]["search"], rows[-1]["recall_at_5"]) == ("exact", 1.0)
+    assert [row["nprobe"] for row in rows[:-1]] == sorted(row["nprobe"] for row in rows[:-1])
+    # The sweep leaves the configured nprobe in place
+    assert faiss.downcast_index(index.base_index).nprobe == params["nprobe"]
@@ -0,0 +1,63 @@
+import pytest
+from rag import answer_cache as answer_cache_module
+from rag.answer_cache import AnswerCache
+from rag.answer_generator import RAGController
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(path=tmp_path / "answers.sqlite3", max_entries=2)
+
+def test_put_and_get(cache):
+    key = AnswerCache.make_key("llama3", "v1", ["sec_303_chunk_0"], "what is theft")
+    assert cache.get(key) is None
+    cache.put(key, "Theft is ...", model="llama3", question="What is theft?", section_ids=["303"])
+    assert cache.get(key) == "Theft is ..."
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+def test_least_recently_used_answer_is_evicted(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "time", lambda: now[0])
+    for key in ("a", "b"):
+        cache.put(key, key.upper())
+        now[0] += 1
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    now[0] += 1
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+
+def test_answers_survive_reopening(tmp_path):
+    AnswerCache(path=tmp_path / "answers.sqlite3").put("k", "answer")
+    assert AnswerCache(path=tmp_path / "answers.sqlite3").get("k") == "answer"
+
+def test_key_changes_with_every_input():
+    base = ("llama3", "v1", ["sec_1_chunk_0"], "q")
+    key = AnswerCache.make_key(*base)
+    assert AnswerCache.make_key(*base) == key
+    for i, other in enumerate(("gemini", "v2", ["sec_2_chunk_0"], "other q")):
+        changed = list(base)
+        changed[i] = other
+        assert AnswerCache.make_key(*changed) != key
+
+class StubRetriever:
+    def __init__(self, index_version):
+        self.index_version = index_version
+
+class Doc:
+    def __init__(self, chunk_id):
+        self.metadata = {"id": chunk_id}
+
+def controller(index_version):
+    # Only the key is under test: no index or LLM is loaded
+    rag = object.__new__(RAGController)
+    rag.retriever = StubRetriever(index_version)
+    rag.model_name = "llama3"
+    return rag
+
+def test_controller_key_changes_with_the_index_version():
+    docs = [Doc("sec_303_chunk_0")]
+    key = controller("v1")._answer_cache_key("What is theft?", docs)
+    # Same question modulo case and punctuation, same chunks: same answer
+    assert controller("v1")._answer_cache_key("what is theft", docs) == key
+    # A rebuilt index may carry amended text under the same chunk ids
+    assert controller("v2")._answer_cache_key("What is theft?", docs) != key
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from config.settings import settings
+from api import server
+from api.server import ServiceState, app
+
+SECTION = {
+    "section_number": "303", "section_title": "Theft", "page_range": "90-91", "score": 0.9,
+    "match_type": "semantic", "is_mapped": False,
+    "chunks": [Document(page_content="Whoever intends to take ...", metadata={"id": "sec_303_chunk_0", "score": 0.9})],
+}
+
+class StubRetriever:
+    index_version = "v1"
+
+class StubController:
+    """prepare() + agenerate()/astream_tokens(), as RAGController; a question starting with 'cached' hits the answer cache."""
+
+    def __init__(self):
+        self.llm = None
+        self.retriever = StubRetriever()
+        self.delay = 0
+
+    def prepare(self, question):
+        if question == "no index":
+            raise ValueError("index not built")
+        cached = question.startswith("cached")
+        return {"answer": "Cached answer." if cached else None, "cached": cached, "sections": [SECTION]}
+
+    async def agenerate(self, prepared):
+        await asyncio.sleep(self.delay)
+        return "Theft is ..."
+
+    async def astream_tokens(self, prepared, trace):
+        for token in ("Theft ", "is ", "..."):
+            await asyncio.sleep(self.delay)
+            yield token
+
+@pytest.fixture
+def controller(monkeypatch):
+    controller = StubController()
+    monkeypatch.setattr(settings, "QUERY_CACHE_PERSIST", False)
+    monkeypatch.setattr(settings, "API_MAX_IN_FLIGHT", 2)
+    monkeypatch.setattr(server, "state", ServiceState())  # the lifespan leaves it draining
+    monkeypatch.setattr(server.resources, "get_controller", lambda: controller)
+    monkeypatch.setattr(server.resources, "peek_controller", lambda: controller)
+    return controller
+
+@pytest.fixture
+def client(controller):
+    with TestClient(app) as client:
+        yield client
+
+def stream(client, question):
+    with client.stream("POST", "/ask/stream", json={"question": question}) as response:
+        assert response.status_code == 200
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+def test_ask_returns_the_answer_and_its_sections(client):
+    body = client.post("/ask", json={"question": "What is theft?"}).json()
+    assert body["answer"] == "Theft is ..."
+    assert body["cached"] is False
+    assert body["sections"][0]["section_number"] == "303"
+    assert body["sections"][0]["chunks"] == [{"id": "sec_303_chunk_0", "score": 0.9, "text": "Whoever intends to take ..."}]
+
+def test_stream_sends_sections_tokens_then_done(client):
+    events = stream(client, "What is theft?")
+    assert events[0]["event"] == "sections"
+    assert [e["text"] for e in events if e["event"] == "token"] == ["Theft ", "is ", "..."]
+    assert events[-1] == {"event": "done"}
+
+    cached = stream(client, "cached question")
+    assert cached[0]["cached"] is True
+    assert [e["text"] for e in cached if e["event"] == "token"] == ["Cached answer."]
+
+def test_errors_map_to_status_codes(client, controller, monkeypatch):
+    assert client.post("/ask", json={"question": ""}).status_code == 422
+    response = client.post("/ask", json={"question": "no index"})
+    assert response.status_code == 503
+    assert "index not built" in response.json()["detail"]
+    assert stream(client, "no index")[-1]["event"] == "error"
+
+    monkeypatch.setattr(settings, "API_REQUEST_TIMEOUT", 0.05)
+    controller.delay = 0.2
+    assert client.post("/ask", json={"question": "slow"}).status_code == 504
+    assert "timed out" in stream(client, "slow stream")[-1]["detail"]
+
+def test_full_server_sheds_load(client):
+    server.state.slots = asyncio.Semaphore(0)
+    response = client.post("/ask", json={"question": "What is theft?"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_health_readiness_and_metrics(client):
+    assert client.get("/healthz").json() == {"status": "ok"}
+    assert client.get("/readyz").json()["ready"] is True
+    client.post("/ask", json={"question": "What is theft?"})
+    assert 'rag_single_flight_total{role="started"}' in client.get("/metrics").text
+
+def test_flights_are_keyed_by_index_version(controller):
+    key = server._flight_key("ask", "What is theft?")
+    assert server._flight_key("ask", "what is theft") == key
+    # After a snapshot swap, new requests must not join work prepared against the old index
+    controller.retriever.index_version = "v2"
+    assert server._flight_key("ask", "What is theft?") != key
@@ -0,0 +1,83 @@
+import json
+import pytest
+from rag import batch
+from rag.answer_generator import RAGController
+from rag.batch import load_completed_ids, load_questions, run_batch
+
+class StubController:
+    """Answers every question except those containing 'fail'."""
+
+    def __init__(self):
+        self.asked = []
+
+    def answer_questions(self, questions, max_concurrency=None, on_result=None):
+        self.asked.append(list(questions))
+        for i, question in reversed(list(enumerate(questions))):  # completion order != input order
+            if "fail" in question:
+                on_result(i, {"answer": None, "error": "LLM unavailable"})
+            else:
+                on_result(i, {"answer": f"answer to {question}", "cached": False, "sections": [
+                    {"section_number": "303", "section_title": "Theft", "score": 0.87654}
+                ]})
+
+@pytest.fixture
+def controller(monkeypatch):
+    controller = StubController()
+    monkeypatch.setattr(batch.resources, "get_controller", lambda: controller)
+    return controller
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_questions_load_from_jsonl_and_csv(tmp_path):
+    jsonl = tmp_path / "questions.jsonl"
+    jsonl.write_text('{"id": "q1", "question": " What is theft? "}\n\n{"question": ""}\n{"question": "Murder?"}\n')
+    assert load_questions(jsonl) == [{"id": "q1", "question": "What is theft?"}, {"id": "3", "question": "Murder?"}]
+
+    csv_path = tmp_path / "questions.csv"
+    csv_path.write_text("id,question\n,What is theft?\n7,Murder?\n")
+    assert load_questions(csv_path) == [{"id": "1", "question": "What is theft?"}, {"id": "7", "question": "Murder?"}]
+
+def test_failed_and_partial_lines_are_not_completed(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    assert load_completed_ids(output) == set()
+    output.write_text('{"id": "1", "answer": "a"}\n{"id": "2", "answer": null, "error": "x"}\n{"id": "3", "ans')
+    assert load_completed_ids(output) == {"1"}
+
+def test_run_writes_every_answer_and_resumes(tmp_path, controller):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("".join(json.dumps({"question": q}) + "\n" for q in ("theft?", "please fail", "murder?")))
+    output = tmp_path / "answers.jsonl"
+
+    run_batch(questions, output, batch_size=2)
+    assert controller.asked == [["theft?", "please fail"], ["murder?"]]
+    records = {r["id"]: r for r in read_jsonl(output)}
+    assert records["1"]["answer"] == "answer to theft?"
+    assert records["1"]["sections"] == [{"section_number": "303", "section_title": "Theft", "score": 0.8765}]
+    assert records["2"]["error"] == "LLM unavailable"
+
+    # Second run only retries the failure
+    run_batch(questions, output, batch_size=2)
+    assert controller.asked[-1] == ["please fail"]
+
+class StubRetriever:
+    def retrieve_sections_batch(self, questions):
+        return [[{"question": question}] for question in questions]
+
+def test_one_failed_question_does_not_fail_the_batch(monkeypatch):
+    # Only the fan-out is under test: no index or LLM is loaded
+    rag = object.__new__(RAGController)
+    rag.retriever = StubRetriever()
+
+    def answer(question, sections):
+        if question == "bad":
+            raise RuntimeError("rate limited")
+        return {"answer": sections[0]["question"].upper()}
+
+    monkeypatch.setattr(rag, "_answer_prepared", answer)
+    completed = []
+    results = rag.answer_questions(["a", "bad", "c"], max_concurrency=2, on_result=lambda i, r: completed.append(i))
+    assert [r["answer"] for r in results] == ["A", None, "C"]
+    assert results[1]["error"] == "rate limited"
+    assert sorted(completed) == [0, 1, 2]
@@ -0,0 +1,58 @@
+import json
+import os
+import pytest
+from config.settings import settings
+from data_ingestion import chunk_bns
+
+PAGES = [
+    {"page_number": 1, "text": "CHAPTER I\nPRELIMINARY\n1. Short title.\nThis Act may be called the Sanhita."},
+    {"page_number": 2, "text": "2. Definitions.\nIn this Sanhita words have these meanings.\nCHAPTER XVII\nOF OFFENCES AGAINST PROPERTY"},
+    {"page_number": 3, "text": "303. Theft.\nWhoever intends to take dishonestly any movable property commits theft."},
+]
+
+@pytest.fixture(autouse=True)
+def processed_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BNS_TEXT_JSON", tmp_path / "bns_text.json")
+    monkeypatch.setattr(settings, "BNS_CHUNKS_JSON", tmp_path / "bns_chunks.json")
+    monkeypatch.setattr(settings, "BNS_SECTIONS_JSON", tmp_path / "bns_sections.json")
+    monkeypatch.setattr(settings, "CHUNKING_STATE_JSON", tmp_path / "chunking_state.json")
+    write_pages(PAGES)
+
+def write_pages(pages):
+    with open(settings.BNS_TEXT_JSON, "w", encoding="utf-8") as f:
+        json.dump(pages, f)
+
+def load_chunks():
+    with open(settings.BNS_CHUNKS_JSON, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_sections_are_tagged_with_act_and_chapter():
+    chunk_bns.run_chunking()
+    metadata = {c["metadata"]["section_number"]: c["metadata"] for c in load_chunks()}
+    assert set(metadata) >= {"1", "2", "303"}
+    assert metadata["1"]["chapter"] == "I"
+    assert metadata["303"]["chapter"] == "XVII"
+    assert metadata["303"]["chapter_title"] == "OF OFFENCES AGAINST PROPERTY"
+    assert metadata["303"]["act"] == "BNS"
+    assert metadata["303"]["start_page"] == 3
+
+def test_rerun_skips_unchanged_input():
+    chunk_bns.run_chunking()
+    assert not chunk_bns.chunking_is_stale()
+    mtime = os.stat(settings.BNS_CHUNKS_JSON).st_mtime_ns
+
+    # Extraction re-ran with identical output: only the signature is refreshed
+    write_pages(PAGES)
+    chunk_bns.run_chunking()
+    assert os.stat(settings.BNS_CHUNKS_JSON).st_mtime_ns == mtime
+    assert not chunk_bns.chunking_is_stale()
+
+def test_changed_text_or_chunker_rechunks(monkeypatch):
+    chunk_bns.run_chunking()
+    write_pages(PAGES[:2] + [{"page_number": 3, "text": "303. Theft.\nAmended text."}])
+    assert chunk_bns.chunking_is_stale()
+    chunk_bns.run_chunking()
+    assert any("Amended" in c["text"] for c in load_chunks())
+
+    monkeypatch.setattr(chunk_bns, "CHUNK_SIZE", 600)
+    assert chunk_bns.chunking_is_stale()
@@ -0,0 +1,39 @@
+import pytest
+from langchain_core.documents import Document
+from config.settings import settings
+from rag.retriever import collapse_sections
+
+def chunk(section, chunk_no, score, match_type="semantic"):
+    return Document(page_content=f"{section}/{chunk_no}", metadata={
+        "id": f"sec_{section}_chunk_{chunk_no}", "section_number": section,
+        "section_title": f"Title {section}", "page_range": "1-2", "score": score, "match_type": match_type,
+    })
+
+# Section 303 has three good chunks, 309 a single better one
+DOCS = [chunk("309", 0, 0.8), chunk("303", 1, 0.6), chunk("303", 0, 0.7), chunk("303", 2, 0.5)]
+
+@pytest.fixture(autouse=True)
+def decay(monkeypatch):
+    monkeypatch.setattr(settings, "SECTION_SCORE_DECAY", 0.5)
+
+def test_sibling_chunks_raise_the_section_score():
+    sections = collapse_sections(DOCS, k=5, chunks_per_section=2, aggregation="decay")
+    assert [s["section_number"] for s in sections] == ["303", "309"]
+    assert sections[0]["score"] == pytest.approx(0.7 + 0.6 * 0.5 + 0.5 * 0.25)
+    assert sections[0]["best_score"] == 0.7
+    # Best chunks first, capped per section
+    assert [d.page_content for d in sections[0]["chunks"]] == ["303/0", "303/1"]
+
+def test_max_aggregation_ranks_by_the_best_chunk():
+    sections = collapse_sections(DOCS, k=5, chunks_per_section=3, aggregation="max")
+    assert [s["section_number"] for s in sections] == ["309", "303"]
+    assert collapse_sections(DOCS, k=5, chunks_per_section=3, aggregation="sum")[0]["score"] == pytest.approx(1.8)
+
+def test_exact_matches_come_first_and_k_limits_sections():
+    docs = DOCS + [chunk("64", 0, 0.1, match_type="exact")]
+    sections = collapse_sections(docs, k=2, chunks_per_section=1)
+    assert [s["section_number"] for s in sections] == ["64", "303"]
+
+def test_unknown_aggregation_is_rejected():
+    with pytest.raises(ValueError, match="Unknown section aggregation"):
+        collapse_sections(DOCS, k=5, chunks_per_section=1, aggregation="mean")
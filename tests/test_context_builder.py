@@ -0,0 +1,68 @@
+import re
+import pytest
+from langchain_core.documents import Document
+from rag import context_builder
+from rag.context_builder import build_context, count_tokens, group_by_section, merge_overlapping
+
+class WordEncoder:
+    """Stand-in for tiktoken: a token per word or run of whitespace (counts aren't additive at joins)."""
+
+    def encode(self, text, disallowed_special=()):
+        return re.findall(r"\S+|\s+", text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+@pytest.fixture(params=["chars", "words"])
+def encoder(request, monkeypatch):
+    monkeypatch.setattr(context_builder, "_encoder", WordEncoder() if request.param == "words" else None)
+    monkeypatch.setattr(context_builder, "_encoder_loaded", True)
+
+def doc(section, chunk, text, **metadata):
+    return Document(page_content=text, metadata={
+        "id": f"sec_{section}_chunk_{chunk}", "section_number": section,
+        "section_title": f"Title {section}", "page_range": "1-2", **metadata,
+    })
+
+def test_merge_overlapping_drops_the_repeated_text():
+    first = "Whoever commits murder shall be punished with death or imprisonment for life"
+    second = "shall be punished with death or imprisonment for life, and shall also be liable to fine."
+    assert merge_overlapping([first, second]) == first + ", and shall also be liable to fine."
+
+def test_merge_overlapping_keeps_non_adjacent_chunks_apart():
+    assert merge_overlapping(["First chunk of the section.", "A later chunk, not adjacent."]) == \
+        "First chunk of the section. ... A later chunk, not adjacent."
+
+def test_merge_overlapping_skips_covered_chunks():
+    assert merge_overlapping(["one two three four", "two three"]) == "one two three four"
+    assert merge_overlapping([]) == ""
+
+def test_group_by_section_orders_chunks_and_drops_duplicates():
+    docs = [doc("103", 2, "c"), doc("64", 0, "x"), doc("103", 0, "a"), doc("103", 2, "c")]
+    sections = group_by_section(docs)
+    assert [s["section_number"] for s in sections] == ["103", "64"]
+    assert [d.page_content for d in sections[0]["docs"]] == ["a", "c"]
+
+def test_context_fits_the_budget(encoder):
+    text = "The offence is punishable with imprisonment of either description. " * 60
+    docs = [doc(str(n), 0, text, full_section_text=text) for n in range(100, 106)]
+    for budget in (150, 333, 500, 1234, 4000):
+        context = build_context(docs, token_budget=budget)
+        assert context["tokens"] <= budget
+        assert count_tokens(context["text"]) <= budget
+        assert context["sections"] + context["dropped"] == 6
+
+def test_truncated_section_is_marked(encoder):
+    text = "word " * 1000
+    context = build_context([doc("103", 0, text, full_section_text=text)], token_budget=200)
+    assert context["truncated"] == 1
+    assert context["text"].endswith(" ...\n\n")
+    assert context["tokens"] <= 200
+
+def test_section_that_barely_fits_is_dropped(encoder):
+    text = "word " * 1000
+    docs = [doc("103", 0, "short text", full_section_text="short text"), doc("104", 0, text)]
+    first = build_context(docs[:1])["tokens"]
+    context = build_context(docs, token_budget=first + 10)
+    assert context["sections"] == 1
+    assert context["dropped"] == 1
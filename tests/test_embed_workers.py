@@ -0,0 +1,31 @@
+import numpy as np
+from indexing import embed_workers
+from indexing.embed_workers import embed_in_batches, iter_batches, resolve_worker_count
+
+class StubEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return [[float(text)] * 3 for text in texts]
+
+def test_batches_cover_the_input_in_order():
+    assert list(iter_batches(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_batches([], 3)) == []
+
+def test_worker_count(monkeypatch):
+    monkeypatch.setattr(embed_workers.os, "cpu_count", lambda: 8)
+    assert resolve_worker_count(0, 10_000, 64) == 7  # auto: all cores but one
+    assert resolve_worker_count(4, 10_000, 64) == 4
+    # Too few texts for every worker to get two batches
+    assert resolve_worker_count(4, 300, 64) == 2
+    assert resolve_worker_count(4, 10, 64) == 1
+
+def test_single_process_embedding_streams_batches_in_order():
+    embeddings = StubEmbeddings()
+    texts = [str(n) for n in range(10)]
+    batches = list(embed_in_batches(texts, "unused", batch_size=4, workers=1, embeddings=embeddings))
+    assert embeddings.calls == [4, 4, 2]
+    assert all(batch.dtype == np.float32 for batch in batches)
+    assert np.concatenate(batches)[:, 0].tolist() == list(range(10))
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from rag.llm_backends import FakeLLM, FakeLLMError, create_llm
+
+PROMPT = "CONTEXT:\n[1] Section 303 (Theft)\nWhoever intends to take dishonestly any movable property commits theft."
+
+def fake(**kwargs):
+    return FakeLLM(**{"latency": 0, "tokens_per_second": 0, "answer_tokens": 12, "error_rate": 0, "seed": 1, **kwargs})
+
+def test_answer_is_deterministic_and_cites_the_first_section():
+    answer = fake().invoke(PROMPT).content
+    assert answer == fake().invoke(PROMPT).content
+    assert answer.startswith("**Section 303**")
+    assert answer.endswith("Source: Bharatiya Nyaya Sanhita, 2023 (Official Gazette)")
+
+def test_streamed_tokens_add_up_to_the_answer():
+    llm = fake()
+    tokens = [chunk.content for chunk in llm.stream(PROMPT)]
+    assert len(tokens) == 12
+    assert "".join(tokens) == llm.invoke(PROMPT).content
+
+def test_async_calls_match_the_sync_ones():
+    llm = fake()
+
+    async def run():
+        message = await llm.ainvoke(PROMPT)
+        tokens = [chunk.content async for chunk in llm.astream(PROMPT)]
+        return message.content, "".join(tokens)
+
+    answer, streamed = asyncio.run(run())
+    assert answer == streamed == llm.invoke(PROMPT).content
+
+def test_failures_are_seeded():
+    def outcomes(llm):
+        results = []
+        for _ in range(50):
+            try:
+                llm.invoke(PROMPT)
+                results.append(True)
+            except FakeLLMError:
+                results.append(False)
+        return results
+
+    first = outcomes(fake(error_rate=0.3))
+    assert first == outcomes(fake(error_rate=0.3))
+    assert 0 < first.count(False) < 50
+
+def test_latency_is_respected(monkeypatch):
+    slept = []
+    monkeypatch.setattr("rag.llm_backends.time.sleep", slept.append)
+    fake(latency=0.5, tokens_per_second=10).invoke(PROMPT)
+    assert slept == [pytest.approx(0.5 + 11 * 0.1)]
+
+def test_unknown_backend_is_rejected():
+    assert isinstance(create_llm("fake"), FakeLLM)
+    with pytest.raises(ValueError, match="Unknown LLM_BACKEND"):
+        create_llm("openai")
@@ -0,0 +1,61 @@
+import pytest
+from langchain_core.documents import Document
+from config.settings import settings
+from indexing.bm25_index import BM25Index, tokenize
+from rag.retriever import BNSRetriever
+
+CHUNKS = [
+    {"id": "sec_303_chunk_0", "text": "Whoever intends to take dishonestly any movable property commits theft.",
+     "metadata": {"section_title": "Theft"}},
+    {"id": "sec_309_chunk_0", "text": "In all robbery there is either theft or extortion.",
+     "metadata": {"section_title": "Robbery"}},
+    {"id": "sec_103_chunk_0", "text": "Whoever commits murder shall be punished with death.",
+     "metadata": {"section_title": "Punishment for murder"}},
+]
+
+def doc(doc_id):
+    return Document(page_content=doc_id, metadata={"id": doc_id})
+
+def fuse(dense, lexical):
+    # _fuse doesn't touch the index: no need to load one
+    return BNSRetriever._fuse(object.__new__(BNSRetriever), dense, lexical)
+
+def test_tokenize_drops_stopwords_and_stems():
+    assert tokenize("Explain the punishments under Section 103 of BNS") == ["punishment", "103"]
+    assert tokenize("furnishing furnishes") == ["furnish", "furnish"]
+
+def test_bm25_ranks_the_matching_chunk_first():
+    index = BM25Index.build(CHUNKS)
+    hits = index.search("punishment for theft of movable property", k=3)
+    assert hits[0][0] == "sec_303_chunk_0"
+    assert all(score > 0 for _, score in hits)
+    assert index.search("unrelated words only", k=3) == []
+
+def test_bm25_allowed_restricts_the_hits():
+    index = BM25Index.build(CHUNKS)
+    hits = index.search("theft", k=3, allowed={"sec_309_chunk_0"})
+    assert [chunk_id for chunk_id, _ in hits] == ["sec_309_chunk_0"]
+
+def test_bm25_round_trips_through_disk(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    index.save(tmp_path / "bm25.pkl")
+    loaded = BM25Index.load(tmp_path / "bm25.pkl")
+    assert loaded.search("murder", k=1) == index.search("murder", k=1)
+
+def test_rrf_sums_reciprocal_ranks_over_both_lists(monkeypatch):
+    monkeypatch.setattr(settings, "RRF_K", 60)
+    dense = [(doc("a"), 0.2), (doc("b"), 0.4), (doc("c"), 0.9)]
+    lexical = [(doc("c"), 7.0), (doc("b"), 3.0)]
+    candidates = fuse(dense, lexical)
+
+    # 1/63 + 1/61 is a hair above 2/62
+    assert list(candidates) == ["c", "b", "a"]
+    assert candidates["b"]["rrf"] == pytest.approx(1 / 62 + 1 / 62)
+    assert candidates["c"]["rrf"] == pytest.approx(1 / 63 + 1 / 61)
+    assert candidates["a"]["rrf"] == pytest.approx(1 / 61)
+    assert (candidates["c"]["distance"], candidates["c"]["bm25"]) == (0.9, 7.0)
+    assert candidates["a"]["bm25"] is None
+
+def test_rrf_with_a_single_list_keeps_its_order():
+    candidates = fuse([(doc("x"), 0.1), (doc("y"), 0.2)], [])
+    assert list(candidates) == ["x", "y"]
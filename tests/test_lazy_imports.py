@@ -0,0 +1,9 @@
+import pytest
+from benchmarks.import_profile import ENTRY_POINTS, profile_import
+
+@pytest.mark.parametrize("module", sorted(ENTRY_POINTS.values()))
+def test_entry_point_defers_heavy_imports(module):
+    # Fresh interpreter per entry point: this test process has imported plenty already
+    report = profile_import(module)
+    assert report["ok"], report["error"]
+    assert report["unexpected"] == []
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import pytest
+from config.settings import settings
+from rag.llm_backends import LLMMessage
+from rag.llm_router import LLMRouter, LLMUnavailableError, Provider, is_retryable
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class ScriptedLLM:
+    """Raises the scripted errors in order, then answers."""
+
+    def __init__(self, errors=(), answer="ok"):
+        self.errors = list(errors)
+        self.answer = answer
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return LLMMessage(self.answer)
+
+    def invoke(self, prompt):
+        return self._next()
+
+    async def ainvoke(self, prompt):
+        return self._next()
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(settings, "LLM_HEDGE_AFTER", 0.0)
+    monkeypatch.setattr(settings, "LLM_CALL_TIMEOUT", 5.0)
+    monkeypatch.setattr(settings, "LLM_DEADLINE", 10.0)
+    monkeypatch.setattr(settings, "LLM_FAILURE_THRESHOLD", 100)
+
+def make_router(*llms):
+    return LLMRouter([Provider(f"p{i}", f"model-{i}", llm) for i, llm in enumerate(llms)])
+
+def test_is_retryable():
+    assert is_retryable(HTTPError(429))
+    assert is_retryable(HTTPError(503))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(HTTPError(401))
+    assert not is_retryable(ValueError("bad request"))
+
+def test_non_retryable_error_fails_over_without_retrying():
+    bad = ScriptedLLM(errors=[HTTPError(401)] * 5)
+    good = ScriptedLLM(answer="from good")
+    router = make_router(bad, good)
+
+    assert router.invoke("q").content == "from good"
+    assert bad.calls == 1
+    assert good.calls == 1
+
+def test_retryable_error_is_retried_on_the_same_provider(caplog):
+    flaky = ScriptedLLM(errors=[HTTPError(503), HTTPError(429)], answer="recovered")
+    backup = ScriptedLLM()
+    router = make_router(flaky, backup)
+
+    with caplog.at_level(logging.WARNING, logger="rag.llm_router"):
+        assert router.invoke("q").content == "recovered"
+    assert flaky.calls == 3
+    assert backup.calls == 0
+    # Each failed attempt is logged
+    assert [r.levelno for r in caplog.records] == [logging.WARNING, logging.WARNING]
+
+def test_retries_are_capped_per_provider_before_failover():
+    down = ScriptedLLM(errors=[HTTPError(503)] * 10)
+    backup = ScriptedLLM(answer="backup")
+    router = make_router(down, backup)
+
+    assert router.invoke("q").content == "backup"
+    assert down.calls == settings.LLM_MAX_RETRIES + 1
+    assert backup.calls == 1
+
+def test_all_providers_failing_raises_unavailable():
+    router = make_router(ScriptedLLM(errors=[HTTPError(401)] * 5), ScriptedLLM(errors=[HTTPError(403)] * 5))
+    with pytest.raises(LLMUnavailableError):
+        router.invoke("q")
+    assert [p.llm.calls for p in router.providers] == [1, 1]
+
+def test_async_non_retryable_error_fails_over_without_retrying():
+    bad = ScriptedLLM(errors=[HTTPError(401)] * 5)
+    good = ScriptedLLM(answer="from good")
+    router = make_router(bad, good)
+
+    assert asyncio.run(router.ainvoke("q")).content == "from good"
+    assert bad.calls == 1
+    assert good.calls == 1
@@ -0,0 +1,91 @@
+import logging
+import faiss
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from indexing.mmap_store import (
+    MmapFlatIndex, MmapVectorStore, encode_vectors, export_mmap_store, mmap_store_is_current
+)
+
+DIM = 16
+
+class Docstore:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def search(self, docstore_id):
+        return self.docs[docstore_id]
+
+class StubFAISSStore:
+    """What export_mmap_store reads from a LangChain FAISS store."""
+
+    def __init__(self, vectors):
+        self.index = faiss.IndexFlatL2(DIM)
+        self.index.add(vectors)
+        ids = [f"sec_{row}_chunk_0" for row in range(len(vectors))]
+        self.index_to_docstore_id = dict(enumerate(ids))
+        self.docstore = Docstore({
+            chunk_id: Document(page_content=f"text {row}", metadata={"id": chunk_id, "section_number": str(row)})
+            for row, chunk_id in enumerate(ids)
+        })
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((300, DIM)).astype("float32")
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_search_matches_faiss_exact_search(dtype, vectors, tmp_path):
+    faiss_store = StubFAISSStore(vectors)
+    export_mmap_store(faiss_store, "v1", dtype=dtype, store_dir=tmp_path)
+    store = MmapVectorStore(tmp_path)
+    assert (store.version, store.dtype, store.index.ntotal) == ("v1", dtype, len(vectors))
+    assert isinstance(store.index.vectors, np.memmap)
+
+    queries = vectors[:20] + 0.01
+    _, expected = faiss_store.index.search(queries, 5)
+    distances, ids = store.index.search(queries, 5)
+    assert (ids[:, 0] == expected[:, 0]).all()
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+def test_export_is_logged(vectors, tmp_path, caplog):
+    with caplog.at_level(logging.INFO, logger="indexing.mmap_store"):
+        export_mmap_store(StubFAISSStore(vectors), "v1", dtype="float16", store_dir=tmp_path)
+    assert any(r.getMessage().startswith("Exported 300 vectors (float16)") for r in caplog.records)
+
+def test_documents_come_back_in_row_order(vectors, tmp_path):
+    export_mmap_store(StubFAISSStore(vectors), "v1", dtype="float16", store_dir=tmp_path)
+    store = MmapVectorStore(tmp_path)
+    docs = store.documents([7, 3, 10_000])
+    assert [d.page_content for d in docs[:2]] == ["text 7", "text 3"]
+    assert docs[1].metadata["section_number"] == "3"
+    assert docs[2] is None
+    assert store.rows_metadata()[3] == (3, "sec_3_chunk_0", {"id": "sec_3_chunk_0", "section_number": "3"})
+
+def test_new_version_replaces_the_old_files(vectors, tmp_path):
+    export_mmap_store(StubFAISSStore(vectors), "v1", dtype="int8", store_dir=tmp_path)
+    assert mmap_store_is_current("v1", dtype="int8", store_dir=tmp_path)
+    assert not mmap_store_is_current("v1", dtype="float16", store_dir=tmp_path)
+
+    export_mmap_store(StubFAISSStore(vectors[:10]), "v2", dtype="float16", store_dir=tmp_path)
+    assert not mmap_store_is_current("v1", dtype="float16", store_dir=tmp_path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "chunks-v2.sqlite3", "norms-v2.npy", "store.json", "vectors-v2.npy"
+    ]
+    assert MmapVectorStore(tmp_path).index.ntotal == 10
+
+def test_missing_store_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No mmap vector store"):
+        MmapVectorStore(tmp_path)
+
+def test_int8_codes_round_trip_within_a_step(vectors):
+    codes, scales = encode_vectors(vectors, "int8")
+    decoded = MmapFlatIndex(codes, np.zeros(len(codes), dtype=np.float32), scales).reconstruct_batch(range(len(codes)))
+    assert (np.abs(decoded - vectors).max(axis=1) <= scales / 2 + 1e-6).all()
+    with pytest.raises(ValueError, match="Unknown VECTOR_DTYPE"):
+        encode_vectors(vectors, "bfloat16")
+
+def test_k_beyond_ntotal_pads_like_faiss():
+    index = MmapFlatIndex(np.zeros((2, DIM), dtype=np.float16), np.zeros(2, dtype=np.float32))
+    distances, ids = index.search(np.zeros((1, DIM), dtype=np.float32), 4)
+    assert ids[0].tolist()[2:] == [-1, -1]
+    assert np.isinf(distances[0, 2:]).all()
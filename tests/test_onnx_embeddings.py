@@ -0,0 +1,83 @@
+import numpy as np
+import onnx
+import pytest
+import tokenizers
+from config.settings import settings
+from indexing.onnx_embeddings import FP32_MODEL, TOKENIZER, OnnxEmbeddings
+from indexing.vector_store_utils import embeddings_compatible, save_embedding_probe
+
+VOCAB = ["[PAD]", "[UNK]", "theft", "murder", "punishment", "for"]
+DIM = 4
+
+@pytest.fixture(scope="module")
+def table():
+    return np.random.default_rng(0).standard_normal((len(VOCAB), DIM)).astype("float32")
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory, table):
+    """A real ONNX graph standing in for MiniLM: last_hidden_state = embedding lookup of input_ids."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "lookup",
+        [helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "tokens"]),
+         helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "tokens"])],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "tokens", DIM])],
+        initializer=[numpy_helper.from_array(table, "table")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    path = tmp_path_factory.mktemp("onnx")
+    onnx.save(model, str(path / FP32_MODEL))
+
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel({w: i for i, w in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer.save(str(path / TOKENIZER))
+    return path
+
+def expected(table, words):
+    pooled = table[[VOCAB.index(w) for w in words]].mean(axis=0)
+    return pooled / np.linalg.norm(pooled)
+
+def test_mean_pools_the_real_tokens_to_unit_vectors(model_dir, table):
+    embeddings = OnnxEmbeddings(model_dir=model_dir)
+    # The shorter text is padded: [PAD] rows must not shift its mean
+    vectors = embeddings.encode(["theft", "punishment for murder"])
+    assert vectors.dtype == np.float32
+    assert np.allclose(vectors[0], expected(table, ["theft"]), atol=1e-6)
+    assert np.allclose(vectors[1], expected(table, ["punishment", "for", "murder"]), atol=1e-6)
+    assert np.allclose(embeddings.embed_query("theft"), vectors[0], atol=1e-6)
+
+def test_batches_do_not_change_the_vectors(model_dir):
+    embeddings = OnnxEmbeddings(model_dir=model_dir)
+    texts = ["theft", "punishment for murder", "murder", "for theft"]
+    assert np.allclose(embeddings.encode(texts, batch_size=1), embeddings.encode(texts, batch_size=3), atol=1e-6)
+    assert embeddings.encode([]).shape == (0, 0)
+
+def test_missing_model_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match="python -m indexing.onnx_embeddings"):
+        OnnxEmbeddings(quantized=True, model_dir=tmp_path)
+
+class ScaledEmbeddings:
+    """Another backend for the same model: same directions, so the same index serves both."""
+
+    def __init__(self, base, noise=0.0):
+        self.base = base
+        self.noise = noise
+
+    def embed_documents(self, texts):
+        vectors = np.asarray(self.base.embed_documents(texts)) * 2
+        return (vectors + self.noise * np.random.default_rng(1).standard_normal(vectors.shape)).tolist()
+
+def test_backends_share_an_index_only_if_the_probe_agrees(model_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_COMPAT_MIN_COSINE", 0.99)
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "torch")
+    onnx_model = OnnxEmbeddings(model_dir=model_dir)
+    save_embedding_probe(onnx_model, tmp_path / "embedding_probe.json")
+
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "onnx")
+    compatible, cosine = embeddings_compatible(ScaledEmbeddings(onnx_model), tmp_path)
+    assert compatible and cosine == pytest.approx(1.0, abs=1e-5)
+    compatible, cosine = embeddings_compatible(ScaledEmbeddings(onnx_model, noise=1.0), tmp_path)
+    assert not compatible and cosine < 0.99
@@ -0,0 +1,73 @@
+import pytest
+from config.settings import settings
+from rag import query_cache as query_cache_module
+from rag.query_cache import LRUCache, QueryCache
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_CACHE_PERSIST", False)
+    monkeypatch.setattr(settings, "QUERY_CACHE_PATH", tmp_path / "query_cache.pkl")
+    return QueryCache()
+
+def test_lru_evicts_the_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # "b" is now the oldest
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == (1, 3)
+    assert lru.stats()["evictions"] == 1
+    assert lru.stats()["hits"] == 3
+
+def test_lru_expires_entries_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache_module.time, "time", lambda: now[0])
+    lru = LRUCache(max_entries=10, ttl_seconds=60)
+    lru.put("a", 1)
+    now[0] += 59
+    assert lru.get("a") == 1
+    now[0] += 2
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+def test_lru_with_no_room_stores_nothing():
+    lru = LRUCache(max_entries=0)
+    lru.put("a", 1)
+    assert lru.get("a") is None
+
+def test_new_index_version_clears_results_but_keeps_embeddings(cache):
+    cache.set_index_version("v1")
+    cache.put_embedding("what is theft", [0.1, 0.2])
+    cache.put_results(("what is theft", 12, "v1"), ["sec_303_chunk_0"])
+
+    cache.set_index_version("v1")  # Same version: nothing dropped
+    assert cache.get_results(("what is theft", 12, "v1")) == ["sec_303_chunk_0"]
+
+    cache.set_index_version("v2")
+    assert cache.get_results(("what is theft", 12, "v1")) is None
+    assert cache.get_embedding("what is theft") == [0.1, 0.2]
+    assert cache.stats()["index_version"] == "v2"
+
+def test_embeddings_are_keyed_by_model(cache, monkeypatch):
+    cache.put_embedding("what is theft", [0.1])
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "other-backend")
+    assert cache.get_embedding("what is theft") is None
+
+def test_persisted_cache_is_reloaded(cache, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_CACHE_PERSIST", True)
+    cache.set_index_version("v1")
+    cache.put_embedding("q", [1.0])
+    cache.put_results(("q", "v1"), ["chunk"])
+    cache.save()
+
+    reloaded = QueryCache()
+    reloaded.set_index_version("v1")
+    assert reloaded.get_embedding("q") == [1.0]
+    assert reloaded.get_results(("q", "v1")) == ["chunk"]
+
+    # Restarted against a newer index: the stored results are stale
+    stale = QueryCache()
+    stale.set_index_version("v2")
+    assert stale.get_results(("q", "v1")) is None
+    assert stale.get_embedding("q") == [1.0]
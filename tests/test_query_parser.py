@@ -0,0 +1,85 @@
+import pytest
+from rag.query_parser import is_reference_only, parse_section_references, query_cache_key, split_section_number
+
+def refs(query):
+    return [(ref["act"], ref["section"], ref["subsection"]) for ref in parse_section_references(query)]
+
+@pytest.mark.parametrize("query, expected", [
+    ("BNS Section 103", [("BNS", "103", None)]),
+    ("IPC 302", [("IPC", "302", None)]),
+    ("Section 304A of IPC", [("IPC", "304A", None)]),
+    ("302 of the IPC", [("IPC", "302", None)]),
+    ("s. 64(2) BNS", [("BNS", "64", "2")]),
+    ("Sec 103", [("BNS", "103", None)]),
+    ("Is 420 IPC bailable?", [("IPC", "420", None)]),
+    ("Section 103 and IPC 304A", [("BNS", "103", None), ("IPC", "304A", None)]),
+    ("IPC 302 vs BNS 103", [("IPC", "302", None), ("BNS", "103", None)]),
+])
+def test_adjacent_act(query, expected):
+    assert refs(query) == expected
+
+def test_act_named_elsewhere_in_the_query():
+    assert refs("In IPC, section 302 is murder") == [("IPC", "302", None)]
+    assert refs("Under the BNS what does section 103 say") == [("BNS", "103", None)]
+
+def test_both_acts_named_elsewhere_is_ambiguous():
+    assert refs("Is section 302 the same in IPC and BNS?") == []
+    # A reference with its own act is unaffected
+    assert refs("Is IPC 302 the same in BNS?") == [("IPC", "302", None)]
+
+def test_bare_numbers_are_not_sections():
+    assert refs("what happened in 2023") == []
+    assert refs("punishment under 420") == []
+    assert refs("10 people were injured") == []
+
+def test_letter_suffix_may_be_hyphenated():
+    assert refs("IPC section 498-A") == [("IPC", "498A", None)]
+    assert refs("section 498-A(1) of IPC") == [("IPC", "498A", "1")]
+    assert refs("IPC 498-A and IPC 498A") == [("IPC", "498A", None)]
+    assert split_section_number("498-a") == {"section": "498A", "subsection": None}
+
+def test_counts_are_not_sections():
+    assert refs("top 10 BNS sections") == []
+    assert refs("first 5 IPC offences on property") == []
+    assert not is_reference_only("top 10 BNS sections")
+    # With a section keyword or an act before it, the number is a section again
+    assert refs("top section 10 BNS") == [("BNS", "10", None)]
+    assert refs("all BNS 303 cases") == [("BNS", "303", None)]
+
+def test_lists_share_the_act():
+    assert refs("IPC 302 and 304") == [("IPC", "302", None), ("IPC", "304", None)]
+    assert refs("IPC 302, 304 or 307") == [("IPC", "302", None), ("IPC", "304", None), ("IPC", "307", None)]
+    assert refs("sections 302 and 304A of IPC") == [("IPC", "302", None), ("IPC", "304A", None)]
+    assert refs("302 & 304 IPC") == [("IPC", "302", None), ("IPC", "304", None)]
+    assert is_reference_only("IPC 302 and 304")
+    # A count after the list is not another section
+    assert refs("IPC 302 and 7 years") == [("IPC", "302", None)]
+
+def test_ranges_are_expanded():
+    expected = [("BNS", "303", None), ("BNS", "304", None), ("BNS", "305", None)]
+    assert refs("sections 303 to 305 BNS") == expected
+    assert refs("BNS 303-305") == expected
+    # Descending, lettered or implausibly long ranges keep only their ends
+    assert refs("IPC 304 to 302") == [("IPC", "304", None), ("IPC", "302", None)]
+    assert refs("IPC 304A to 304B") == [("IPC", "304A", None), ("IPC", "304B", None)]
+    assert refs("section 10 to 400") == [("BNS", "10", None), ("BNS", "400", None)]
+    # A spaced hyphen is punctuation, not a range
+    assert refs("section 103 - 10 years") == [("BNS", "103", None)]
+
+def test_duplicates_are_dropped():
+    assert refs("IPC 302 and Section 302 of IPC") == [("IPC", "302", None)]
+
+def test_is_reference_only():
+    assert is_reference_only("IPC 302")
+    assert is_reference_only("Section 103 and IPC 304A")
+    assert not is_reference_only("In IPC, section 302 is murder")
+    assert not is_reference_only("Is 420 IPC bailable?")
+    assert not is_reference_only("what is murder")
+
+def test_query_cache_key():
+    assert query_cache_key("  What is   Murder?? ") == query_cache_key("what is murder")
+
+def test_split_section_number():
+    assert split_section_number("103(2)") == {"section": "103", "subsection": "2"}
+    assert split_section_number("304a") == {"section": "304A", "subsection": None}
+    assert split_section_number("null") is None
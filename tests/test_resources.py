@@ -0,0 +1,77 @@
+import threading
+import time
+import pytest
+from config.settings import settings
+from rag import answer_generator
+from rag import resources as resources_module
+from rag.resources import ResourceManager
+
+class StubRetriever:
+    index_version = "v1"
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+class StubController:
+    built = 0
+
+    def __init__(self):
+        time.sleep(0.05)  # a slow load, so concurrent callers overlap
+        type(self).built += 1
+        self.retriever = StubRetriever()
+
+@pytest.fixture
+def fingerprint(monkeypatch):
+    fingerprint = ["index-1"]
+    StubController.built = 0
+    monkeypatch.setattr(settings, "INDEX_WATCH_INTERVAL", 0)
+    monkeypatch.setattr(answer_generator, "RAGController", StubController)
+    monkeypatch.setattr(resources_module, "get_index_fingerprint", lambda: fingerprint[0])
+    return fingerprint
+
+def test_controller_is_built_once_for_concurrent_callers(fingerprint):
+    manager = ResourceManager()
+    controllers = []
+    threads = [threading.Thread(target=lambda: controllers.append(manager.get_controller())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert StubController.built == 1
+    assert all(controller is controllers[0] for controller in controllers)
+    assert manager.get_stats()["loads"] == 1
+    assert manager.get_stats()["index_version"] == "v1"
+
+def test_rebuilt_index_reloads_the_controller(fingerprint):
+    manager = ResourceManager()
+    first = manager.get_controller()
+    fingerprint[0] = "index-2"
+    second = manager.get_controller()
+    assert second is not first
+    assert first.retriever.closed
+
+    manager.reload()
+    assert manager.get_controller() is not second
+
+def test_watched_index_keeps_the_controller(fingerprint, monkeypatch):
+    monkeypatch.setattr(settings, "INDEX_WATCH_INTERVAL", 5)
+    manager = ResourceManager()
+    first = manager.get_controller()
+    fingerprint[0] = "index-2"  # the retriever's snapshot watcher picks this up itself
+    assert manager.get_controller() is first
+
+def test_failed_warm_up_is_retried_on_first_use(fingerprint, monkeypatch):
+    manager = ResourceManager()
+
+    def broken():
+        raise RuntimeError("index missing")
+
+    monkeypatch.setattr(answer_generator, "RAGController", broken)
+    manager.warm(background=True)
+    manager._warm_thread.join()
+    assert manager.peek_controller() is None
+
+    monkeypatch.setattr(answer_generator, "RAGController", StubController)
+    assert manager.get_controller() is manager.peek_controller() is not None
@@ -0,0 +1,70 @@
+import pytest
+from langchain_core.documents import Document
+from benchmarks.retrieval_bench import (
+    GOLD_QUERIES, compare_to_baseline, load_gold, percentiles, ranked_sections, run_benchmark
+)
+from rag import retriever as retriever_module
+
+def doc(section):
+    return Document(page_content="", metadata={"section_number": section})
+
+# Canned rankings: the right section first, third, and not at all
+RANKINGS = {
+    "punishment for murder": ["103", "101", "103"],
+    "what is theft": ["309", "64", "303"],
+    "unknown": ["1", "2"],
+}
+
+class StubIndex:
+    ntotal = 3
+
+class StubVectorStore:
+    index = StubIndex()
+
+class StubRetriever:
+    index_version = "v1"
+    vector_store = StubVectorStore()
+
+    def retrieve(self, query, k=12, exact=False):
+        return [doc(section) for section in RANKINGS.get(query, [])]
+
+@pytest.fixture
+def gold_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(retriever_module, "BNSRetriever", StubRetriever)
+    path = tmp_path / "gold.jsonl"
+    path.write_text(
+        '{"query": "punishment for murder", "expected": ["103"], "kind": "semantic"}\n'
+        '{"query": "what is theft", "expected": [303], "kind": "semantic"}\n'
+        '{"query": "unknown", "expected": ["5"], "kind": "exact"}\n'
+    )
+    return path
+
+def test_recall_and_mrr(gold_path):
+    report = run_benchmark(gold_path, k=10, repeat=2)
+    summary = report["summary"]
+    assert summary["queries"] == 3
+    assert (summary["recall@1"], summary["recall@3"]) == (round(1 / 3, 4), round(2 / 3, 4))
+    assert summary["mrr"] == round((1 + 1 / 3) / 3, 4)
+    assert report["by_kind"]["exact"]["recall@10"] == 0.0
+    assert all(len(row["latencies_ms"]) == 2 for row in report["queries"])
+    assert report["config"]["index_version"] == "v1"
+
+def test_sections_are_ranked_once():
+    assert ranked_sections([doc("103"), doc("101"), doc("103"), doc(64)]) == ["103", "101", "64"]
+
+def test_percentiles():
+    stats = percentiles([float(n) for n in range(1, 101)])
+    assert (stats["p50"], stats["max"]) == (50.5, 100.0)
+    assert percentiles([]) == {}
+
+def test_only_drops_beyond_the_tolerance_are_regressions():
+    baseline = {"summary": {"recall@1": 0.8, "recall@5": 0.9, "mrr": 0.85}}
+    report = {"summary": {"recall@1": 0.79, "recall@5": 0.8, "mrr": 0.9}}
+    assert compare_to_baseline(report, baseline, tolerance=0.02) == ["recall@5: 0.9 -> 0.8"]
+
+def test_gold_set_is_well_formed():
+    gold = load_gold(GOLD_QUERIES)
+    assert gold
+    for item in gold:
+        assert item["query"].strip() and item["expected"]
+    assert len({item["query"] for item in gold}) == len(gold)
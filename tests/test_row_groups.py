@@ -0,0 +1,111 @@
+import faiss
+import numpy as np
+import pytest
+from config.settings import settings
+from indexing.mmap_store import MmapFlatIndex
+from indexing.row_groups import RowGroups, SearchFilter, build_row_groups, normalize_chapter, search_rows
+
+DIM = 16
+
+def chunk_rows():
+    """40 chunks: sections 1-20 (two chunks each), chapter I for sections 1-10, II for 11-20."""
+    rows = []
+    for row in range(40):
+        section = row // 2 + 1
+        rows.append((row, f"chunk-{row}", {"section_number": str(section), "chapter": "I" if section <= 10 else "II", "act": "BNS"}))
+    return rows
+
+@pytest.fixture
+def row_groups():
+    return RowGroups(build_row_groups(chunk_rows()))
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((40, DIM)).astype("float32")
+
+def brute_force(vectors, query, rows, k):
+    distances = ((vectors[rows] - query) ** 2).sum(axis=1)
+    return [int(rows[i]) for i in np.argsort(distances)[:k]]
+
+def test_normalize_chapter():
+    assert normalize_chapter("xvii") == "XVII"
+    assert normalize_chapter("Chapter XVII") == "XVII"
+    assert normalize_chapter(17) == "XVII"
+    assert normalize_chapter("4") == "IV"
+
+def test_search_filter():
+    search_filter = SearchFilter(section_range=(5, 8), chapter=1, act="bns")
+    assert search_filter.key() == (None, "I", (5, 8), "BNS")
+    assert search_filter.matches({"section_number": "6", "chapter": "I", "act": "BNS"})
+    assert not search_filter.matches({"section_number": "9", "chapter": "I", "act": "BNS"})
+    assert not search_filter.matches({"section_number": "6", "chapter": "II", "act": "BNS"})
+    assert not SearchFilter(section_range=(5, 8)).allows_section("6A")
+    assert not SearchFilter()
+    assert SearchFilter(sections=["103"])
+
+def test_select(row_groups):
+    assert row_groups.select(SearchFilter()) is None
+    assert row_groups.select(SearchFilter(sections=["3"])).tolist() == [4, 5]
+    assert row_groups.select(SearchFilter(section_range=(10, 11))).tolist() == [18, 19, 20, 21]
+    # Constraints intersect
+    assert row_groups.select(SearchFilter(chapter="II", section_range=(9, 12))).tolist() == [20, 21, 22, 23]
+    assert len(row_groups.select(SearchFilter(act="BNS"))) == 40
+    assert row_groups.select(SearchFilter(act="IPC")).tolist() == []
+    assert row_groups.chunk_ids_at(np.array([4, 5])) == {"chunk-4", "chunk-5"}
+
+def test_search_rows_is_exact_and_padded(vectors):
+    index = faiss.IndexFlatL2(DIM)
+    index.add(vectors)
+    rows = np.array([3, 7, 11, 30])
+    distances, indices = search_rows(index, vectors[:1], rows, 6)
+    assert indices[0, :4].tolist() == brute_force(vectors, vectors[0], rows, 4)
+    assert indices[0, 4:].tolist() == [-1, -1]
+    assert np.isinf(distances[0, 4:]).all()
+
+def test_small_filter_is_exact_and_cached(row_groups, vectors, monkeypatch):
+    monkeypatch.setattr(settings, "FILTER_EXACT_MAX_ROWS", 30)
+    index = faiss.IndexFlatL2(DIM)
+    index.add(vectors)
+    rows = row_groups.select(SearchFilter(chapter="I"))
+
+    _, indices = row_groups.search(index, vectors[25:26], rows, 5)
+    assert indices[0].tolist() == brute_force(vectors, vectors[25], rows, 5)
+    assert len(row_groups._matrices) == 1
+    row_groups.search(index, vectors[:1], rows, 5)
+    assert len(row_groups._matrices) == 1
+
+@pytest.mark.parametrize("make_index", [
+    lambda: faiss.IndexFlatL2(DIM),
+    lambda: faiss.IndexHNSWFlat(DIM, 8),
+])
+def test_broad_filter_uses_the_index_with_a_selector(row_groups, vectors, make_index, monkeypatch):
+    monkeypatch.setattr(settings, "FILTER_EXACT_MAX_ROWS", 4)
+    index = make_index()
+    index.add(vectors)
+    rows = row_groups.select(SearchFilter(chapter="II"))
+
+    _, indices = row_groups.search(index, vectors[:3], rows, 5)
+    assert set(indices.ravel().tolist()) <= set(rows.tolist())
+    assert not row_groups._matrices  # Nothing reconstructed
+    _, exact = row_groups.search(index, vectors[:1], rows, 5, exact=True)
+    assert exact[0].tolist() == brute_force(vectors, vectors[0], rows, 5)
+
+def test_broad_filter_on_ivfpq_with_refine(row_groups, monkeypatch):
+    monkeypatch.setattr(settings, "FILTER_EXACT_MAX_ROWS", 4)
+    vectors = np.random.default_rng(1).standard_normal((40, DIM)).astype("float32")
+    index = faiss.IndexRefineFlat(faiss.IndexIVFPQ(faiss.IndexFlatL2(DIM), DIM, 2, 4, 4))
+    index.train(np.tile(vectors, (8, 1)))
+    index.add(vectors)
+    rows = row_groups.select(SearchFilter(chapter="I"))
+
+    _, indices = row_groups.search(index, vectors[30:31], rows, 5)
+    hits = [i for i in indices[0].tolist() if i != -1]
+    assert hits and set(hits) <= set(rows.tolist())
+
+def test_mmap_index_always_searches_the_rows(row_groups, vectors, monkeypatch):
+    monkeypatch.setattr(settings, "FILTER_EXACT_MAX_ROWS", 4)
+    index = MmapFlatIndex(vectors, (vectors ** 2).sum(axis=1))
+    rows = row_groups.select(SearchFilter(chapter="II"))
+
+    _, indices = row_groups.search(index, vectors[:1], rows, 5)
+    assert indices[0].tolist() == brute_force(vectors, vectors[0], rows, 5)
@@ -0,0 +1,59 @@
+import json
+import os
+import pytest
+from langchain_core.documents import Document
+from config.settings import settings
+from data_ingestion import chunk_bns
+from indexing import section_store
+from indexing.section_store import SectionStore, get_section_store, resolve_section_text
+
+@pytest.fixture
+def sections_path(tmp_path, monkeypatch):
+    path = tmp_path / "bns_sections.json"
+    monkeypatch.setattr(settings, "BNS_SECTIONS_JSON", path)
+    monkeypatch.setattr(section_store, "_store", None)
+    write_sections(path, {"303": {"title": "Theft", "text": "Whoever intends to take dishonestly ..."}})
+    return path
+
+def write_sections(path, sections):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sections, f)
+
+def test_lookup_by_section_number(sections_path):
+    store = SectionStore()
+    assert store.get_text(" 303 ") == "Whoever intends to take dishonestly ..."
+    assert store.get_text(303) == store.get_text("303")
+    assert store.get("999") is None
+
+def test_missing_file_gives_an_empty_store(tmp_path):
+    assert SectionStore(tmp_path / "missing.json").sections == {}
+
+def test_store_is_reloaded_when_the_file_is_rewritten(sections_path):
+    store = get_section_store()
+    assert get_section_store() is store
+
+    write_sections(sections_path, {"303": {"title": "Theft", "text": "Amended text."}})
+    os.utime(sections_path, ns=(0, store._mtime + 1))
+    assert get_section_store() is not store
+    assert get_section_store().get_text("303") == "Amended text."
+
+def test_chunk_text_resolves_through_the_store(sections_path):
+    chunk = Document(page_content="a chunk", metadata={"section_number": "303"})
+    assert resolve_section_text(chunk) == "Whoever intends to take dishonestly ..."
+    # Unknown sections fall back to the chunk, old indexes to their inline copy
+    assert resolve_section_text(Document(page_content="a chunk", metadata={"section_number": "999"})) == "a chunk"
+    inline = Document(page_content="a chunk", metadata={"section_number": "303", "full_section_text": "inline"})
+    assert resolve_section_text(inline) == "inline"
+
+def test_chunks_carry_no_section_text(sections_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BNS_TEXT_JSON", tmp_path / "bns_text.json")
+    monkeypatch.setattr(settings, "BNS_CHUNKS_JSON", tmp_path / "bns_chunks.json")
+    monkeypatch.setattr(settings, "CHUNKING_STATE_JSON", tmp_path / "chunking_state.json")
+    with open(settings.BNS_TEXT_JSON, "w", encoding="utf-8") as f:
+        json.dump([{"page_number": 1, "text": "303. Theft.\nWhoever intends to take dishonestly any movable property."}], f)
+    chunk_bns.run_chunking(force=True)
+
+    with open(settings.BNS_CHUNKS_JSON, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    assert chunks and all("full_section_text" not in c["metadata"] for c in chunks)
+    assert "movable property" in SectionStore().get_text("303")
@@ -0,0 +1,185 @@
+import asyncio
+import threading
+from rag.single_flight import SingleFlight
+
+def test_do_runs_once_for_concurrent_callers():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("q", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flights.stats()["started"] + flights.stats()["joined"] < 4:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
+    assert flights.stats() == {"started": 1, "joined": 3, "in_flight": 0}
+
+def test_do_runs_again_once_the_flight_has_landed():
+    flights = SingleFlight()
+    assert flights.do("q", lambda: 1) == 1
+    assert flights.do("q", lambda: 2) == 2
+
+def test_stream_late_joiner_replays_buffered_tokens():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def tokens():
+        yield "a"
+        yield "b"
+        release.wait(5)
+        yield "c"
+
+    info, leader, joined = flights.stream("q", lambda: ("info", tokens()))
+    assert not joined
+    assert [next(leader), next(leader)] == ["a", "b"]
+
+    info, late, joined = flights.stream("q", lambda: ("other", iter(["x"])))
+    assert (info, joined) == ("info", True)
+    release.set()
+    assert list(leader) == ["c"]
+    assert list(late) == ["a", "b", "c"]
+
+def test_ado_shares_one_task():
+    flights = SingleFlight()
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flights.ado("q", answer) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["answer"] * 3
+    assert len(calls) == 1
+    assert flights.stats()["in_flight"] == 0
+
+async def _tokens(gate, closed, items=("a", "b", "c")):
+    try:
+        for i, token in enumerate(items):
+            if i == 2:
+                await gate.wait()
+            yield token
+    finally:
+        closed.append(True)
+
+def test_astream_late_joiner_gets_buffer_then_live_tokens():
+    flights = SingleFlight()
+    starts = []
+
+    async def main():
+        gate, closed = asyncio.Event(), []
+
+        async def start():
+            starts.append(1)
+            return "info", _tokens(gate, closed)
+
+        info, leader, joined = await flights.astream("q", start)
+        assert (info, joined) == ("info", False)
+        assert [await leader.__anext__(), await leader.__anext__()] == ["a", "b"]
+
+        info, late, joined = await flights.astream("q", start)
+        assert (info, joined) == ("info", True)
+        gate.set()
+        return [t async for t in leader], [t async for t in late], closed
+
+    rest, late, closed = asyncio.run(main())
+    assert rest == ["c"]
+    assert late == ["a", "b", "c"]
+    assert closed == [True]
+    assert len(starts) == 1
+    assert flights.stats() == {"started": 1, "joined": 1, "in_flight": 0}
+
+def test_astream_closes_the_source_when_every_reader_leaves():
+    flights = SingleFlight()
+
+    async def main():
+        gate, closed = asyncio.Event(), []
+
+        async def start():
+            return "info", _tokens(gate, closed)
+
+        _, first, _ = await flights.astream("q", start)
+        _, second, _ = await flights.astream("q", start)
+        assert await first.__anext__() == "a"
+        await first.aclose()
+        assert not closed  # The second reader is still listening
+        await second.aclose()  # Never iterated
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return closed
+
+    assert asyncio.run(main()) == [True]
+    assert flights.stats()["in_flight"] == 0
+
+def test_astream_error_reaches_every_caller_and_ends_the_flight():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("no index")
+
+    async def main():
+        return await asyncio.gather(*(flights.astream("q", failing) for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flights.stats()["in_flight"] == 0
+
+def test_astream_abandoned_before_the_first_token():
+    flights = SingleFlight()
+
+    async def main():
+        gate, closed = asyncio.Event(), []
+
+        async def start():
+            await asyncio.sleep(0.05)
+            return "info", _tokens(gate, closed)
+
+        try:
+            await asyncio.wait_for(flights.astream("q", start), 0.01)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.1)
+        return closed
+
+    asyncio.run(main())
+    # The only caller timed out: the start task is cancelled and the key forgotten
+    assert flights.stats()["in_flight"] == 0
+
+def test_stream_reader_closed_before_reading_stops_the_source():
+    flights = SingleFlight()
+    release = threading.Event()
+    closed = threading.Event()
+    produced = []
+
+    def tokens():
+        try:
+            for token in "abc":
+                if token == "b":
+                    release.wait(5)
+                produced.append(token)
+                yield token
+        finally:
+            closed.set()
+
+    info, reader, joined = flights.stream("q", lambda: ("info", tokens()))
+    reader.close()
+    release.set()
+    assert closed.wait(5)
+    # Nobody is reading: the source is closed at the next token, not run to the end
+    assert "c" not in produced
+    assert list(reader) == []
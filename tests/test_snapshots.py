@@ -0,0 +1,111 @@
+import json
+import logging
+import pytest
+from config.settings import settings
+from indexing.snapshots import (
+    create_staging_dir, get_manifest_path, get_snapshot_dir, get_snapshots_dir, promote_snapshot, prune_snapshots,
+    read_manifest
+)
+from rag import retriever as retriever_module
+from rag.retriever import BNSRetriever
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_STORE_DIR", tmp_path)
+    monkeypatch.setattr(settings, "INDEX_SNAPSHOTS_KEEP", 2)
+    return tmp_path
+
+def build(version):
+    # Version strings grow in length, so each manifest differs in size as well as mtime
+    staging_dir = create_staging_dir(version)
+    (staging_dir / "section_index.json").write_text(json.dumps({"version": version}))
+    return promote_snapshot(staging_dir, version, {"embedding_model": "test"})
+
+def test_without_a_manifest_the_store_dir_is_served(store_dir):
+    assert read_manifest() is None
+    assert get_snapshot_dir() == store_dir
+
+def test_promoted_snapshot_becomes_the_served_one(store_dir):
+    build("v1")
+    manifest = build("v10")
+    assert manifest["previous"] == "v1"
+    assert read_manifest() == manifest
+    assert json.loads(get_manifest_path().read_text())["version"] == "v10"
+    assert get_snapshot_dir() == store_dir / "snapshots" / "v10"
+    assert json.loads((get_snapshot_dir() / "section_index.json").read_text()) == {"version": "v10"}
+    # Nothing is left staged and no temporary manifest lingers
+    assert sorted(p.name for p in get_snapshots_dir().iterdir()) == ["v1", "v10"]
+    assert [p.name for p in store_dir.iterdir() if p.name.startswith("manifest")] == ["manifest.json"]
+
+def test_promotion_is_logged(store_dir, caplog):
+    with caplog.at_level(logging.INFO, logger="indexing.snapshots"):
+        build("v1")
+    assert any(r.getMessage().startswith("Promoted index snapshot v1") for r in caplog.records)
+
+def test_old_snapshots_are_pruned(store_dir):
+    for version in ("v1", "v10", "v100"):
+        build(version)
+    assert sorted(p.name for p in get_snapshots_dir().iterdir()) == ["v10", "v100"]
+
+def test_unfinished_staging_dir_is_never_served_nor_pruned(store_dir):
+    build("v1")
+    staging_dir = create_staging_dir("v10")
+    build("v100")
+    build("v1000")
+    assert staging_dir.exists()
+    assert read_manifest()["version"] == "v1000"
+
+def test_pruning_keeps_the_current_snapshot(store_dir):
+    build("v1")
+    build("v10")
+    prune_snapshots(keep=0)
+    assert [p.name for p in get_snapshots_dir().iterdir()] == ["v10"]
+
+class StubSnapshot:
+    def __init__(self, embeddings, snapshot_dir, version):
+        self.version = version
+
+class StubQueryCache:
+    index_version = None
+
+    def set_index_version(self, version):
+        self.index_version = version
+
+@pytest.fixture
+def retriever(monkeypatch):
+    served = {"version": "v2", "compatible": True}
+    cache = StubQueryCache()
+    monkeypatch.setattr(retriever_module, "IndexSnapshot", StubSnapshot)
+    monkeypatch.setattr(retriever_module, "resolve_snapshot", lambda: ("dir", served["version"]))
+    monkeypatch.setattr(retriever_module, "embeddings_compatible", lambda embeddings, path: (served["compatible"], None))
+    monkeypatch.setattr(retriever_module, "query_cache", cache)
+
+    # Only the swap is under test: no embeddings, index or watcher thread
+    retriever = object.__new__(BNSRetriever)
+    retriever.embeddings = None
+    retriever._snapshot = StubSnapshot(None, "dir", "v1")
+    retriever._swap_lock = retriever_module.threading.Lock()
+    retriever._skipped_version = None
+    retriever.served, retriever.cache = served, cache
+    return retriever
+
+def test_refresh_swaps_in_the_new_snapshot(retriever):
+    assert retriever.refresh() is True
+    assert retriever.index_version == "v2"
+    assert retriever.cache.index_version == "v2"
+    assert retriever.refresh() is False
+
+def test_running_call_keeps_its_snapshot_across_a_swap(retriever):
+    with retriever._pinned():
+        assert retriever.refresh() is True
+        assert retriever.index_version == "v1"
+        with retriever._pinned():  # nested call: same pin
+            assert retriever.index_version == "v1"
+    assert retriever.index_version == "v2"
+
+def test_snapshot_with_other_embeddings_is_skipped(retriever):
+    retriever.served["compatible"] = False
+    assert retriever.refresh() is False
+    assert retriever.index_version == "v1"
+    assert retriever._skipped_version == "v2"
+    assert retriever.cache.index_version is None
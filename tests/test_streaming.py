@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+from rag.answer_generator import RAGController
+from rag.llm_backends import FakeLLM, LLMMessage
+from rag.single_flight import flights
+
+class StubRetriever:
+    index_version = "v1"
+
+class GatedLLM:
+    """Sends one token, then the rest once `gate` is set."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def stream(self, prompt):
+        yield LLMMessage("Theft ")
+        self.gate.wait(5)
+        yield LLMMessage("is ...")
+
+class BrokenLLM:
+    def stream(self, prompt):
+        yield LLMMessage("Theft ")
+        raise ConnectionError("provider went away")
+
+@pytest.fixture
+def rag(monkeypatch):
+    # Only streaming is under test: no index or real LLM is loaded
+    rag = object.__new__(RAGController)
+    rag.retriever = StubRetriever()
+    rag.llm = FakeLLM(latency=0, tokens_per_second=0, answer_tokens=8, error_rate=0)
+    rag.stored = []
+
+    def prepare(question):
+        if question == "broken retrieval":
+            raise RuntimeError("index missing")
+        cached = "Cached answer." if question == "cached" else None
+        return {"answer": cached, "cached": cached is not None, "documents": [], "sections": [],
+                "prompt": f"CONTEXT:\n[1] Section 303 (Theft)\n{question}", "question": question}
+
+    monkeypatch.setattr(rag, "prepare", prepare)
+    monkeypatch.setattr(rag, "store_answer", lambda prepared, answer: rag.stored.append(answer))
+    return rag
+
+def test_streamed_answer_is_cached_once_complete(rag):
+    response = rag.stream_answer("what is theft")
+    assert response["cached"] is False
+    tokens = list(response["stream"])
+    assert len(tokens) == 8
+    assert rag.stored == ["".join(tokens)]
+    assert "".join(tokens) == rag.llm.invoke("CONTEXT:\n[1] Section 303 (Theft)\nwhat is theft").content
+
+def test_abandoned_stream_is_not_cached(rag):
+    rag.llm = GatedLLM()
+    stream = rag.stream_answer("what is theft")["stream"]
+    assert next(stream) == "Theft "
+    stream.close()
+    rag.llm.gate.set()
+
+    deadline = time.monotonic() + 5
+    while flights.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert flights.stats()["in_flight"] == 0
+    assert rag.stored == []
+
+def test_cached_answer_streams_in_one_piece(rag):
+    response = rag.stream_answer("cached")
+    assert response["cached"] is True
+    assert list(response["stream"]) == ["Cached answer."]
+
+def test_errors_end_the_stream_with_a_message(rag):
+    assert "index missing" in "".join(rag.stream_answer("broken retrieval")["stream"])
+
+    rag.llm = BrokenLLM()
+    tokens = list(rag.stream_answer("what is theft")["stream"])
+    assert tokens[0] == "Theft "
+    assert "provider went away" in tokens[-1]
+    assert rag.stored == []  # a partial answer never reaches the cache
@@ -0,0 +1,39 @@
+import json
+import logging
+from rag.telemetry import HistogramSink, LogSink, Telemetry
+
+class FailingSink:
+    def emit(self, trace):
+        raise RuntimeError("disk full")
+
+def test_spans_and_attributes_reach_the_sinks(caplog):
+    telemetry = Telemetry(enabled=True, sinks=[LogSink(), HistogramSink()])
+    with caplog.at_level(logging.INFO, logger="rag.telemetry"):
+        with telemetry.trace("answer_question"):
+            with telemetry.span("faiss_search"):
+                pass
+            with telemetry.span("faiss_search"):
+                pass
+            telemetry.set(answer_cache_hit=True, prompt_tokens=120)
+
+    [record] = [r for r in caplog.records if r.getMessage().startswith("TRACE ")]
+    assert record.levelno == logging.INFO
+    trace = json.loads(record.getMessage()[len("TRACE "):])
+    assert trace["trace"] == "answer_question"
+    assert set(trace["spans_ms"]) == {"faiss_search"}
+    assert trace["answer_cache_hit"] is True
+    assert "rag_stage_duration_seconds_count" in telemetry.render_prometheus()
+
+def test_failing_sink_is_logged_not_raised(caplog):
+    telemetry = Telemetry(enabled=True, sinks=[FailingSink()])
+    with caplog.at_level(logging.WARNING, logger="rag.telemetry"):
+        with telemetry.trace("api_ask"):
+            pass
+    assert any("FailingSink failed: disk full" in r.getMessage() and r.levelno == logging.WARNING for r in caplog.records)
+
+def test_disabled_telemetry_is_a_no_op():
+    telemetry = Telemetry(enabled=False, sinks=[FailingSink()])
+    with telemetry.trace("answer_question") as trace:
+        with telemetry.span("faiss_search"):
+            telemetry.set(answer_cache_hit=True)
+    assert trace is None
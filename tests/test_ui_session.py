@@ -0,0 +1,60 @@
+import pytest
+from rag.query_parser import query_cache_key
+from ui.session import init_session, previous_answer, read_stream, remember_result
+
+class RerunRequested(Exception):
+    """Stands in for the exception Streamlit raises in a running script when a new submit arrives."""
+
+class Stream:
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.tokens)
+
+    def close(self):
+        self.closed = True
+
+def answered(state, question):
+    remember_result(state, {"question": question, "question_key": query_cache_key(question), "answer": "..."})
+
+def test_repeated_submits_reuse_the_answer_and_count_as_avoided_calls():
+    state = {}
+    init_session(state)
+    assert previous_answer(state, "What is theft?") is None  # nothing answered yet
+    answered(state, "What is theft?")
+
+    for repeat in ("What is theft?", "  what is THEFT ", "What is theft"):
+        assert previous_answer(state, repeat) is state["last_result"]
+    assert state["llm_calls_avoided"] == 3
+
+    assert previous_answer(state, "What is robbery?") is None
+    assert state["llm_calls_avoided"] == 3
+    assert state["last_question"] == "What is theft?"
+
+def test_init_keeps_existing_session_values():
+    state = {"llm_calls_avoided": 2}
+    init_session(state)
+    assert state == {"llm_calls_avoided": 2, "last_result": None, "last_question": ""}
+
+def test_stream_is_read_and_closed():
+    stream = Stream(["Theft ", "is ", "..."])
+    shown = []
+    assert read_stream(stream, shown.append) == "Theft is ..."
+    assert shown == ["Theft ", "Theft is ", "Theft is ..."]
+    assert stream.closed
+
+def test_interrupted_run_closes_the_stream():
+    stream = Stream(["Theft ", "is ", "..."])
+
+    def on_token(partial):
+        raise RerunRequested
+
+    with pytest.raises(RerunRequested):
+        read_stream(stream, on_token)
+    assert stream.closed
+    assert next(stream.tokens) == "is "  # nothing read past the interruption
@@ -0,0 +1,47 @@
+from typing import Callable, Dict, Iterator, MutableMapping, Optional
+from rag.query_parser import query_cache_key
+
+# Per-session state of the Streamlit app, kept free of Streamlit itself (the app passes
+# st.session_state, which is a mapping) so it can be tested without a browser session.
+
+SESSION_DEFAULTS = {
+    "last_result": None,    # Last completed answer, redrawn on reruns that aren't a new submit
+    "last_question": "",
+    "llm_calls_avoided": 0,
+}
+
+def init_session(state: MutableMapping):
+    for key, value in SESSION_DEFAULTS.items():
+        if key not in state:
+            state[key] = value
+
+def previous_answer(state: MutableMapping, question: str) -> Optional[Dict]:
+    """
+    The answer on screen if `question` repeats the question it answers (double click, Enter
+    again, same text modulo case and punctuation); that submit is an avoided LLM call.
+    """
+    last = state["last_result"]
+    if last and last["question_key"] == query_cache_key(question):
+        state["llm_calls_avoided"] += 1
+        return last
+    return None
+
+def remember_result(state: MutableMapping, result: Dict):
+    state["last_result"] = result
+    state["last_question"] = result["question"]
+
+def read_stream(stream: Iterator[str], on_token: Callable[[str], None]) -> str:
+    """
+    Joins an answer stream, calling on_token(answer so far) after each token. A new submit
+    stops the running script inside on_token (Streamlit raises there); the stream is closed
+    on the way out, so the abandoned LLM call stops now rather than when it is collected.
+    """
+    answer = ""
+    try:
+        for token in stream:
+            answer += token
+            on_token(answer)
+    finally:
+        if hasattr(stream, "close"):
+            stream.close()
+    return answer
@@ -2,30 +2,41 @@
 import streamlit as st
 import os
 import sys
-import time
 from datetime import datetime
 
 # Ensure modules are discoverable
 sys.path.append(os.getcwd())
 
 from config.settings import settings
-import data_ingestion
-import indexing
-from rag.answer_generator import RAGController
-from mappings.ipc_bns_mapping import mapper
+from rag.resources import resources
+from rag.query_cache import query_cache
+from rag.query_parser import query_cache_key
+from ui.session import init_session, previous_answer, read_stream, remember_result
+from rag.telemetry import configure_logging
+from indexing.section_store import get_section_store, resolve_section_text
+from rag.context_builder import merge_section_chunks
+from mappings.ipc_bns_mapping import get_mapper
 
+@st.cache_resource(show_spinner=False)
 def _ensure_data_ready() -> None:
-    """Automatic setup if data files are missing."""
-    if not settings.BNS_TEXT_JSON.exists():
+    """
+    Automatic setup if data files are missing or out of date (each stage only redoes what changed).
+    Runs once per server process, not on every rerun; the staleness checks are cheap to import,
+    the PDF parser and the text splitter are only loaded if a stage actually has to run.
+    """
+    import data_ingestion
+    import indexing
+
+    if data_ingestion.extraction_is_stale():
         with st.spinner("Extracting text from BNS PDF..."):
             data_ingestion.run_extraction()
 
-    if not settings.BNS_CHUNKS_JSON.exists():
+    if data_ingestion.chunking_is_stale():
         with st.spinner("Chunking BNS text..."):
             data_ingestion.run_chunking()
 
-    if not settings.VECTOR_STORE_DIR.exists() or not os.listdir(settings.VECTOR_STORE_DIR):
-        with st.spinner("Building vector index (this may take a minute)..."):
+    if indexing.indexing_is_stale():
+        with st.spinner("Updating vector index (only changed sections are re-embedded)..."):
             indexing.run_indexing()
 
 # --- Page Configuration ---
@@ -55,7 +66,7 @@ st.markdown("""
         border-right: 1px solid #30363d;
     }
     
-    .stButton>button {
+    .stButton>button, .stFormSubmitButton>button {
         width: 100%;
         border-radius: 10px;
         height: 3em;
@@ -66,7 +77,7 @@ st.markdown("""
         font-weight: 600;
     }
     
-    .stButton>button:hover {
+    .stButton>button:hover, .stFormSubmitButton>button:hover {
         background-color: #2ea043;
         box-shadow: 0 0 15px rgba(46, 160, 67, 0.4);
     }
@@ -139,9 +150,99 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def get_controller():
-    return RAGController()
+    # Shared per process (see rag/resources.py); only rebuilt when the index changes
+    return resources.get_controller()
+
+def _run_query(question: str):
+    controller = get_controller()
+
+    with st.status("Analyzing Bharitya Nyaya Sanhita...", expanded=True) as status:
+        st.write("📂 Fetching official BNS gazette sections...")
+        response = controller.stream_answer(question)
+        status.update(label="Analysis Complete", state="complete", expanded=False)
+
+    # Display Result, token by token as the LLM generates it
+    st.markdown("### 🤖 BNS Assistant's Guidance")
+    answer_placeholder = st.empty()
+    # A newer submit stops this run mid-stream; read_stream closes the LLM stream when it does
+    answer = read_stream(
+        response["stream"],
+        lambda partial: answer_placeholder.markdown(f'<div class="ai-bubble">{partial}▌</div>', unsafe_allow_html=True)
+    )
+    answer_placeholder.markdown(f'<div class="ai-bubble">{answer}</div>', unsafe_allow_html=True)
+
+    result = {
+        "question": question,
+        "question_key": query_cache_key(question),
+        "answer": answer,
+        "documents": response["documents"],
+        "sections": response["sections"],
+        "cached": response.get("cached", False),
+    }
+    remember_result(st.session_state, result)
+    _render_sources(result)
+
+def _render_result(result):
+    st.markdown("### 🤖 BNS Assistant's Guidance")
+    st.markdown(f'<div class="ai-bubble">{result["answer"]}</div>', unsafe_allow_html=True)
+    _render_sources(result)
+
+def _render_sources(result):
+    if result["cached"]:
+        st.caption("⚡ Served from the answer cache")
+
+    # Display Sources: one card per section, as ranked by the retriever (Rule 4)
+    if result["sections"]:
+        st.markdown("### 📚 Official Citations")
+        
+        grouped_docs = {}
+        section_store = get_section_store()
+        for section in result["sections"]:
+            sec_num = section["section_number"]
+            best = section["chunks"][0]
+            has_full_text = section_store.get(sec_num) is not None or "full_section_text" in best.metadata
+            if has_full_text:
+                # Full text is resolved once per section from the section store (Fixes "Half correctness")
+                text = resolve_section_text(best)
+            else:
+                # Section missing from the store: fall back to stitching the retrieved chunks
+                text = merge_section_chunks(section["chunks"])
+            grouped_docs[sec_num] = {
+                "title": section["section_title"] or "BNS Provision",
+                "pages": section["page_range"] or "Gazette",
+                "is_mapped": section["is_mapped"],
+                "is_exact": section["match_type"] == "exact",
+                "text": text,
+            }
+        
+        # Render unified cards
+        cols = st.columns(1) # Single column for better readability of full sections
+        for sec_num, data in grouped_docs.items():
+            mapped_info = " <span style='color: #fbbf24; font-size: 0.75rem; font-weight: bold;'>[IPC REFERENCE DETECTED]</span>" if data["is_mapped"] else ""
+            if data["is_exact"]:
+                mapped_info += " <span style='color: #34d399; font-size: 0.75rem; font-weight: bold;'>[EXACT MATCH]</span>"
+            
+            st.markdown(f"""
+                <div class="source-card">
+                    <div><span class="section-tag">BNS Section {sec_num}</span>{mapped_info}</div>
+                    <div style="font-weight: 700; margin: 0.8rem 0; color: #60a5fa; font-size: 1.1rem;">{data['title']}</div>
+                    <div style="font-size: 0.95rem; color: #d1d5db; line-height: 1.5; max-height: 300px; overflow-y: auto;">
+                        {data['text'][:500]}... <br><i>(Full text in expander below)</i>
+                    </div>
+                    <div style="font-size: 0.75rem; color: #9ca3af; margin-top: 1rem; border-top: 1px solid #374151; padding-top: 0.5rem;">
+                        📖 Page {data['pages']} | Official Gazette 2023
+                    </div>
+                </div>
+            """, unsafe_allow_html=True)
+            
+            with st.expander(f"📖 Read Full Text of Section {sec_num}"):
+                 st.write(data['text'])
+
+    else:
+        st.warning("No specific BNS section matched precisely.")
 
 def main():
+    configure_logging()
     # Startup Safety Check
     # Startup Safety Check & Secrets Loading
     # 1. Try environment variable
@@ -177,6 +278,9 @@ def main():
         settings.GROQ_API_KEY = api_key
 
     _ensure_data_ready()
+    init_session(st.session_state)
+    # Load the embedding model + index in the background while the page renders
+    resources.warm()
     
     # Sidebar
     with st.sidebar:
@@ -209,7 +313,7 @@ def main():
         st.sidebar.markdown("### 🔍 IPC ➔ BNS Tool")
         ipc_input = st.text_input("Map IPC Section", placeholder="e.g. 302")
         if ipc_input:
-            res = mapper.resolve_ipc(ipc_input)
+            res = get_mapper().resolve_ipc(ipc_input)
             if res:
                 st.success(f"**BNS Section {res['bns_section']}**")
                 st.caption(f"{res['description']}")
@@ -218,15 +322,30 @@ def main():
         
         st.sidebar.divider()
         with st.sidebar.expander("✨ New in BNS (Highlights)"):
-            new_offences = mapper.get_new_offences()
+            new_offences = get_mapper().get_new_offences()
             for off in new_offences:
                 st.markdown(f"**{off['description']}**")
                 st.caption(f"Section {off['bns_section']}: {off['notes']}")
         
         st.divider()
         st.sidebar.subheader("System Info")
-        st.caption(f"• LLM: {settings.GROQ_MODEL if settings.GROQ_API_KEY else settings.GEMINI_MODEL}")
+        if settings.LLM_BACKEND == "fake":
+            st.caption("• LLM: fake (local stand-in, LLM_BACKEND=fake)")
+        else:
+            st.caption(f"• LLM: {settings.GROQ_MODEL if settings.GROQ_API_KEY else settings.GEMINI_MODEL}")
         st.caption(f"• Index: {settings.VECTOR_STORE_DIR.name}")
+        res_stats = resources.get_stats()
+        if res_stats["loads"]:
+            st.caption(f"• Index loads: {res_stats['loads']} ({res_stats['last_load_seconds']}s, at {res_stats['loaded_at']})")
+        if res_stats["current_rss_mb"] is not None:
+            st.caption(f"• Memory (RSS): {res_stats['current_rss_mb']:.0f} MB")
+        cache_stats = query_cache.stats()
+        st.caption(
+            f"• Query cache: {cache_stats['results']['hits']} hits / {cache_stats['results']['misses']} misses "
+            f"({cache_stats['results']['entries']} cached)"
+        )
+        # Filled in once this run knows whether it called the LLM
+        session_caption = st.empty()
         
     # Main Content
     st.markdown("""
@@ -239,79 +358,27 @@ def main():
         </div>
     """, unsafe_allow_html=True)
 
-    # Question Input
+    # Question Input: the form only submits on the button (or Enter), not on every rerun
     st.markdown("### 🖊️ Ask your legal query")
-    question = st.text_input("", placeholder="Explain the punishment for theft under the new BNS act...", label_visibility="collapsed")
-    
-    col_ask, _ = st.columns([1, 4])
-    ask_button = col_ask.button("Get AI Guidance")
-
-    if (ask_button or (question and len(question) > 5)) and question:
-        controller = get_controller()
-        
-        with st.status("Analyzing Bharitya Nyaya Sanhita...", expanded=True) as status:
-            st.write("🔍 Resolving legal terminology...")
-            time.sleep(0.3)
-            st.write("📂 Fetching official BNS gazette sections...")
-            response = controller.answer_question(question)
-            status.update(label="Analysis Complete", state="complete", expanded=False)
-        
-        # Display Result
-        st.markdown("### 🤖 BNS Assistant's Guidance")
-        st.markdown(f'<div class="ai-bubble">{response["answer"]}</div>', unsafe_allow_html=True)
-        
-        # Display Sources
-        if response["documents"]:
-            st.markdown("### 📚 Official Citations")
-            
-            # Group documents by Section Number to prevent split cards (Rule 4)
-            # Group documents by Section Number to prevent split cards (Rule 4)
-            grouped_docs = {}
-            for doc in response["documents"]:
-                sec_num = doc.metadata.get("section_number", "Unk")
-                
-                # Use the new Full Section Text metadata if available (Fixes "Half correctness")
-                full_text = doc.metadata.get("full_section_text", doc.page_content)
-                
-                if sec_num not in grouped_docs:
-                    grouped_docs[sec_num] = {
-                        "title": doc.metadata.get("section_title", "BNS Provision"),
-                        "pages": doc.metadata.get("page_range", doc.metadata.get("start_page", "Gazette")),
-                        "is_mapped": doc.metadata.get("is_mapped", False),
-                        "text": full_text, # Start with full text
-                        "metadata": doc.metadata
-                    }
-                else:
-                    # If we already have the section, and we are using full_section_text, we don't need to append.
-                    # We only append if we are forced to use fragmented chunks (fallback).
-                    if "full_section_text" not in doc.metadata:
-                         grouped_docs[sec_num]["text"] += "\n\n" + doc.page_content
-                    # If full_section_text exists, it's already complete in the first assignment.
-                    # We can arguably ignore subsequent chunks for text purposes, or just check if this chunk offers something new (unlikely for full text).
-            
-            # Render unified cards
-            cols = st.columns(1) # Single column for better readability of full sections
-            for sec_num, data in grouped_docs.items():
-                mapped_info = " <span style='color: #fbbf24; font-size: 0.75rem; font-weight: bold;'>[IPC REFERENCE DETECTED]</span>" if data["is_mapped"] else ""
-                
-                st.markdown(f"""
-                    <div class="source-card">
-                        <div><span class="section-tag">BNS Section {sec_num}</span>{mapped_info}</div>
-                        <div style="font-weight: 700; margin: 0.8rem 0; color: #60a5fa; font-size: 1.1rem;">{data['title']}</div>
-                        <div style="font-size: 0.95rem; color: #d1d5db; line-height: 1.5; max-height: 300px; overflow-y: auto;">
-                            {data['text'][:500]}... <br><i>(Full text in expander below)</i>
-                        </div>
-                        <div style="font-size: 0.75rem; color: #9ca3af; margin-top: 1rem; border-top: 1px solid #374151; padding-top: 0.5rem;">
-                            📖 Page {data['pages']} | Official Gazette 2023
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
-                
-                with st.expander(f"📖 Read Full Text of Section {sec_num}"):
-                     st.write(data['text'])
+    with st.form("ask_form", clear_on_submit=False):
+        question = st.text_input("", placeholder="Explain the punishment for theft under the new BNS act...", label_visibility="collapsed")
+        col_ask, _ = st.columns([1, 4])
+        submitted = col_ask.form_submit_button("Get AI Guidance")
 
+    state = st.session_state
+    if submitted and question.strip():
+        previous = previous_answer(state, question)
+        if previous:
+            # Same question submitted again (double click / Enter): show the answer already on screen
+            _render_result(previous)
         else:
-            st.warning("No specific BNS section matched precisely.")
+            _run_query(question)
+    elif state.last_result:
+        # Rerun from another widget (feedback, IPC tool): redraw the last answer without re-running
+        # the pipeline. Not counted as an avoided call: nothing would have called the LLM here
+        _render_result(state.last_result)
+
+    session_caption.caption(f"• LLM calls avoided this session: {state.llm_calls_avoided}")
 
     st.markdown("<br><br>", unsafe_allow_html=True)
     st.markdown("---")